@@ -0,0 +1,347 @@
+"""
+异步处理模块 (async_convert.py)
+基于 Mistral SDK 的异步接口处理PDF，单个事件循环即可驱动大量并发文档
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import shutil
+import tempfile
+from contextlib import nullcontext
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from convert import (
+    DEFAULT_CHUNK_CONCURRENCY,
+    DEFAULT_MAX_CHUNK_PAGES,
+    INLINE_MAX_MB,
+    MAX_CHUNK_SIZE_MB,
+    OCR_MODEL,
+    PdfChunk,
+    convert_image_to_pdf,
+    create_client,
+    finish_job,
+    get_output_dir,
+    get_pdf_page_count,
+    get_pdf_size_mb,
+    is_image_file,
+    is_rejected_input,
+    iter_pending_chunks,
+    job_options,
+    make_data_url,
+    make_document_chunk,
+    native_image_mime_type,
+    ocr_request_options,
+    save_ocr_results,
+    should_inline,
+)
+from job_manifest import JobManifest
+from rate_limit import get_rate_limiter
+from uploads import get_upload_registry
+
+if TYPE_CHECKING:
+    from mistralai import Mistral
+
+# 同时进行中的OCR请求数量上限(所有文档共享)
+DEFAULT_ASYNC_CONCURRENCY = 16
+
+async def process_pdf_chunk_async(pdf_path: str, client: Mistral, output_dir: str, page_offset: int,
+                                  semaphore: asyncio.Semaphore = None, cache=None, output_options: dict = None,
+                                  inline_max_mb: float = INLINE_MAX_MB) -> str:
+    """
+    Asynchronously process a single PDF chunk and return the path to the partial results file.
+    Chunks up to inline_max_mb are sent inline as a data URL instead of being uploaded first.
+    """
+    # Confirm PDF file exists
+    pdf_file = Path(pdf_path)
+    if not pdf_file.is_file():
+        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+
+    content = await asyncio.to_thread(pdf_file.read_bytes)
+    return await ocr_content_async(content, pdf_file.stem, client, output_dir, page_offset, semaphore, cache,
+                                   output_options, inline_max_mb)
+
+async def process_image_async(image_path: str, client: Mistral, output_dir: str,
+                              semaphore: asyncio.Semaphore = None, cache=None, output_options: dict = None,
+                              inline_max_mb: float = INLINE_MAX_MB) -> str:
+    """Async counterpart of convert.process_image: OCR a JPEG/PNG as an image input, without converting it."""
+    mime_type = native_image_mime_type(image_path)
+    if mime_type is None:
+        raise ValueError(f"Image format cannot be sent directly: {image_path}")
+    image_file = Path(image_path)
+    if not image_file.is_file():
+        raise FileNotFoundError(f"Image file not found: {image_path}")
+
+    content = await asyncio.to_thread(image_file.read_bytes)
+    return await ocr_content_async(content, image_file.stem, client, output_dir, 0, semaphore, cache,
+                                   output_options, inline_max_mb, mime_type)
+
+async def ocr_content_async(content: bytes, file_name: str, client: Mistral, output_dir: str, page_offset: int,
+                            semaphore: asyncio.Semaphore = None, cache=None, output_options: dict = None,
+                            inline_max_mb: float = INLINE_MAX_MB, mime_type: str = "application/pdf") -> str:
+    """Async counterpart of convert.ocr_content."""
+    output_options = output_options or {}
+    ocr_options = ocr_request_options(output_options)
+
+    # Replay a cached response if we have seen these exact bytes before
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(content, OCR_MODEL, ocr_options)
+        cached_response = await asyncio.to_thread(cache.get, cache_key)
+        if cached_response is not None:
+            return await asyncio.to_thread(save_ocr_results, cached_response, output_dir, page_offset, **output_options)
+
+    # Only the network round trips count against the concurrency limit;
+    # each call also goes through the process-wide rate limiter
+    remote_file = None
+    uploads = get_upload_registry()
+    async with semaphore or nullcontext():
+        if should_inline(len(content), inline_max_mb):
+            # Small chunks go inline: one round trip instead of three
+            document_url = await asyncio.to_thread(make_data_url, content, mime_type)
+        else:
+            remote_file = await uploads.acquire_async(client, content, file_name)
+            document_url = remote_file.url
+
+        try:
+            pdf_response = await get_rate_limiter().call_async(
+                client.ocr.process_async,
+                document=make_document_chunk(document_url, mime_type),
+                model=OCR_MODEL,
+                **ocr_options
+            )
+        finally:
+            if remote_file is not None:
+                uploads.release(remote_file)
+
+    if cache_key is not None:
+        await asyncio.to_thread(cache.put, cache_key, pdf_response)
+
+    # Save partial results without blocking the event loop
+    return await asyncio.to_thread(save_ocr_results, pdf_response, output_dir, page_offset, **output_options)
+
+async def process_pdf_chunk_stream_async(chunks, client: Mistral, output_dir: str,
+                                        semaphore: asyncio.Semaphore = None, progress_callback=None, cache=None,
+                                        chunk_done_callback=None, total_pages: int = None,
+                                        max_pending: int = DEFAULT_CHUNK_CONCURRENCY * 2,
+                                        output_options: dict = None, inline_max_mb: float = INLINE_MAX_MB) -> list:
+    """
+    Async counterpart of convert.process_pdf_chunk_stream. The (blocking) chunk iterable is advanced in a
+    worker thread, so the next chunk is written while earlier ones are being uploaded; at most max_pending
+    chunks of this document wait for the semaphore at once.
+    Returns the partial result files ordered by chunk index.
+    """
+    iterator = iter(chunks)
+    tasks = {}
+    pages_done = 0
+
+    async def run_chunk(chunk_index, chunk):
+        nonlocal pages_done
+        partial_file = await process_pdf_chunk_async(
+            chunk.path, client, output_dir, chunk.start_page, semaphore, cache, output_options, inline_max_mb
+        )
+        if chunk_done_callback:
+            await asyncio.to_thread(chunk_done_callback, chunk_index, partial_file)
+        pages_done += chunk.end_page - chunk.start_page
+        if progress_callback:
+            progress_callback(pages_done, total_pages, f"Processed chunk {sum(t.done() for t in tasks.values()) + 1}...")
+        return partial_file
+
+    try:
+        while True:
+            item = await asyncio.to_thread(next, iterator, None)
+            if item is None:
+                break
+            chunk_index, chunk = item
+            tasks[chunk_index] = asyncio.create_task(run_chunk(chunk_index, chunk))
+
+            # Surface failures early and don't run too far ahead of the uploads
+            pending = [task for task in tasks.values() if not task.done()]
+            while len(pending) >= max_pending:
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending = [task for task in tasks.values() if not task.done()]
+            for task in tasks.values():
+                if task.done():
+                    task.result()
+
+        for next_done in asyncio.as_completed(list(tasks.values())):
+            await next_done
+    except BaseException:
+        # Don't leave the remaining chunks running if one of them failed
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+
+    return [tasks[chunk_index].result() for chunk_index in sorted(tasks)]
+
+async def process_pdf_chunks_async(chunk_paths: list, client: Mistral, output_dir: str,
+                                   semaphore: asyncio.Semaphore = None, progress_callback=None, cache=None,
+                                   output_options: dict = None, inline_max_mb: float = INLINE_MAX_MB) -> list:
+    """
+    Process already split PDF chunks concurrently on the running event loop.
+    chunk_paths may hold PdfChunk entries from split_pdf_chunks, or plain paths (which are opened to count pages).
+    Returns the partial result files in chunk order, regardless of completion order.
+    """
+    chunks = []
+    page_offset = 0
+    for chunk_path in chunk_paths:
+        if isinstance(chunk_path, PdfChunk):
+            chunks.append(chunk_path)
+            page_offset = chunk_path.end_page
+            continue
+        page_count = await asyncio.to_thread(get_pdf_page_count, chunk_path)
+        chunks.append(PdfChunk(chunk_path, page_offset, page_offset + page_count, os.path.getsize(chunk_path)))
+        page_offset += page_count
+
+    return await process_pdf_chunk_stream_async(
+        enumerate(chunks), client, output_dir, semaphore, progress_callback, cache,
+        total_pages=page_offset, output_options=output_options, inline_max_mb=inline_max_mb
+    )
+
+async def process_pdf_async(pdf_path, api_key=None, progress_callback=None, output_base_dir=None,
+                            client: Mistral = None, semaphore: asyncio.Semaphore = None, cache=None,
+                            max_pages_per_chunk=DEFAULT_MAX_CHUNK_PAGES, output_options=None, search_index=None,
+                            inline_max_mb: float = INLINE_MAX_MB, native_images: bool = True):
+    """
+    process_pdf 的异步版本，输出相同的分块文件、complete.md、图片和任务清单。
+    多个文档共享同一个 client 和 semaphore 时，semaphore 限制的是全部文档的并发请求数。
+    native_images 为 True 时JPEG/PNG图片直接提交，被接口拒绝时再转换为PDF。
+    """
+    if client is None:
+        client = create_client(api_key)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(DEFAULT_ASYNC_CONCURRENCY)
+
+    output_dir = get_output_dir(pdf_path, output_base_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 读取任务清单，源文件与输出选项都未变化时跳过已完成的分块
+    manifest = await asyncio.to_thread(JobManifest.load, output_dir, pdf_path, job_options(output_options))
+    if manifest.is_complete():
+        await asyncio.to_thread(finish_job, manifest, search_index)
+        if progress_callback:
+            progress_callback(1, 1)
+        return output_dir
+
+    # 接口能直接识别的图像直接提交，其他图像(或被接口拒绝的图像)先转换为PDF
+    original_is_image = is_image_file(pdf_path)
+    if original_is_image and native_images and native_image_mime_type(pdf_path):
+        try:
+            partial_file = await process_image_async(pdf_path, client, output_dir, semaphore, cache,
+                                                     output_options, inline_max_mb)
+        except Exception as e:
+            if not is_rejected_input(e):
+                raise
+        else:
+            await asyncio.to_thread(manifest.set_chunks, [(0, 1)], 1)
+            await asyncio.to_thread(manifest.mark_done, 0, partial_file)
+            await asyncio.to_thread(finish_job, manifest, search_index)
+            if progress_callback:
+                progress_callback(1, 1)
+            return output_dir
+
+    temp_dir = None
+    source_path = pdf_path
+
+    try:
+        if original_is_image:
+            if progress_callback:
+                progress_callback(0, 1, f"检测到图像文件，正在转换为PDF...")
+            temp_dir = tempfile.mkdtemp()
+            source_path = os.path.join(temp_dir, Path(pdf_path).stem + ".pdf")
+            try:
+                await asyncio.to_thread(convert_image_to_pdf, pdf_path, source_path)
+            except Exception as e:
+                raise Exception(f"图像转换失败: {str(e)}")
+
+        progress_base = 0.3 if original_is_image else 0
+        progress_scale = 0.7 if original_is_image else 1.0
+
+        # Check if the PDF needs splitting
+        if not manifest.chunks and progress_callback:
+            pdf_size_mb = get_pdf_size_mb(source_path)
+            if pdf_size_mb > MAX_CHUNK_SIZE_MB:
+                progress_callback(progress_base, 1, f"PDF size ({pdf_size_mb:.2f} MB) exceeds 50MB limit. Splitting into smaller chunks...")
+
+        # Create a temporary directory for split files
+        temp_split_dir = tempfile.mkdtemp()
+        try:
+            # Pages finished in an earlier run count as done
+            pages_already_done = manifest.finished_pages()
+
+            def chunk_progress(pages_done, _total_pages, message):
+                if progress_callback and manifest.total_pages:
+                    fraction = (pages_already_done + pages_done) / manifest.total_pages
+                    progress_callback(progress_base + fraction * progress_scale * 0.95, 1, message)
+
+            def chunk_done(chunk_index, partial_file):
+                # Checkpoint right away and free the chunk's disk space
+                manifest.mark_done(chunk_index, partial_file)
+                chunk_path = os.path.join(temp_split_dir, f"chunk_{manifest.chunks[chunk_index]['start_page']}.pdf")
+                if os.path.exists(chunk_path):
+                    os.remove(chunk_path)
+
+            await process_pdf_chunk_stream_async(
+                iter_pending_chunks(source_path, manifest, temp_split_dir, max_pages=max_pages_per_chunk),
+                client, output_dir, semaphore,
+                chunk_progress, cache, chunk_done, output_options=output_options,
+                inline_max_mb=inline_max_mb
+            )
+        finally:
+            # Clean up temporary files
+            shutil.rmtree(temp_split_dir)
+
+        # Merge results
+        if progress_callback:
+            progress_callback(0.95, 1, "Merging results...")
+        await asyncio.to_thread(finish_job, manifest, search_index)
+        if progress_callback:
+            progress_callback(1, 1)
+
+        return output_dir
+
+    finally:
+        # 清理转换文件的临时目录
+        if temp_dir and os.path.exists(temp_dir):
+            shutil.rmtree(temp_dir)
+
+async def process_pdfs_async(pdf_paths: list, api_key=None, output_base_dir=None,
+                             max_concurrency: int = DEFAULT_ASYNC_CONCURRENCY, client: Mistral = None,
+                             cache=None, max_pages_per_chunk=DEFAULT_MAX_CHUNK_PAGES, output_options=None,
+                             search_index=None, inline_max_mb: float = INLINE_MAX_MB,
+                             native_images: bool = True) -> list:
+    """
+    并发处理多个文档，所有文档共享一个客户端和并发上限。
+    返回与 pdf_paths 顺序一致的列表，成功时为输出目录，失败时为对应的异常。
+    """
+    own_client = client is None
+    if own_client:
+        client = create_client(api_key)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    results = await asyncio.gather(
+        *(process_pdf_async(pdf_path, output_base_dir=output_base_dir, client=client, semaphore=semaphore,
+                            cache=cache, max_pages_per_chunk=max_pages_per_chunk, output_options=output_options,
+                            search_index=search_index, inline_max_mb=inline_max_mb,
+                            native_images=native_images)
+          for pdf_path in pdf_paths),
+        return_exceptions=True
+    )
+    if own_client:
+        # 这个客户端不会再被使用，立即删除它留下的远程文件
+        await asyncio.to_thread(get_upload_registry().flush, client)
+    return results
+
+if __name__ == "__main__":
+    import sys
+
+    # 使用示例: python async_convert.py [--text-only] API_KEY file1.pdf file2.pdf ...
+    args = sys.argv[1:]
+    text_only = "--text-only" in args
+    if text_only:
+        args.remove("--text-only")
+    results = asyncio.run(process_pdfs_async(args[1:], args[0], output_options={"text_only": text_only}))
+    for pdf_path, result in zip(args[1:], results):
+        print(f"{pdf_path}: {result}")
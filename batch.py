@@ -0,0 +1,345 @@
+"""
+批处理模块 (batch.py)
+使用 Mistral Batch API 处理大量文档：把所有待处理分块写成批处理任务的JSONL输入文件，提交并轮询任务状态，
+完成后逐条取回结果，按原有的分块、合并流程写入常规的输出目录。适合不要求即时返回的大批量任务
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from convert import (
+    DEFAULT_MAX_CHUNK_PAGES,
+    OCR_MODEL,
+    convert_image_to_pdf,
+    finish_job,
+    get_output_dir,
+    is_image_file,
+    iter_pending_chunks,
+    job_options,
+    make_data_url,
+    ocr_request_options,
+    save_ocr_results,
+)
+from job_manifest import JobManifest
+from rate_limit import get_rate_limiter
+
+if TYPE_CHECKING:
+    from mistralai import Mistral
+
+# 批处理任务调用的接口
+BATCH_ENDPOINT = "/v1/ocr"
+# 批处理任务的最长运行时间(小时)
+BATCH_TIMEOUT_HOURS = 24
+# 查询任务状态的间隔(秒)
+DEFAULT_POLL_INTERVAL = 30.0
+# 单个批处理输入文件的请求数和大小上限，超过时拆成多个任务
+MAX_BATCH_REQUESTS = 10000
+MAX_BATCH_FILE_MB = 500.0
+# 任务的最终状态
+TERMINAL_STATUSES = {"SUCCESS", "FAILED", "TIMEOUT_EXCEEDED", "CANCELLED"}
+# 保存已提交任务的状态文件，中断后重新运行时继续等待这些任务而不是重新提交
+BATCH_STATE_FILE = ".mistral_ocr_batch.json"
+
+class BatchJobError(Exception):
+    """批处理任务失败，或文档有分块没有得到结果"""
+
+def make_custom_id(file_index: int, chunk_index: int) -> str:
+    return f"{file_index}:{chunk_index}"
+
+def parse_custom_id(custom_id: str) -> tuple:
+    file_index, chunk_index = custom_id.split(":")
+    return int(file_index), int(chunk_index)
+
+def batch_request_line(custom_id: str, content: bytes, ocr_options: dict) -> bytes:
+    """一个分块的批处理请求(JSONL中的一行)，文档以 data URL 内嵌，不需要单独上传"""
+    body = {"document": {"type": "document_url", "document_url": make_data_url(content)}, **ocr_options}
+    return (json.dumps({"custom_id": custom_id, "body": body}) + "\n").encode("utf-8")
+
+class BatchInputWriter:
+    """把请求写入一个或多个JSONL文件，达到请求数或大小上限时换一个新文件"""
+
+    def __init__(self, directory: str, max_requests: int = MAX_BATCH_REQUESTS,
+                 max_file_mb: float = MAX_BATCH_FILE_MB):
+        self.directory = directory
+        self.max_requests = max_requests
+        self.max_file_bytes = int(max_file_mb * 1024 * 1024)
+        self.paths = []
+        # 每个输入文件包含请求的文档序号，用于把失败的批处理任务只归到相关文档
+        self.file_indexes = []
+        self._file = None
+        self._requests = 0
+        self._bytes = 0
+
+    def add(self, line: bytes, file_index: int = None) -> None:
+        if self._file is None or self._requests >= self.max_requests or (
+                self._requests and self._bytes + len(line) > self.max_file_bytes):
+            self._roll()
+        self._file.write(line)
+        if file_index is not None:
+            self.file_indexes[-1].add(file_index)
+        self._requests += 1
+        self._bytes += len(line)
+
+    def _roll(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        path = os.path.join(self.directory, f"batch_{len(self.paths)}.jsonl")
+        self.paths.append(path)
+        self.file_indexes.append(set())
+        self._file = open(path, 'wb')
+        self._requests = 0
+        self._bytes = 0
+
+    def close(self) -> list:
+        """关闭当前文件，返回所有输入文件路径"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        return self.paths
+
+class BatchDocument:
+    """批处理中的一个文档：输出目录、任务清单以及失败原因"""
+
+    def __init__(self, file_path: str, output_base_dir: str = None):
+        self.file_path = file_path
+        self.output_dir = get_output_dir(file_path, output_base_dir)
+        self.manifest = None
+        self.errors = []
+
+def prepare_documents(documents: list, writer: BatchInputWriter, temp_dir: str, cache=None,
+                      output_options: dict = None, max_pages_per_chunk=DEFAULT_MAX_CHUNK_PAGES) -> dict:
+    """
+    分割每个文档并把尚未完成的分块写入批处理输入。缓存命中的分块直接保存结果。
+    返回 {custom_id: 缓存键}，用于收到结果后写入缓存。
+    """
+    output_options = output_options or {}
+    ocr_options = ocr_request_options(output_options)
+    cache_keys = {}
+    for file_index, document in enumerate(documents):
+        if document.manifest is None or document.manifest.is_complete():
+            continue
+        doc_temp_dir = os.path.join(temp_dir, str(file_index))
+        os.makedirs(doc_temp_dir)
+        try:
+            source_path = document.file_path
+            if is_image_file(source_path):
+                source_path = os.path.join(doc_temp_dir, Path(document.file_path).stem + ".pdf")
+                convert_image_to_pdf(document.file_path, source_path)
+
+            for chunk_index, chunk in iter_pending_chunks(source_path, document.manifest, doc_temp_dir,
+                                                          max_pages=max_pages_per_chunk):
+                content = Path(chunk.path).read_bytes()
+                if chunk.path != source_path:
+                    os.remove(chunk.path)
+
+                cache_key = None
+                if cache is not None:
+                    cache_key = cache.make_key(content, OCR_MODEL, ocr_options)
+                    cached_response = cache.get(cache_key)
+                    if cached_response is not None:
+                        partial_file = save_ocr_results(cached_response, document.output_dir, chunk.start_page,
+                                                        **output_options)
+                        document.manifest.mark_done(chunk_index, partial_file)
+                        continue
+
+                custom_id = make_custom_id(file_index, chunk_index)
+                writer.add(batch_request_line(custom_id, content, ocr_options), file_index)
+                cache_keys[custom_id] = cache_key
+        except Exception as e:
+            document.errors.append(f"{type(e).__name__}: {e}")
+        finally:
+            shutil.rmtree(doc_temp_dir, ignore_errors=True)
+    return cache_keys
+
+def submit_batch(client: Mistral, input_path: str, metadata: dict = None) -> str:
+    """上传一个JSONL输入文件并创建批处理任务，返回任务ID"""
+    rate_limiter = get_rate_limiter()
+    with open(input_path, 'rb') as f:
+        input_file = rate_limiter.call(
+            client.files.upload,
+            file={"file_name": os.path.basename(input_path), "content": f},
+            purpose="batch",
+        )
+    job = rate_limiter.call(
+        client.batch.jobs.create,
+        input_files=[input_file.id],
+        endpoint=BATCH_ENDPOINT,
+        model=OCR_MODEL,
+        metadata=metadata,
+        timeout_hours=BATCH_TIMEOUT_HOURS,
+    )
+    return job.id
+
+def wait_for_batches(client: Mistral, job_ids: list, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                     progress_callback=None) -> dict:
+    """轮询直到所有任务结束，返回 {任务ID: 最终状态的任务}。progress_callback 接收 (已完成请求数, 总请求数, 消息)"""
+    rate_limiter = get_rate_limiter()
+    jobs = {}
+    while True:
+        for job_id in job_ids:
+            if job_id not in jobs or jobs[job_id].status not in TERMINAL_STATUSES:
+                jobs[job_id] = rate_limiter.call(client.batch.jobs.get, job_id=job_id)
+        if progress_callback:
+            completed = sum(job.completed_requests for job in jobs.values())
+            total = sum(job.total_requests for job in jobs.values())
+            statuses = ", ".join(sorted({job.status for job in jobs.values()}))
+            progress_callback(completed, total, f"Batch {statuses}: {completed}/{total} requests")
+        if all(job.status in TERMINAL_STATUSES for job in jobs.values()):
+            return jobs
+        time.sleep(poll_interval)
+
+def iter_batch_results(client: Mistral, file_id: str):
+    """逐行读取批处理结果文件(流式下载，不把整个文件读入内存)"""
+    response = get_rate_limiter().call(client.files.download, file_id=file_id)
+    try:
+        for line in response.iter_lines():
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        response.close()
+
+def apply_batch_result(result: dict, documents: list, cache=None, cache_keys: dict = None,
+                       output_options: dict = None) -> None:
+    """把一条批处理结果保存为对应分块的 part 文件并更新任务清单；失败的请求记录到文档的错误中"""
+    from mistralai.models import OCRResponse
+
+    file_index, chunk_index = parse_custom_id(result["custom_id"])
+    document = documents[file_index]
+    response = result.get("response") or {}
+    if result.get("error") or response.get("status_code") != 200:
+        error = result.get("error") or response.get("body")
+        document.errors.append(f"chunk {chunk_index}: {error}")
+        return
+
+    ocr_response = OCRResponse.model_validate(response["body"])
+    cache_key = (cache_keys or {}).get(result["custom_id"])
+    if cache is not None and cache_key is not None:
+        cache.put(cache_key, ocr_response)
+    start_page = document.manifest.chunks[chunk_index]["start_page"]
+    partial_file = save_ocr_results(ocr_response, document.output_dir, start_page, **(output_options or {}))
+    document.manifest.mark_done(chunk_index, partial_file)
+
+def load_batch_state(state_path: str, file_paths: list) -> tuple:
+    """
+    读取上次提交的任务，返回 (任务ID列表, {任务ID: 文档序号列表}, {custom_id: 缓存键})；
+    文件列表不同或状态文件不存在时返回 (None, {}, {})。旧的状态文件没有文档序号和缓存键，此时后两项为空字典
+    """
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None, {}, {}
+    if state.get("files") != [os.path.abspath(path) for path in file_paths]:
+        return None, {}, {}
+    return state.get("jobs"), state.get("documents", {}), state.get("cache_keys", {})
+
+def save_batch_state(state_path: str, file_paths: list, job_ids: list, job_documents: dict = None,
+                     cache_keys: dict = None) -> None:
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(state_path)), suffix=".tmp")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({"files": [os.path.abspath(path) for path in file_paths], "jobs": job_ids,
+                   "documents": job_documents or {}, "cache_keys": cache_keys or {}}, f, indent=2)
+    os.replace(temp_path, state_path)
+
+def process_pdfs_batch(pdf_paths: list, api_key: str = None, output_base_dir: str = None, engine=None,
+                       cache=None, max_pages_per_chunk=DEFAULT_MAX_CHUNK_PAGES, output_options: dict = None,
+                       search_index=None, poll_interval: float = DEFAULT_POLL_INTERVAL, progress_callback=None,
+                       max_requests_per_batch: int = MAX_BATCH_REQUESTS, max_batch_file_mb: float = MAX_BATCH_FILE_MB,
+                       state_path: str = None) -> list:
+    """
+    用 Batch API 处理多个文档，输出与 process_pdf 相同(分块文件、complete.md、图片和任务清单)。
+    返回与 pdf_paths 顺序一致的列表，成功时为输出目录，失败时为对应的异常。
+    已提交的任务ID保存在 state_path(默认在保存位置下)，中断后用相同的文件列表重新运行会继续等待这些任务；
+    已完成的分块由各文档的任务清单跳过，不会重复提交。
+    """
+    if engine is None:
+        from engine import get_engine
+        engine = get_engine(api_key)
+    client = engine.client
+    output_options = output_options or {}
+    if state_path is None:
+        state_path = os.path.join(output_base_dir or ".", BATCH_STATE_FILE)
+
+    documents = [BatchDocument(file_path, output_base_dir) for file_path in pdf_paths]
+    for document in documents:
+        try:
+            os.makedirs(document.output_dir, exist_ok=True)
+            document.manifest = JobManifest.load(document.output_dir, document.file_path,
+                                                 job_options(output_options))
+        except Exception as e:
+            document.errors.append(f"{type(e).__name__}: {e}")
+
+    # 继续上次的任务时沿用保存的缓存键，结果同样写入缓存
+    job_ids, job_documents, cache_keys = load_batch_state(state_path, pdf_paths)
+    if job_ids is None:
+        temp_dir = tempfile.mkdtemp()
+        try:
+            writer = BatchInputWriter(temp_dir, max_requests_per_batch, max_batch_file_mb)
+            try:
+                cache_keys = prepare_documents(documents, writer, temp_dir, cache, output_options,
+                                               max_pages_per_chunk)
+            finally:
+                input_paths = writer.close()
+            if progress_callback:
+                progress_callback(0, len(cache_keys), f"Submitting {len(cache_keys)} requests "
+                                                      f"in {len(input_paths)} batch job(s)...")
+            job_ids = [submit_batch(client, path, {"source": "mistral-ocr"}) for path in input_paths]
+            job_documents = {job_id: sorted(file_indexes)
+                             for job_id, file_indexes in zip(job_ids, writer.file_indexes)}
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        if job_ids:
+            save_batch_state(state_path, pdf_paths, job_ids, job_documents, cache_keys)
+
+    jobs = wait_for_batches(client, job_ids, poll_interval, progress_callback) if job_ids else {}
+
+    # 成功和失败的请求分别在结果文件和错误文件中
+    remote_files = []
+    for job in jobs.values():
+        for file_id in (job.output_file, job.error_file):
+            if not file_id:
+                continue
+            for result in iter_batch_results(client, file_id):
+                apply_batch_result(result, documents, cache, cache_keys, output_options)
+            remote_files.append(file_id)
+        remote_files.extend(job.input_files)
+
+    # 未成功结束的任务只记到其请求所属的文档上
+    for job in jobs.values():
+        if job.status == "SUCCESS":
+            continue
+        if job.id in job_documents:
+            affected = [documents[file_index] for file_index in job_documents[job.id]]
+        else:
+            # 旧的状态文件不知道任务包含哪些文档，只记到仍未完成的文档上
+            affected = [document for document in documents
+                        if document.manifest is not None and not document.manifest.is_complete()]
+        for document in affected:
+            document.errors.append(f"batch job {job.id} ended with status {job.status}")
+
+    results = []
+    for document in documents:
+        if document.manifest is not None and document.manifest.is_complete():
+            try:
+                finish_job(document.manifest, search_index)
+                results.append(document.output_dir)
+            except Exception as e:
+                results.append(e)
+        else:
+            results.append(BatchJobError("; ".join(document.errors) or "not all chunks were processed"))
+
+    # 结果都已写入输出目录，清理远程文件和状态文件
+    for file_id in remote_files:
+        try:
+            get_rate_limiter().call(client.files.delete, file_id=file_id)
+        except Exception:
+            pass
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    return results
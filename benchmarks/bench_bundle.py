@@ -0,0 +1,72 @@
+"""
+小文件合并基准测试 (benchmarks/bench_bundle.py)
+对带固定延迟的本地API替身处理大量1-3页的PDF，比较逐个文件提交与合并提交的总耗时和请求数
+用法: python benchmarks/bench_bundle.py [--files 100] [--jobs 4] [--latency 0.2]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bundle import process_files_bundled
+from engine import OCREngine
+from rate_limit import configure_rate_limiter
+from stub_server import StubServer
+
+def make_small_pdfs(directory: str, count: int) -> list:
+    """生成 count 个1-3页的PDF"""
+    from PIL import Image
+
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"doc_{i}.pdf")
+        pages = [Image.new("RGB", (200, 260), (i % 256, 120, 120 + page)) for page in range(1 + i % 3)]
+        pages[0].save(path, "PDF", save_all=True, append_images=pages[1:])
+        paths.append(path)
+    return paths
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="小文件合并提交基准测试")
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--jobs", type=int, default=4, help="同时处理的文件数(或合并请求数)")
+    parser.add_argument("--latency", type=float, default=0.2, help="替身每个请求的延迟(秒)，模拟OCR请求的固定开销")
+    args = parser.parse_args(argv)
+
+    configure_rate_limiter(requests_per_second=0, max_concurrency=args.jobs * 4)
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        input_dir = os.path.join(work_dir, "in")
+        os.makedirs(input_dir)
+        paths = make_small_pdfs(input_dir, args.files)
+        results = {}
+        for mode in ("per file", "bundled"):
+            output_dir = os.path.join(work_dir, mode.replace(" ", "_"))
+            with StubServer(latency=args.latency) as server:
+                with OCREngine("stub-key", server_url=server.url, file_workers=args.jobs) as engine:
+                    start = time.perf_counter()
+                    if mode == "bundled":
+                        outputs = process_files_bundled(paths, output_base_dir=output_dir, engine=engine,
+                                                        output_options={"text_only": True})
+                    else:
+                        outputs = process_files_bundled(paths, output_base_dir=output_dir, engine=engine,
+                                                        output_options={"text_only": True}, max_file_pages=0)
+                    elapsed = time.perf_counter() - start
+                failed = sum(isinstance(output, Exception) for output in outputs)
+                results[mode] = (elapsed, server.requests["ocr"], failed)
+
+        print(f"{args.files} files of 1-3 pages, {args.jobs} parallel, {args.latency * 1000:.0f} ms stub latency")
+        print(f"{'mode':<10} {'time (s)':>9} {'ms/file':>8} {'OCR requests':>13} {'failed':>7}")
+        for mode, (elapsed, requests, failed) in results.items():
+            print(f"{mode:<10} {elapsed:>9.2f} {elapsed / args.files * 1000:>8.1f} {requests:>13} {failed:>7}")
+        print(f"speedup: {results['per file'][0] / results['bundled'][0]:.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
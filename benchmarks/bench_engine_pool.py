@@ -0,0 +1,90 @@
+"""
+引擎连接复用基准测试 (benchmarks/bench_engine_pool.py)
+对本地API替身批量处理若干个单页PDF，比较"每个文件新建客户端"与"所有文件共用一个 OCREngine"的耗时和连接数
+用法: python benchmarks/bench_engine_pool.py [--files 200] [--jobs 8] [--latency 0.005] [--no-tls]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from convert import process_pdf
+from engine import OCREngine
+from rate_limit import configure_rate_limiter
+from stub_server import StubServer
+
+def make_pdfs(directory: str, count: int) -> list:
+    """生成 count 个单页PDF"""
+    from PIL import Image
+
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"doc_{i}.pdf")
+        Image.new("RGB", (200, 200), (i % 256, 120, 120)).save(path, "PDF")
+        paths.append(path)
+    return paths
+
+def run_batch(paths: list, output_dir: str, jobs: int, engine_for_file) -> float:
+    """并发处理 paths，engine_for_file(path) 返回 (引擎, 处理完是否关闭)，返回耗时"""
+    def process(path):
+        engine, close_after = engine_for_file(path)
+        try:
+            process_pdf(path, "stub-key", output_base_dir=output_dir, max_workers=1, engine=engine,
+                        output_options={"text_only": True})
+        finally:
+            if close_after:
+                engine.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        list(executor.map(process, paths))
+    return time.perf_counter() - start
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="OCREngine 连接复用基准测试")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--jobs", type=int, default=8, help="同时处理的文件数")
+    parser.add_argument("--latency", type=float, default=0.005, help="替身每个请求的延迟(秒)")
+    parser.add_argument("--no-tls", action="store_true", help="使用明文HTTP(不计TLS握手开销)")
+    args = parser.parse_args(argv)
+
+    # 基准测试只关心连接开销，放开限流
+    configure_rate_limiter(requests_per_second=0, max_concurrency=args.jobs * 4)
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        input_dir = os.path.join(work_dir, "in")
+        os.makedirs(input_dir)
+        paths = make_pdfs(input_dir, args.files)
+        # 替身使用自签名证书，HTTPS时不校验证书
+        verify = args.no_tls
+        results = {}
+        for mode in ("per-file client", "shared engine"):
+            with StubServer(latency=args.latency, tls=not args.no_tls) as server:
+                shared = OCREngine("stub-key", server_url=server.url, verify=verify)
+                if mode == "per-file client":
+                    engine_for_file = lambda path: (OCREngine("stub-key", server_url=server.url, verify=verify), True)
+                else:
+                    engine_for_file = lambda path: (shared, False)
+                elapsed = run_batch(paths, os.path.join(work_dir, mode.replace(" ", "_")), args.jobs, engine_for_file)
+                shared.close()
+                results[mode] = (elapsed, server.connections, sum(server.requests.values()))
+
+        print(f"{args.files} files, {args.jobs} parallel, {'HTTP' if args.no_tls else 'HTTPS'}, "
+              f"{args.latency * 1000:.1f} ms stub latency")
+        print(f"{'mode':<18} {'time (s)':>9} {'files/s':>8} {'connections':>12} {'requests':>9}")
+        for mode, (elapsed, connections, requests) in results.items():
+            print(f"{mode:<18} {elapsed:>9.2f} {args.files / elapsed:>8.1f} {connections:>12} {requests:>9}")
+        speedup = results["per-file client"][0] / results["shared engine"][0]
+        print(f"speedup: {speedup:.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+图片直接识别基准测试 (benchmarks/bench_image_path.py)
+对本地API替身逐张处理手机照片大小的JPEG，比较"直接作为图片提交"与"先转换为PDF再提交"的单张耗时和CPU时间；
+替身在单独的进程中运行，CPU时间只包含本进程(客户端)的开销
+用法: python benchmarks/bench_image_path.py [--images 10] [--size 3024x4032] [--latency 0.05]
+"""
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from convert import process_pdf
+from engine import OCREngine
+from rate_limit import configure_rate_limiter
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def make_photos(directory: str, count: int, size: tuple) -> list:
+    """生成 count 张带噪点的JPEG，大小和压缩率接近手机照片"""
+    from PIL import Image
+
+    noise = Image.effect_noise(size, 40).convert("RGB")
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"photo_{i}.jpg")
+        tint = Image.new("RGB", size, (40 + i * 10 % 200, 120, 160))
+        Image.blend(noise, tint, 0.5).save(path, "JPEG", quality=85)
+        paths.append(path)
+    return paths
+
+def start_stub(latency: float) -> tuple:
+    """在子进程中启动API替身，返回 (进程, 地址)"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, "-u", os.path.join(BENCHMARK_DIR, "stub_server.py"), "--port", str(port),
+         "--latency", str(latency)],
+        stdout=subprocess.PIPE, text=True
+    )
+    process.stdout.readline()  # 等待替身开始监听
+    return process, f"http://127.0.0.1:{port}"
+
+def run_mode(paths: list, output_dir: str, server_url: str, native_images: bool) -> tuple:
+    """逐张处理，返回每张图片的 (耗时列表, CPU时间列表)，单位毫秒"""
+    wall_ms, cpu_ms = [], []
+    with OCREngine("stub-key", server_url=server_url, native_images=native_images) as engine:
+        for path in paths:
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            process_pdf(path, "stub-key", output_base_dir=output_dir, engine=engine,
+                        output_options={"text_only": True})
+            wall_ms.append((time.perf_counter() - wall_start) * 1000)
+            cpu_ms.append((time.process_time() - cpu_start) * 1000)
+    return wall_ms, cpu_ms
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="图片直接识别与转换为PDF的对比")
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--size", default="3024x4032", help="图片尺寸，宽x高")
+    parser.add_argument("--latency", type=float, default=0.05, help="替身每个请求的延迟(秒)")
+    args = parser.parse_args(argv)
+    size = tuple(int(value) for value in args.size.lower().split("x"))
+
+    configure_rate_limiter(requests_per_second=0)
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        input_dir = os.path.join(work_dir, "in")
+        os.makedirs(input_dir)
+        paths = make_photos(input_dir, args.images, size)
+        average_mb = sum(os.path.getsize(path) for path in paths) / len(paths) / 1024 / 1024
+        results = {}
+        for mode, native_images in (("convert to PDF", False), ("native image", True)):
+            stub, server_url = start_stub(args.latency)
+            try:
+                results[mode] = run_mode(paths, os.path.join(work_dir, mode.replace(" ", "_")),
+                                         server_url, native_images)
+            finally:
+                stub.terminate()
+                stub.wait()
+
+        print(f"{args.images} images of {size[0]}x{size[1]} ({average_mb:.1f} MB avg), "
+              f"{args.latency * 1000:.1f} ms stub latency")
+        print(f"{'mode':<15} {'median ms':>10} {'p90 ms':>8} {'cpu ms':>8}")
+        for mode, (wall_ms, cpu_ms) in results.items():
+            p90 = sorted(wall_ms)[int(len(wall_ms) * 0.9) - 1 if len(wall_ms) >= 10 else -1]
+            print(f"{mode:<15} {statistics.median(wall_ms):>10.1f} {p90:>8.1f} "
+                  f"{statistics.median(cpu_ms):>8.1f}")
+        convert_ms, native_ms = (statistics.median(results[mode][0]) for mode in results)
+        convert_cpu, native_cpu = (statistics.median(results[mode][1]) for mode in results)
+        print(f"latency: {convert_ms / native_ms:.2f}x faster, CPU: {convert_cpu / native_cpu:.2f}x less")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
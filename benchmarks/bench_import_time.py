@@ -0,0 +1,86 @@
+"""
+启动耗时基准测试 (benchmarks/bench_import_time.py)
+在全新的解释器中用 -X importtime 多次导入各模块，取累计耗时的中位数与预算比较，
+并检查不应在导入时加载的重型依赖；超出预算或加载了重型依赖时返回非零退出码
+用法: python benchmarks/bench_import_time.py [--repeat N] [--scale 系数] [模块 ...]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 各模块冷启动导入耗时预算(毫秒)
+IMPORT_BUDGETS_MS = {
+    "i18n": 15,
+    "convert": 50,
+    "cli": 60,
+    "async_convert": 100,
+    "gui": 150,
+}
+
+# 只应在第一次使用时才导入的依赖
+HEAVY_MODULES = {"mistralai", "httpx", "pydantic", "PyPDF2", "PIL", "tkinter", "tkinterdnd2"}
+# 图形界面本身需要 tkinter
+ALLOWED_HEAVY_MODULES = {"gui": {"tkinter", "tkinterdnd2"}}
+
+def measure_import(module: str) -> tuple:
+    """在新进程中导入 module，返回 (累计耗时微秒, 导入的所有模块名)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    cumulative_us = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not cumulative.isdigit():
+            continue  # 表头
+        imported.add(name)
+        if name == module:
+            cumulative_us = int(cumulative)
+    return cumulative_us, imported
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="模块导入耗时基准测试")
+    parser.add_argument("modules", nargs="*", default=list(IMPORT_BUDGETS_MS))
+    parser.add_argument("--repeat", type=int, default=5, help="每个模块导入的次数")
+    parser.add_argument("--scale", type=float, default=1.0, help="预算系数，较慢的机器上可以放宽")
+    args = parser.parse_args(argv)
+
+    # 先导入一次生成字节码缓存，避免把编译时间算进去
+    for module in args.modules:
+        subprocess.run([sys.executable, "-c", f"import {module}"], cwd=REPO_DIR, capture_output=True)
+
+    failed = False
+    print(f"{'module':<15} {'median (ms)':>12} {'budget (ms)':>12}  status")
+    for module in args.modules:
+        timings = []
+        heavy = set()
+        for _ in range(args.repeat):
+            cumulative_us, imported = measure_import(module)
+            timings.append(cumulative_us / 1000)
+            heavy |= {name.split(".")[0] for name in imported} & HEAVY_MODULES
+        heavy -= ALLOWED_HEAVY_MODULES.get(module, set())
+
+        median_ms = statistics.median(timings)
+        budget_ms = IMPORT_BUDGETS_MS.get(module, float("inf")) * args.scale
+        status = "ok"
+        if median_ms > budget_ms:
+            status = "OVER BUDGET"
+        if heavy:
+            status = f"{status if status != 'ok' else 'FAIL'} (imports {', '.join(sorted(heavy))})"
+        failed = failed or status != "ok"
+        print(f"{module:<15} {median_ms:>12.1f} {budget_ms:>12.1f}  {status}")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""
+直接提交基准测试 (benchmarks/bench_inline_submit.py)
+对带固定延迟的本地API替身批量处理小PDF，比较"上传+签名URL+OCR"与"data URL 直接提交"的耗时和请求数
+用法: python benchmarks/bench_inline_submit.py [--files 50] [--jobs 4] [--latency 0.05]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_engine_pool import make_pdfs, run_batch
+from convert import INLINE_MAX_MB
+from engine import OCREngine
+from rate_limit import configure_rate_limiter
+from stub_server import StubServer
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="data URL 直接提交基准测试")
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--jobs", type=int, default=4, help="同时处理的文件数")
+    parser.add_argument("--latency", type=float, default=0.05, help="替身每个请求的延迟(秒)，模拟网络往返")
+    args = parser.parse_args(argv)
+
+    configure_rate_limiter(requests_per_second=0, max_concurrency=args.jobs * 4)
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        input_dir = os.path.join(work_dir, "in")
+        os.makedirs(input_dir)
+        paths = make_pdfs(input_dir, args.files)
+        results = {}
+        for mode, inline_max_mb in (("upload", 0), ("inline", INLINE_MAX_MB)):
+            with StubServer(latency=args.latency) as server:
+                with OCREngine("stub-key", server_url=server.url, inline_max_mb=inline_max_mb) as engine:
+                    elapsed = run_batch(paths, os.path.join(work_dir, mode), args.jobs, lambda path: (engine, False))
+                results[mode] = (elapsed, sum(server.requests.values()))
+
+        print(f"{args.files} files, {args.jobs} parallel, {args.latency * 1000:.1f} ms stub latency")
+        print(f"{'mode':<8} {'time (s)':>9} {'ms/file':>8} {'requests':>9}")
+        for mode, (elapsed, requests) in results.items():
+            print(f"{mode:<8} {elapsed:>9.2f} {elapsed / args.files * args.jobs * 1000:>8.1f} {requests:>9}")
+        print(f"speedup: {results['upload'][0] / results['inline'][0]:.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+任务队列基准测试 (benchmarks/bench_job_queue.py)
+比较一次加入大量文件时原来的列表队列(逐个线性查重)与 SQLite 任务队列(索引去重、单个事务)的耗时，
+并测量多个线程领取和完成任务的速度
+用法: python benchmarks/bench_job_queue.py [--files 10000] [--workers 8]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_queue import JobQueue
+
+def add_to_list(file_paths: list) -> list:
+    """原 OCRApp.add_file_to_queue 的查重方式"""
+    file_queue = []
+    for file_path in file_paths:
+        if file_path not in file_queue:
+            file_queue.append(file_path)
+    return file_queue
+
+def drain(queue: JobQueue, workers: int) -> int:
+    """用 workers 个线程领取并完成所有任务，返回处理的任务数"""
+    count = [0]
+    lock = threading.Lock()
+
+    def work():
+        while True:
+            job = queue.claim()
+            if job is None:
+                return
+            queue.complete(job.id, "out")
+            with lock:
+                count[0] += 1
+
+    threads = [threading.Thread(target=work) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return count[0]
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="任务队列加入与领取基准测试")
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=8, help="同时领取任务的线程数")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        file_paths = [os.path.join(work_dir, "in", f"scan_{i:06d}.pdf") for i in range(args.files)]
+        # 拖放时常有重复文件，附带10%的重复路径
+        dropped = file_paths + file_paths[:args.files // 10]
+
+        start = time.perf_counter()
+        listed = add_to_list(dropped)
+        list_s = time.perf_counter() - start
+
+        queue = JobQueue(os.path.join(work_dir, "queue.sqlite"))
+        start = time.perf_counter()
+        added = queue.add_many(dropped)
+        queue_s = time.perf_counter() - start
+        assert len(listed) == len(added) == args.files
+
+        start = time.perf_counter()
+        again = queue.add_many(dropped)
+        readd_s = time.perf_counter() - start
+        assert not again
+
+        start = time.perf_counter()
+        drained = drain(queue, args.workers)
+        drain_s = time.perf_counter() - start
+        assert drained == args.files
+
+        print(f"{len(dropped)} dropped paths ({args.files} unique)")
+        print(f"{'step':<30} {'time (s)':>9}")
+        print(f"{'list queue, linear dedupe':<30} {list_s:>9.3f}")
+        print(f"{'SQLite queue, add_many':<30} {queue_s:>9.3f}")
+        print(f"{'SQLite queue, re-add (no-op)':<30} {readd_s:>9.3f}")
+        print(f"claim + complete with {args.workers} threads: {drain_s:.2f}s ({drained / drain_s:.0f} jobs/s)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""
+图片链接改写基准测试 (benchmarks/bench_markdown_rewrite.py)
+比较逐个 str.replace 与单次正则改写在图片数量增加时的耗时，单次改写应随图片数量线性增长
+用法: python benchmarks/bench_markdown_rewrite.py [最大图片数]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from convert import replace_images_in_markdown
+
+def replace_images_per_image(markdown_str: str, images_dict: dict) -> str:
+    """旧实现：每张图片都对整页文本做一次 str.replace"""
+    for img_name, img_path in images_dict.items():
+        markdown_str = markdown_str.replace(f"![{img_name}]({img_name})", f"![{img_name}]({img_path})")
+    return markdown_str
+
+def make_page(image_count: int):
+    """生成一页包含 image_count 张图片、每张图片之间有一段文字的markdown"""
+    paragraph = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4
+    images = {f"img-{i}.jpeg": f"images/{i:032x}.jpeg" for i in range(image_count)}
+    markdown = "\n\n".join(f"{paragraph}\n\n![{name}]({name})" for name in images)
+    return markdown, images
+
+def best_time(func, markdown: str, images: dict) -> float:
+    timer = timeit.Timer(lambda: func(markdown, images))
+    loops, _ = timer.autorange()
+    return min(timer.repeat(repeat=3, number=loops)) / loops
+
+def main(max_images: int = 3200) -> None:
+    counts = []
+    count = 100
+    while count <= max_images:
+        counts.append(count)
+        count *= 2
+
+    print(f"{'images':>8} {'per-image (ms)':>15} {'single-pass (ms)':>17} {'us/image':>9} {'speedup':>8}")
+    for count in counts:
+        markdown, images = make_page(count)
+        assert replace_images_in_markdown(markdown, images) == replace_images_per_image(markdown, images)
+        old = best_time(replace_images_per_image, markdown, images)
+        new = best_time(replace_images_in_markdown, markdown, images)
+        print(f"{count:>8} {old * 1000:>15.2f} {new * 1000:>17.2f} {new / count * 1e6:>9.2f} {old / new:>7.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3200)
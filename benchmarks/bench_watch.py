@@ -0,0 +1,114 @@
+"""
+监视文件夹基准测试 (benchmarks/bench_watch.py)
+模拟扫描仪每隔几秒向收件文件夹分段写入一个多页PDF，由 watch.py 的监视器交给带固定延迟的本地API替身处理，
+报告从文件出现到结果写出的延迟分布，并检查每个结果的页数完整(没有处理写到一半的文件)
+用法: python benchmarks/bench_watch.py [--files 20] [--interval 2] [--write-time 1] [--latency 0.5] [--polling]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from convert import get_output_dir
+from engine import OCREngine
+from rate_limit import configure_rate_limiter
+from stub_server import StubServer
+from watch import HotFolderRunner, HotFolderWatcher
+
+def make_scan(path: str, pages: int) -> bytes:
+    """生成一份 pages 页的扫描件，返回其内容"""
+    from PIL import Image
+
+    images = [Image.effect_noise((850, 1100), 30).convert("RGB") for _ in range(pages)]
+    images[0].save(path, "PDF", save_all=True, append_images=images[1:])
+    with open(path, 'rb') as f:
+        return f.read()
+
+def scanner(inbox: str, scans: list, interval: float, write_time: float) -> None:
+    """每 interval 秒开始写入一个文件，每个文件分10段在 write_time 秒内写完"""
+    for i, content in enumerate(scans):
+        started = time.monotonic()
+        step = max(1, len(content) // 10)
+        with open(os.path.join(inbox, f"scan_{i:03d}.pdf"), 'wb') as f:
+            for offset in range(0, len(content), step):
+                f.write(content[offset:offset + step])
+                f.flush()
+                time.sleep(write_time / 10)
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="监视文件夹的到达-结果延迟基准测试")
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=3, help="每个扫描件的页数")
+    parser.add_argument("--interval", type=float, default=2.0, help="扫描仪每隔多少秒产生一个文件")
+    parser.add_argument("--write-time", type=float, default=1.0, help="写完一个文件需要的秒数")
+    parser.add_argument("--latency", type=float, default=0.5, help="替身每个请求的延迟(秒)")
+    parser.add_argument("--settle", type=float, default=1.0, help="文件稳定时间(秒)")
+    parser.add_argument("--jobs", type=int, default=3, help="同时处理的文件数")
+    parser.add_argument("--polling", action="store_true", help="使用轮询而不是 inotify")
+    args = parser.parse_args(argv)
+
+    configure_rate_limiter(requests_per_second=0)
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        inbox = os.path.join(work_dir, "inbox")
+        output_dir = os.path.join(work_dir, "out")
+        os.makedirs(inbox)
+        scan = make_scan(os.path.join(work_dir, "scan.pdf"), args.pages)
+        events_path = os.path.join(work_dir, "events.jsonl")
+
+        with StubServer(latency=args.latency) as server:
+            with OCREngine("stub-key", server_url=server.url, file_workers=args.jobs) as engine:
+                runner = HotFolderRunner(engine, output_dir, output_options={"text_only": True},
+                                         events_path=events_path)
+                watcher = HotFolderWatcher([inbox], runner.submit, settle_seconds=args.settle,
+                                           use_inotify=not args.polling)
+                watch_thread = threading.Thread(target=watcher.run, daemon=True)
+                watch_thread.start()
+                start = time.perf_counter()
+                scanner(inbox, [scan] * args.files, args.interval, args.write_time)
+                # 等待最后一个文件处理完
+                deadline = time.monotonic() + args.settle + args.latency * 10 + 30
+                while runner.stats.summary()["done"] + runner.stats.summary()["failed"] < args.files:
+                    if time.monotonic() > deadline:
+                        break
+                    time.sleep(0.1)
+                elapsed = time.perf_counter() - start
+                watcher.stop()
+                watch_thread.join()
+                runner.close()
+
+        with open(events_path, encoding='utf-8') as f:
+            events = [json.loads(line) for line in f]
+        incomplete = 0
+        for event in events:
+            result_path = os.path.join(get_output_dir(event["path"], output_dir), "part_0.md")
+            with open(result_path, encoding='utf-8') as f:
+                if len(re.findall(r"^## ", f.read(), re.M)) != args.pages:
+                    incomplete += 1
+        summary = runner.stats.summary()
+
+        print(f"{args.files} scans of {args.pages} pages, one every {args.interval:.1f}s "
+              f"({args.write_time:.1f}s to write), {args.latency * 1000:.0f} ms stub latency, "
+              f"settle {args.settle:.1f}s, {watcher.mode}")
+        print(f"processed {summary['done']}/{args.files} in {elapsed:.1f}s, failed {summary['failed']}, "
+              f"incomplete results {incomplete}, OCR requests {server.requests['ocr']}")
+        if summary["done"]:
+            settle = sorted(event["settle_s"] for event in events)
+            print(f"arrival -> result: p50 {summary['p50_s']:.2f}s, p95 {summary['p95_s']:.2f}s, "
+                  f"max {summary['max_s']:.2f}s (of which waiting for the write to finish: "
+                  f"p50 {settle[len(settle) // 2]:.2f}s)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
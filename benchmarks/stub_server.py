@@ -0,0 +1,262 @@
+"""
+本地API替身 (benchmarks/stub_server.py)
+实现本项目用到的 Mistral 文件上传、下载、签名URL、删除、OCR和批处理任务接口，用于基准测试；
+可选TLS(自签名证书)和固定延迟，并统计建立的连接数与各接口的请求数
+用法: python benchmarks/stub_server.py [--port 8000] [--tls] [--latency 0.01]
+"""
+import argparse
+import base64
+import json
+import os
+import re
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 粗略统计PDF页数，避免替身依赖PyPDF2
+_PDF_PAGE_PATTERN = re.compile(rb"/Type\s*/Page(?!s)")
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, data: dict, status: int = 200) -> None:
+        self._send_bytes(json.dumps(data).encode("utf-8"), "application/json", status)
+
+    def _send_bytes(self, body: bytes, content_type: str, status: int = 200) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _multipart_fields(self, body: bytes) -> dict:
+        """解析 multipart/form-data 请求体，返回 {字段名: 内容}"""
+        header = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("latin-1")
+        message = BytesParser(policy=HTTP).parsebytes(header + body)
+        return {part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+                for part in message.iter_parts()}
+
+    def _count(self, endpoint: str) -> None:
+        with self.server.lock:
+            self.server.requests[endpoint] += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+    def do_POST(self):
+        body = self._read_body()
+        if self.path == "/v1/files":
+            self._count("upload")
+            fields = self._multipart_fields(body)
+            content = fields.get("file", b"")
+            purpose = (fields.get("purpose") or b"ocr").decode()
+            file_id = self.server.add_file(content)
+            self._send_json({
+                "id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                "filename": "upload", "purpose": purpose,
+                "sample_type": "batch_request" if purpose == "batch" else "ocr_input", "source": "upload",
+            })
+        elif self.path == "/v1/ocr":
+            self._count("ocr")
+            request = json.loads(body)
+            if self.server.reject_images and request.get("document", {}).get("type") == "image_url":
+                # 与真实接口的参数校验错误格式相同(HTTPValidationError)
+                self._send_json({"detail": [{"loc": ["body", "document"], "msg": "unsupported image",
+                                             "type": "value_error"}]}, 422)
+                return
+            self._send_json(self.server.ocr_response(request))
+        elif self.path == "/v1/batch/jobs":
+            self._count("batch_create")
+            self._send_json(self.server.create_batch_job(json.loads(body)))
+        else:
+            self._send_json({"detail": "not found"}, 404)
+
+    def do_GET(self):
+        match = re.fullmatch(r"/v1/files/([0-9a-f]+)/(url|content).*", self.path)
+        job_match = re.fullmatch(r"/v1/batch/jobs/([0-9a-f]+)", self.path)
+        if match and match.group(2) == "url":
+            self._count("signed_url")
+            self._send_json({"url": f"stub://{match.group(1)}"})
+        elif match:
+            self._count("download")
+            with self.server.lock:
+                content = self.server.files.get(match.group(1))
+            if content is None:
+                self._send_json({"detail": "not found"}, 404)
+            else:
+                self._send_bytes(content, "application/octet-stream")
+        elif job_match:
+            self._count("batch_get")
+            with self.server.lock:
+                job = self.server.batch_jobs.get(job_match.group(1))
+            self._send_json(dict(job) if job else {"detail": "not found"}, 200 if job else 404)
+        else:
+            self._send_json({"detail": "not found"}, 404)
+
+    def do_DELETE(self):
+        match = re.fullmatch(r"/v1/files/([0-9a-f]+)", self.path)
+        if match:
+            self._count("delete")
+            with self.server.lock:
+                self.server.files.pop(match.group(1), None)
+            self._send_json({"id": match.group(1), "object": "file", "deleted": True})
+        else:
+            self._send_json({"detail": "not found"}, 404)
+
+class StubServer(ThreadingHTTPServer):
+    """在后台线程中运行的API替身"""
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0, tls: bool = False, batch_delay: float = 0.0,
+                 reject_images: bool = False):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.latency = latency
+        # 为 True 时以422拒绝所有直接提交的图片，用于检查转换为PDF的回退
+        self.reject_images = reject_images
+        # 批处理任务从排队到完成所需的时间(秒)
+        self.batch_delay = batch_delay
+        self.lock = threading.Lock()
+        self.files = {}
+        self.batch_jobs = {}
+        self.connections = 0
+        self.requests = Counter()
+        self._cert_dir = None
+        if tls:
+            self._cert_dir = tempfile.mkdtemp()
+            cert_path, key_path = make_self_signed_cert(self._cert_dir)
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(cert_path, key_path)
+            self.socket = context.wrap_socket(self.socket, server_side=True)
+        self.scheme = "https" if tls else "http"
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"{self.scheme}://127.0.0.1:{self.server_address[1]}"
+
+    def document_bytes(self, document: dict) -> bytes:
+        """取出OCR请求引用的文档内容(已上传文件或 data: URL)"""
+        url = document.get("document_url") or document.get("image_url") or ""
+        if isinstance(url, dict):
+            url = url.get("url", "")
+        if url.startswith("stub://"):
+            with self.lock:
+                return self.files.get(url[len("stub://"):], b"")
+        if url.startswith("data:"):
+            return base64.b64decode(url.split(",", 1)[1])
+        return b""
+
+    def add_file(self, content: bytes) -> str:
+        file_id = uuid.uuid4().hex
+        with self.lock:
+            self.files[file_id] = content
+        return file_id
+
+    def create_batch_job(self, request: dict) -> dict:
+        """创建批处理任务，在后台线程中等待 batch_delay 后逐行执行"""
+        with self.lock:
+            lines = [line for file_id in request["input_files"]
+                     for line in self.files.get(file_id, b"").splitlines() if line.strip()]
+        job = {
+            "id": uuid.uuid4().hex, "object": "batch", "input_files": request["input_files"],
+            "endpoint": request["endpoint"], "model": request["model"], "metadata": request.get("metadata"),
+            "errors": [], "status": "QUEUED", "created_at": int(time.time()), "total_requests": len(lines),
+            "completed_requests": 0, "succeeded_requests": 0, "failed_requests": 0,
+            "output_file": None, "error_file": None, "started_at": None, "completed_at": None,
+        }
+        with self.lock:
+            self.batch_jobs[job["id"]] = job
+        threading.Thread(target=self._run_batch_job, args=(job, lines), daemon=True).start()
+        return dict(job)
+
+    def _run_batch_job(self, job: dict, lines: list) -> None:
+        time.sleep(self.batch_delay / 2)
+        with self.lock:
+            job.update(status="RUNNING", started_at=int(time.time()))
+        time.sleep(self.batch_delay / 2)
+        output = []
+        for line in lines:
+            request = json.loads(line)
+            body = {"model": job["model"], **request["body"]}
+            output.append(json.dumps({
+                "id": uuid.uuid4().hex, "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "body": self.ocr_response(body)}, "error": None,
+            }))
+        output_file = self.add_file(("\n".join(output) + "\n").encode("utf-8"))
+        with self.lock:
+            job.update(status="SUCCESS", output_file=output_file, completed_at=int(time.time()),
+                       completed_requests=len(lines), succeeded_requests=len(lines))
+
+    def ocr_response(self, request: dict) -> dict:
+        content = self.document_bytes(request.get("document", {}))
+        page_count = max(1, len(_PDF_PAGE_PATTERN.findall(content))) if content.startswith(b"%PDF") else 1
+        pages = [
+            {"index": i, "markdown": f"stub page {i + 1}", "images": [],
+             "dimensions": {"dpi": 200, "height": 2200, "width": 1700}}
+            for i in range(page_count)
+        ]
+        return {"pages": pages, "model": request.get("model", "mistral-ocr-latest"),
+                "usage_info": {"pages_processed": page_count, "doc_size_bytes": len(content)}}
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._cert_dir:
+            shutil.rmtree(self._cert_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def make_self_signed_cert(directory: str) -> tuple:
+    """用 openssl 生成 127.0.0.1 的自签名证书，返回 (证书路径, 私钥路径)"""
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-keyout", key_path, "-out", cert_path],
+        check=True, capture_output=True
+    )
+    return cert_path, key_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 Mistral API 替身")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟(秒)")
+    parser.add_argument("--tls", action="store_true", help="使用自签名证书提供HTTPS")
+    args = parser.parse_args()
+
+    server = StubServer(args.port, args.latency, args.tls)
+    print(f"Stub API listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
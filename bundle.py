@@ -0,0 +1,205 @@
+"""
+小文件合并模块 (bundle.py)
+把多个页数很少的PDF和图片合并成一个PDF，作为一次OCR请求提交，再把返回的页面按来源拆回各文件自己的输出目录
+(页码从每个文件的第1页重新开始)，使大量小文件分摊每次请求的固定延迟
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from convert import (
+    INLINE_MAX_MB,
+    OCR_MODEL,
+    convert_image_to_pdf,
+    finish_job,
+    get_document_page_count,
+    get_output_dir,
+    is_image_file,
+    job_options,
+    ocr_request_options,
+    request_ocr,
+    save_ocr_results,
+)
+from job_manifest import JobManifest
+
+if TYPE_CHECKING:
+    from mistralai.models import OCRResponse
+
+# 每个合并请求的页数与大小上限
+BUNDLE_MAX_PAGES = 50
+BUNDLE_MAX_MB = 20.0
+# 只合并不超过这些页数和大小的文件，较大的文件仍单独处理
+BUNDLE_FILE_MAX_PAGES = 5
+BUNDLE_FILE_MAX_MB = 5.0
+
+class BundleMember:
+    """合并请求中的一个文件及其在合并PDF中的页码范围"""
+
+    def __init__(self, file_path: str, output_dir: str, manifest: JobManifest, page_count: int, size: int):
+        self.file_path = file_path
+        self.output_dir = output_dir
+        self.manifest = manifest
+        self.page_count = page_count
+        self.size = size
+        self.cache_key = None
+        # 在合并PDF中的起始页(从0开始)
+        self.start_page = 0
+
+def plan_bundles(members: list, max_pages: int = BUNDLE_MAX_PAGES, max_mb: float = BUNDLE_MAX_MB) -> list:
+    """按原有顺序把文件依次装入合并请求，装满页数或大小上限时开始下一个"""
+    max_bytes = max_mb * 1024 * 1024
+    bundles = []
+    current, pages, size = [], 0, 0
+    for member in members:
+        if current and (pages + member.page_count > max_pages or size + member.size > max_bytes):
+            bundles.append(current)
+            current, pages, size = [], 0, 0
+        current.append(member)
+        pages += member.page_count
+        size += member.size
+    if current:
+        bundles.append(current)
+    return bundles
+
+def write_bundle_pdf(bundle: list, output_path: str, temp_dir: str) -> int:
+    """把 bundle 中的文件按顺序合并为一个PDF(图片先转换为单页PDF)，记录每个文件的起始页，返回总页数"""
+    import PyPDF2
+
+    writer = PyPDF2.PdfWriter()
+    page_count = 0
+    for index, member in enumerate(bundle):
+        pdf_path = member.file_path
+        if is_image_file(pdf_path):
+            pdf_path = convert_image_to_pdf(pdf_path, os.path.join(temp_dir, f"{index}_{Path(pdf_path).stem}.pdf"))
+        reader = PyPDF2.PdfReader(pdf_path)
+        member.start_page = page_count
+        member.page_count = len(reader.pages)
+        for page in reader.pages:
+            writer.add_page(page)
+        page_count += member.page_count
+
+    with open(output_path, 'wb') as f:
+        writer.write(f)
+    return page_count
+
+def split_bundle_response(ocr_response: OCRResponse, bundle: list):
+    """把合并请求的结果拆成每个文件自己的 OCRResponse，页面索引从0重新开始。yield (文件, 结果)"""
+    total_pages = sum(member.page_count for member in bundle)
+    if len(ocr_response.pages) != total_pages:
+        raise ValueError(f"Bundle returned {len(ocr_response.pages)} pages, expected {total_pages}")
+
+    for member in bundle:
+        pages = ocr_response.pages[member.start_page:member.start_page + member.page_count]
+        update = {"pages": [page.model_copy(update={"index": i}) for i, page in enumerate(pages)]}
+        if ocr_response.usage_info is not None:
+            update["usage_info"] = ocr_response.usage_info.model_copy(
+                update={"pages_processed": len(pages), "doc_size_bytes": member.size}
+            )
+        yield member, ocr_response.model_copy(update=update)
+
+def finish_member(member: BundleMember, ocr_response: OCRResponse, output_options: dict = None,
+                  search_index=None) -> str:
+    """保存一个文件的结果并完成它的任务清单，返回输出目录"""
+    partial_file = save_ocr_results(ocr_response, member.output_dir, 0, **(output_options or {}))
+    member.manifest.set_chunks([(0, len(ocr_response.pages))], len(ocr_response.pages))
+    member.manifest.mark_done(0, partial_file)
+    finish_job(member.manifest, search_index)
+    return member.output_dir
+
+def process_bundle(bundle: list, client, cache=None, output_options: dict = None, search_index=None,
+                   inline_max_mb: float = INLINE_MAX_MB) -> dict:
+    """把 bundle 合并为一次OCR请求，结果拆回各文件的输出目录。返回 {文件路径: 输出目录}"""
+    output_options = output_options or {}
+    ocr_options = ocr_request_options(output_options)
+    temp_dir = tempfile.mkdtemp()
+    try:
+        bundle_path = os.path.join(temp_dir, "bundle.pdf")
+        write_bundle_pdf(bundle, bundle_path, temp_dir)
+        content = Path(bundle_path).read_bytes()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    # 合并后的内容每次都不同，不查缓存；拆分后按每个文件自己的内容写入缓存
+    ocr_response = request_ocr(content, "bundle", client, None, ocr_options, inline_max_mb)
+
+    output_dirs = {}
+    for member, member_response in split_bundle_response(ocr_response, bundle):
+        if cache is not None and member.cache_key is not None:
+            cache.put(member.cache_key, member_response)
+        output_dirs[member.file_path] = finish_member(member, member_response, output_options, search_index)
+    return output_dirs
+
+def process_files_bundled(file_paths: list, api_key: str = None, output_base_dir: str = None, engine=None,
+                          cache=None, output_options: dict = None, search_index=None,
+                          max_bundle_pages: int = BUNDLE_MAX_PAGES, max_bundle_mb: float = BUNDLE_MAX_MB,
+                          max_file_pages: int = BUNDLE_FILE_MAX_PAGES, max_file_mb: float = BUNDLE_FILE_MAX_MB,
+                          progress_callback=None, **process_kwargs) -> list:
+    """
+    处理多个文件：小文件合并为若干个请求，其余文件照常由 process_pdf 处理(process_kwargs 传给它)。
+    合并请求失败时，其中的文件改为逐个处理，一个有问题的文件不会拖累同批的其他文件。
+    返回与 file_paths 顺序一致的列表，成功时为输出目录，失败时为对应的异常。
+    progress_callback 接收 (已完成文件数, 文件总数, 消息)。
+    """
+    if engine is None:
+        from engine import get_engine
+        engine = get_engine(api_key)
+    output_options = output_options or {}
+    ocr_options = ocr_request_options(output_options)
+    max_file_bytes = max_file_mb * 1024 * 1024
+
+    results = {}
+    members = []
+    singles = []
+    for file_path in file_paths:
+        try:
+            size = os.path.getsize(file_path)
+            page_count = get_document_page_count(file_path) if size <= max_file_bytes else None
+            if page_count is None or page_count > max_file_pages:
+                singles.append(file_path)
+                continue
+            output_dir = get_output_dir(file_path, output_base_dir)
+            os.makedirs(output_dir, exist_ok=True)
+            manifest = JobManifest.load(output_dir, file_path, job_options(output_options))
+            if manifest.is_complete():
+                singles.append(file_path)  # process_pdf 只需完成合并与索引
+                continue
+            member = BundleMember(file_path, output_dir, manifest, page_count, size)
+            if cache is not None:
+                # 与单独处理时的缓存键相同，之前处理过的文件不必再进入合并请求
+                member.cache_key = cache.make_key(Path(file_path).read_bytes(), OCR_MODEL, ocr_options)
+                cached_response = cache.get(member.cache_key)
+                if cached_response is not None:
+                    results[file_path] = finish_member(member, cached_response, output_options, search_index)
+                    continue
+            members.append(member)
+        except Exception as e:
+            results[file_path] = e
+
+    def run_bundle(bundle):
+        try:
+            return process_bundle(bundle, engine.client, cache, output_options, search_index, engine.inline_max_mb)
+        except Exception:
+            return {member.file_path: run_single(member.file_path) for member in bundle}
+
+    def run_single(file_path):
+        try:
+            return engine.process_pdf(file_path, None, output_base_dir, cache=cache, output_options=output_options,
+                                      search_index=search_index, **process_kwargs)
+        except Exception as e:
+            return e
+
+    bundles = plan_bundles(members, max_bundle_pages, max_bundle_mb)
+    with ThreadPoolExecutor(max_workers=max(1, engine.file_workers)) as executor:
+        futures = [executor.submit(run_bundle, bundle) for bundle in bundles]
+        futures += [executor.submit(lambda path: {path: run_single(path)}, path) for path in singles]
+        for future in as_completed(futures):
+            results.update(future.result())
+            if progress_callback:
+                progress_callback(len(results), len(file_paths),
+                                  f"{len(results)}/{len(file_paths)} files ({len(bundles)} bundles)")
+    return [results[file_path] for file_path in file_paths]
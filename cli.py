@@ -0,0 +1,240 @@
+"""
+命令行批处理模块 (cli.py)
+无界面批量处理PDF和图像文件，适用于服务器和定时任务；不会导入任何GUI模块
+用法: python cli.py [选项] 文件/目录/通配符 ...
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import i18n
+from batch import DEFAULT_POLL_INTERVAL, process_pdfs_batch
+from bundle import process_files_bundled
+from convert import (
+    DEFAULT_CHUNK_CONCURRENCY,
+    DEFAULT_FILE_CONCURRENCY,
+    DEFAULT_IMAGE_QUALITY,
+    INLINE_MAX_MB,
+    TRANSCODE_FORMATS,
+    Config,
+    get_document_page_count,
+    is_image_file,
+)
+from engine import OCREngine
+from ocr_cache import OCRCache
+from rate_limit import DEFAULT_MAX_CONCURRENCY, DEFAULT_REQUESTS_PER_SECOND, configure_rate_limiter
+from search_index import SearchIndex
+from uploads import get_upload_registry
+
+def is_supported_file(file_path: str) -> bool:
+    return file_path.lower().endswith('.pdf') or is_image_file(file_path)
+
+def discover_files(patterns: list, recursive: bool = False) -> list:
+    """
+    把文件、目录和通配符展开为待处理文件列表(去重并保持顺序)。
+    目录只取其中的PDF和图像文件，recursive 为 True 时包含子目录；通配符支持 ** 。
+    """
+    files = []
+    seen = set()
+
+    def add(file_path):
+        key = os.path.abspath(file_path)
+        if key not in seen and is_supported_file(file_path):
+            seen.add(key)
+            files.append(file_path)
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, names in os.walk(pattern):
+                dirs.sort()
+                for name in sorted(names):
+                    add(os.path.join(root, name))
+                if not recursive:
+                    break
+        elif os.path.isfile(pattern):
+            add(pattern)
+        else:
+            for match in sorted(glob.glob(pattern, recursive=recursive or "**" in pattern)):
+                if os.path.isfile(match):
+                    add(match)
+    return files
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Mistral OCR 命令行批处理")
+    parser.add_argument("inputs", nargs="+", help="PDF/图像文件、目录或通配符")
+    parser.add_argument("-r", "--recursive", action="store_true", help="递归处理子目录")
+    parser.add_argument("-o", "--output-dir", default=None, help="结果保存位置(默认为当前目录)")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_FILE_CONCURRENCY, help="同时处理的文件数")
+    parser.add_argument("--chunk-workers", type=int, default=DEFAULT_CHUNK_CONCURRENCY, help="每个文件同时处理的分块数")
+    parser.add_argument("--max-pages-per-chunk", type=int, default=None, help="每个请求的最大页数")
+    parser.add_argument("--rps", type=float, default=DEFAULT_REQUESTS_PER_SECOND, help="每秒最多发出的API请求数")
+    parser.add_argument("--max-requests", type=int, default=DEFAULT_MAX_CONCURRENCY, help="同时进行的API请求数上限")
+    parser.add_argument("--inline-max-mb", type=float, default=INLINE_MAX_MB,
+                        help="不超过此大小(MB)的分块直接随OCR请求发送，0 表示总是上传")
+    parser.add_argument("--convert-images", action="store_true",
+                        help="图片总是先转换为PDF再识别(默认JPEG/PNG直接提交)")
+    parser.add_argument("--text-only", action="store_true", help="仅保存文本，不请求图片")
+    parser.add_argument("--image-format", choices=sorted(TRANSCODE_FORMATS), default=None, help="把图片转码为指定格式")
+    parser.add_argument("--image-quality", type=int, default=DEFAULT_IMAGE_QUALITY, help="转码质量")
+    parser.add_argument("--shared-images", action="store_true", help="同一保存位置的文档共享图片目录")
+    parser.add_argument("--no-cache", action="store_true", help="不使用OCR结果缓存")
+    parser.add_argument("--index", action="store_true", help="处理完成后写入全文索引")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--batch", action="store_true",
+                      help="使用 Batch API 提交所有分块(延迟高、吞吐量大，适合大批量任务)")
+    mode.add_argument("--bundle", action="store_true",
+                      help="把页数很少的文件合并为一次请求提交，再拆回各自的输出目录")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, help="批处理任务状态的查询间隔(秒)")
+    parser.add_argument("--server-url", default=None, help="API服务器地址(默认为 Mistral 官方地址)")
+    parser.add_argument("--api-key", default=None, help="Mistral API密钥(默认读取 MISTRAL_API_KEY 或已保存的密钥)")
+    parser.add_argument("--lang", choices=sorted(i18n.LANGUAGES), default=None, help="输出目录名称使用的语言")
+    parser.add_argument("--summary", default="-", help="JSON摘要输出文件，- 表示标准输出")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不在标准错误输出中显示进度")
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    # 与图形界面使用相同的语言偏好，使输出目录名称一致
+    lang = args.lang or i18n.load_language_preference()
+    if lang:
+        i18n.change_language(lang)
+
+    api_key = args.api_key or os.environ.get("MISTRAL_API_KEY") or Config.load_api_key()
+    if not api_key:
+        print("缺少API密钥: 请使用 --api-key 或设置 MISTRAL_API_KEY", file=sys.stderr)
+        return 2
+
+    files = discover_files(args.inputs, args.recursive)
+    if not files:
+        print("没有找到PDF或图像文件", file=sys.stderr)
+        return 2
+
+    # 所有文件共用一个引擎(连接池)和一个限流器
+    engine = OCREngine(api_key, server_url=args.server_url, chunk_workers=args.chunk_workers, file_workers=args.jobs,
+                       inline_max_mb=args.inline_max_mb, native_images=not args.convert_images)
+    rate_limiter = configure_rate_limiter(requests_per_second=args.rps, max_concurrency=args.max_requests)
+    cache = None if args.no_cache else OCRCache()
+    search_index = SearchIndex() if args.index else None
+    output_options = {
+        "image_format": args.image_format,
+        "image_quality": args.image_quality,
+        "shared_image_store": args.shared_images,
+        "text_only": args.text_only,
+    }
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    print_lock = threading.Lock()
+
+    def log(message):
+        if not args.quiet:
+            with print_lock:
+                print(message, file=sys.stderr, flush=True)
+
+    def process_file(file_path):
+        result = {"path": file_path, "status": "done", "pages": None, "output_dir": None,
+                  "duration_s": None, "error": None}
+        start = time.perf_counter()
+        try:
+            result["pages"] = get_document_page_count(file_path)
+            log(f"[start] {file_path} ({result['pages']} pages)")
+            result["output_dir"] = engine.process_pdf(
+                file_path, None, args.output_dir,
+                cache=cache, max_pages_per_chunk=args.max_pages_per_chunk,
+                output_options=output_options, search_index=search_index
+            )
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["duration_s"] = round(time.perf_counter() - start, 3)
+        log(f"[{result['status']}] {file_path} in {result['duration_s']:.1f}s"
+            + (f": {result['error']}" if result["error"] else ""))
+        return result
+
+    def process_together(run):
+        """
+        批处理和合并模式：run(文件列表) 一次处理所有文件并返回每个文件的输出目录或异常。
+        文件是在同一个任务中一起处理的，每个文件的 duration_s 是整个任务的耗时按页数分摊的部分。
+        """
+        file_results = []
+        for file_path in files:
+            result = {"path": file_path, "status": "done", "pages": None, "output_dir": None,
+                      "duration_s": 0.0, "error": None}
+            try:
+                result["pages"] = get_document_page_count(file_path)
+            except Exception as e:
+                result["status"] = "failed"
+                result["error"] = f"{type(e).__name__}: {e}"
+            file_results.append(result)
+
+        submitted = [result for result in file_results if result["status"] == "done"]
+        job_start = time.perf_counter()
+        outputs = run([result["path"] for result in submitted])
+        elapsed = time.perf_counter() - job_start
+        # 页数未知的文件按1页计算
+        total_pages = sum(result["pages"] or 1 for result in submitted)
+        for result, output in zip(submitted, outputs):
+            result["duration_s"] = round(elapsed * (result["pages"] or 1) / total_pages, 3)
+            if isinstance(output, Exception):
+                result["status"] = "failed"
+                result["error"] = f"{type(output).__name__}: {output}"
+            else:
+                result["output_dir"] = output
+        return dict(enumerate(file_results))
+
+    started_at = time.time()
+    start = time.perf_counter()
+    results = {}
+    if args.batch:
+        with engine:
+            results = process_together(lambda paths: process_pdfs_batch(
+                paths, output_base_dir=args.output_dir, engine=engine, cache=cache,
+                max_pages_per_chunk=args.max_pages_per_chunk, output_options=output_options,
+                search_index=search_index, poll_interval=args.poll_interval,
+                progress_callback=lambda done, total, message: log(f"[batch] {message}")
+            ))
+    elif args.bundle:
+        with engine:
+            results = process_together(lambda paths: process_files_bundled(
+                paths, output_base_dir=args.output_dir, engine=engine, cache=cache,
+                output_options=output_options, search_index=search_index,
+                progress_callback=lambda done, total, message: log(f"[bundle] {message}"),
+                max_pages_per_chunk=args.max_pages_per_chunk
+            ))
+    else:
+        with engine, ThreadPoolExecutor(max_workers=max(1, engine.file_workers)) as executor:
+            futures = {executor.submit(process_file, file_path): index for index, file_path in enumerate(files)}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+
+    file_results = [results[index] for index in range(len(files))]
+    failed = sum(result["status"] == "failed" for result in file_results)
+    summary = {
+        "started_at": started_at,
+        "duration_s": round(time.perf_counter() - start, 3),
+        "total": len(file_results),
+        "succeeded": len(file_results) - failed,
+        "failed": failed,
+        "pages": sum(result["pages"] or 0 for result in file_results if result["status"] == "done"),
+        "api": rate_limiter.stats(),
+        "uploads": get_upload_registry().stats(),
+        "files": file_results,
+    }
+
+    if args.summary == "-":
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        log(f"摘要已写入 {args.summary}")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
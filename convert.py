@@ -1,39 +1,102 @@
-from mistralai import Mistral
+from __future__ import annotations
+
 from pathlib import Path
 import os
+import io
 import base64
-from mistralai import DocumentURLChunk
-from mistralai.models import OCRResponse
-import PyPDF2
+import hashlib
+import importlib.util
+import re
 import tempfile
 import shutil
-import tkinter as tk
-from tkinter import filedialog, ttk, messagebox
 import json
 import threading
-import subprocess
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, NamedTuple
+
+# mistralai、PyPDF2 和 Pillow 导入较慢，只在第一次用到时才在函数内导入，
+# 这样只需要分割PDF或读取结果的程序不必加载整个SDK
+if TYPE_CHECKING:
+    from mistralai import Mistral
+    from mistralai.models import OCRResponse
 
 # 导入国际化支持模块
 import i18n
 from i18n import _
 
-# 导入Pillow库用于图像处理
-try:
-    from PIL import Image
-    PILLOW_AVAILABLE = True
-except ImportError:
-    PILLOW_AVAILABLE = False
+from job_manifest import JobManifest
+from rate_limit import get_rate_limiter
+from uploads import get_upload_registry
 
-# 尝试导入tkinterdnd2用于拖放功能
-try:
-    from tkinterdnd2 import DND_FILES, TkinterDnD
-    TKDND_AVAILABLE = True
-except ImportError:
-    TKDND_AVAILABLE = False
+# Pillow库用于图像处理(只检查是否安装，不在启动时导入)
+PILLOW_AVAILABLE = importlib.util.find_spec("PIL") is not None
 
 # 支持的图像格式
 SUPPORTED_IMAGE_FORMATS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif']
 
+# OCR接口可以直接识别的图像格式，这些图片不再转换为PDF；其他格式仍先转换
+NATIVE_IMAGE_MIME_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+}
+
+# 接口拒绝输入内容时返回的状态码，直接提交图片遇到这些错误时改为转换成PDF后重试
+REJECTED_INPUT_STATUS_CODES = {400, 415, 422}
+
+# 使用的OCR模型
+OCR_MODEL = "mistral-ocr-latest"
+
+# 单次请求的PDF大小上限(MB)，超过则分割，低于API的50MB限制以留出余量
+MAX_CHUNK_SIZE_MB = 45.0
+
+# 每个分块的最大页数，None 表示只按大小分割；设置后大文件可按页数拆成多个并发请求
+DEFAULT_MAX_CHUNK_PAGES = None
+
+# 估算分块大小时，每个PDF对象(对象头、endobj、xref条目)及每个分块文件的固定开销(字节)
+PDF_OBJECT_OVERHEAD_BYTES = 40
+PDF_FILE_OVERHEAD_BYTES = 1024
+
+# 同时进行OCR的分块数量上限
+DEFAULT_CHUNK_CONCURRENCY = 4
+
+# 不超过此大小(MB)的分块以 base64 data URL 直接随OCR请求发送，省去上传和获取签名URL两次往返；
+# base64 会使请求体增大约三分之一，更大的分块仍走上传流程。0 或 None 表示总是上传
+INLINE_MAX_MB = 4.0
+
+# 解码和写入图片的线程数量
+IMAGE_IO_WORKERS = 8
+
+# 根据 data URI 的 MIME 类型或文件头确定图片扩展名
+IMAGE_MIME_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/jpg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/bmp": ".bmp",
+    "image/tiff": ".tiff",
+}
+IMAGE_MAGIC_BYTES = [
+    (b"\x89PNG", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF8", ".gif"),
+    (b"BM", ".bmp"),
+    (b"II*\x00", ".tiff"),
+    (b"MM\x00*", ".tiff"),
+]
+
+# 在同一保存位置的多个文档之间共享的图片目录名
+SHARED_IMAGES_DIR = "shared_images"
+
+# 可选的图片转码格式及默认质量
+TRANSCODE_FORMATS = {"webp": ".webp", "jpeg": ".jpg", "png": ".png"}
+DEFAULT_IMAGE_QUALITY = 80
+
+# GUI中同时处理的文件数量默认值
+DEFAULT_FILE_CONCURRENCY = 3
+
 def convert_image_to_pdf(image_path, output_path=None):
     """将图像文件转换为PDF"""
     if not PILLOW_AVAILABLE:
@@ -43,6 +106,8 @@ def convert_image_to_pdf(image_path, output_path=None):
     if output_path is None:
         output_path = os.path.splitext(image_path)[0] + ".pdf"
     
+    from PIL import Image
+    
     # 打开图像文件
     image = Image.open(image_path)
     
@@ -60,43 +125,222 @@ def is_image_file(file_path):
     ext = os.path.splitext(file_path)[1].lower()
     return ext in SUPPORTED_IMAGE_FORMATS
 
+def native_image_mime_type(file_path):
+    """OCR接口可直接识别的图像返回其MIME类型，否则返回 None"""
+    return NATIVE_IMAGE_MIME_TYPES.get(os.path.splitext(file_path)[1].lower())
+
+def is_rejected_input(error: Exception) -> bool:
+    """接口是否因为输入内容本身(格式、尺寸等)拒绝了请求"""
+    if getattr(error, "status_code", None) in REJECTED_INPUT_STATUS_CODES:
+        return True
+    # SDK 把422的参数校验错误解析为 HTTPValidationError，它没有 status_code
+    from mistralai.models import HTTPValidationError
+
+    return isinstance(error, HTTPValidationError)
+
+# Markdown image links: ![alt](target)
+_IMAGE_LINK_PATTERN = re.compile(r"!\[([^\]]*)\]\(([^)]*)\)")
+
 def replace_images_in_markdown(markdown_str: str, images_dict: dict) -> str:
-    for img_name, img_path in images_dict.items():
-        markdown_str = markdown_str.replace(f"![{img_name}]({img_name})", f"![{img_name}]({img_path})")
-    return markdown_str
+    """
+    Point every ![name](name) link whose name is in images_dict at its saved file.
+    All links are rewritten in a single pass over the page, so the cost is linear in page length and image count.
+    """
+    if not images_dict:
+        return markdown_str
+    
+    def rewrite_link(match):
+        img_name = match.group(2)
+        if match.group(1) == img_name and img_name in images_dict:
+            return f"![{img_name}]({images_dict[img_name]})"
+        return match.group(0)
+    
+    return _IMAGE_LINK_PATTERN.sub(rewrite_link, markdown_str)
 
-def save_ocr_results(ocr_response: OCRResponse, output_dir: str, page_offset: int = 0) -> None:
-    # Create output directory
-    os.makedirs(output_dir, exist_ok=True)
-    images_dir = os.path.join(output_dir, "images")
-    os.makedirs(images_dir, exist_ok=True)
-    
-    all_markdowns = []
-    for i, page in enumerate(ocr_response.pages):
-        # Save images
-        page_images = {}
-        for img in page.images:
-            # Create a unique ID for images to avoid conflicts when merging
-            unique_img_id = f"part{page_offset}_page{i}_{img.id}"
-            img_data = base64.b64decode(img.image_base64.split(',')[1])
-            img_path = os.path.join(images_dir, f"{unique_img_id}.png")
-            with open(img_path, 'wb') as f:
+def format_page_header(page_number: int) -> str:
+    """Localized markdown header placed before each page."""
+    return f"## {_('page_title').format(page_number)}\n\n"
+
+# Separator between pages (and between parts) in the markdown output
+PAGE_SEPARATOR = b"\n\n"
+# Sidecar file next to each markdown file mapping page numbers to byte ranges
+PAGE_INDEX_SUFFIX = ".pages.json"
+MERGE_BUFFER_SIZE = 1024 * 1024
+
+def page_index_path(markdown_path: str) -> str:
+    return os.path.splitext(markdown_path)[0] + PAGE_INDEX_SUFFIX
+
+def write_page_index(markdown_path: str, page_ranges: dict) -> None:
+    """Write the page index for markdown_path: {page number: [start byte, end byte)}."""
+    index_path = page_index_path(markdown_path)
+    data = {
+        "file": os.path.basename(markdown_path),
+        "pages": {str(page): [start, end] for page, (start, end) in sorted(page_ranges.items())},
+    }
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(index_path), suffix=".tmp")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(temp_path, index_path)
+
+def read_page_index(markdown_path: str) -> dict:
+    """Return {page number: (start byte, end byte)} for markdown_path, or {} if it has no index."""
+    try:
+        with open(page_index_path(markdown_path), 'r', encoding='utf-8') as f:
+            pages = json.load(f)["pages"]
+    except (OSError, ValueError, KeyError):
+        return {}
+    return {int(page): (start, end) for page, (start, end) in pages.items()}
+
+def read_page(markdown_path: str, page_number: int) -> str:
+    """Read a single page (header included) from a markdown result by seeking to its indexed byte range."""
+    start, end = read_page_index(markdown_path)[page_number]
+    with open(markdown_path, 'rb') as f:
+        f.seek(start)
+        return f.read(end - start).decode('utf-8')
+
+_image_io_pool = None
+_image_io_pool_lock = threading.Lock()
+
+def get_image_io_pool() -> ThreadPoolExecutor:
+    """Shared bounded pool for decoding and writing OCR images."""
+    global _image_io_pool
+    with _image_io_pool_lock:
+        if _image_io_pool is None:
+            _image_io_pool = ThreadPoolExecutor(max_workers=IMAGE_IO_WORKERS, thread_name_prefix="image-io")
+        return _image_io_pool
+
+def split_image_data_uri(image_base64: str) -> tuple:
+    """Split an OCR image payload into (MIME type or None, base64 data)."""
+    if image_base64.startswith("data:"):
+        header, _, data = image_base64.partition(",")
+        return header[5:].split(";")[0] or None, data
+    return None, image_base64
+
+def detect_image_extension(mime_type: str, data: str) -> str:
+    """Pick the file extension from the data URI MIME type, falling back to the magic bytes."""
+    if mime_type in IMAGE_MIME_EXTENSIONS:
+        return IMAGE_MIME_EXTENSIONS[mime_type]
+    
+    # 16 base64 characters decode to the first 12 bytes, enough for every signature we know
+    head = base64.b64decode(data[:16] + "=" * (-len(data[:16]) % 4))
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    for magic, extension in IMAGE_MAGIC_BYTES:
+        if head.startswith(magic):
+            return extension
+    return ".png"
+
+def write_image_file(data: str, img_path: str, image_format: str = None,
+                     image_quality: int = DEFAULT_IMAGE_QUALITY) -> None:
+    """
+    Decode a base64 image and write it to img_path, transcoding it to image_format if given.
+    The file is written under a temporary name and renamed, so a shared store never exposes half-written images.
+    """
+    img_data = base64.b64decode(data)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(img_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if not image_format:
                 f.write(img_data)
-            page_images[img.id] = f"images/{unique_img_id}.png"
-        
-        # Process markdown content
-        page_markdown = replace_images_in_markdown(page.markdown, page_images)
-        
-        # Add page number information
-        actual_page_num = page_offset + i + 1
-        page_markdown = f"## 第 {actual_page_num} 页\n\n{page_markdown}"
-        
-        all_markdowns.append(page_markdown)
+            else:
+                from PIL import Image
+                with Image.open(io.BytesIO(img_data)) as image:
+                    if image_format == "jpeg" and image.mode not in ("RGB", "L"):
+                        image = image.convert("RGB")
+                    image.save(f, image_format.upper(), quality=image_quality)
+        os.replace(temp_path, img_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def image_content_name(data: str, extension: str, image_format: str = None,
+                       image_quality: int = DEFAULT_IMAGE_QUALITY) -> str:
+    """Content-addressed file name for an image: identical payloads (and transcode settings) share one file."""
+    digest = hashlib.sha256(data.encode("ascii"))
+    if image_format:
+        digest.update(f"|{image_format}|{image_quality}".encode("ascii"))
+    return f"{digest.hexdigest()[:32]}{extension}"
+
+def save_ocr_results(ocr_response: OCRResponse, output_dir: str, page_offset: int = 0,
+                     image_format: str = None, image_quality: int = DEFAULT_IMAGE_QUALITY,
+                     shared_image_store: bool = False, text_only: bool = False, page_headers: bool = True) -> None:
+    """
+    Save one chunk's OCR response as part_{page_offset}.md plus its images.
+    Images are stored once per content hash, so a logo repeated on every page is a single file.
+    They are decoded and written on a bounded I/O pool while the pages are streamed to disk, with the
+    extension taken from the data URI or the magic bytes. image_format ("webp", "jpeg", "png")
+    transcodes every image with Pillow at image_quality. With shared_image_store, images go to a
+    shared_images directory next to output_dir that all documents in the same base directory use.
+    text_only saves the markdown alone: no images directory is created and image references are left as placeholders.
+    page_headers=False writes the pages without the localized "## Page N" headers, separated only by blank lines.
+    """
+    if image_format and not text_only:
+        if image_format not in TRANSCODE_FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+        if not PILLOW_AVAILABLE:
+            raise ImportError("需要安装Pillow库以支持图像转换: pip install pillow")
     
-    # Save partial results
+    # Create output directory
+    os.makedirs(output_dir, exist_ok=True)
+    if text_only:
+        images_dir = None
+    elif shared_image_store:
+        images_dir = os.path.join(os.path.dirname(os.path.abspath(output_dir)), SHARED_IMAGES_DIR)
+        images_link_prefix = f"../{SHARED_IMAGES_DIR}/"
+    else:
+        images_dir = os.path.join(output_dir, "images")
+        images_link_prefix = "images/"
+    if images_dir:
+        os.makedirs(images_dir, exist_ok=True)
+    
+    image_pool = get_image_io_pool()
+    image_writes = []
+    scheduled_images = set()
+    
+    # Pages are written straight to a temporary file that only becomes part_{page_offset}.md once
+    # every image is saved, so a failed chunk never leaves a partial result behind.
+    # The byte range of every page goes to the part's page index.
     partial_md_path = os.path.join(output_dir, f"part_{page_offset}.md")
-    with open(partial_md_path, 'w', encoding='utf-8') as f:
-        f.write("\n\n".join(all_markdowns))
+    page_ranges = {}
+    fd, temp_md_path = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for i, page in enumerate(ocr_response.pages):
+                # Save images
+                page_images = {}
+                for img in page.images:
+                    if text_only or not img.image_base64:
+                        continue
+                    mime_type, data = split_image_data_uri(img.image_base64)
+                    extension = TRANSCODE_FORMATS[image_format] if image_format else detect_image_extension(mime_type, data)
+                    img_name = image_content_name(data, extension, image_format, image_quality)
+                    img_path = os.path.join(images_dir, img_name)
+                    # Only write images that are neither on disk already nor queued by an earlier page
+                    if img_name not in scheduled_images and not os.path.exists(img_path):
+                        scheduled_images.add(img_name)
+                        image_writes.append(image_pool.submit(write_image_file, data, img_path, image_format, image_quality))
+                    page_images[img.id] = f"{images_link_prefix}{img_name}"
+                
+                # Add page number information and the rewritten markdown content
+                if i > 0:
+                    f.write(PAGE_SEPARATOR)
+                page_start = f.tell()
+                actual_page_num = page_offset + i + 1
+                if page_headers:
+                    f.write(format_page_header(actual_page_num).encode('utf-8'))
+                f.write(replace_images_in_markdown(page.markdown, page_images).encode('utf-8'))
+                page_ranges[actual_page_num] = (page_start, f.tell())
+        
+        # Make sure every image is on disk (and surface decode errors) before the chunk counts as saved
+        for image_write in image_writes:
+            image_write.result()
+        write_page_index(partial_md_path, page_ranges)
+        os.replace(temp_md_path, partial_md_path)
+    except BaseException:
+        if os.path.exists(temp_md_path):
+            os.remove(temp_md_path)
+        raise
     
     return partial_md_path
 
@@ -104,112 +348,527 @@ def get_pdf_size_mb(pdf_path: str) -> float:
     """Get the size of a PDF file in megabytes."""
     return os.path.getsize(pdf_path) / (1024 * 1024)
 
-def split_pdf(pdf_path: str, max_size_mb: float = 45.0) -> list:
+class PdfChunk(NamedTuple):
+    """A chunk file written by the splitter: pages [start_page, end_page) of the source PDF."""
+    path: str
+    start_page: int
+    end_page: int
+    size_bytes: int
+    estimated_bytes: int = 0
+
+class ChunkPlan(NamedTuple):
+    """A planned chunk: pages [start_page, end_page) and their estimated serialized size."""
+    start_page: int
+    end_page: int
+    estimated_bytes: int
+
+# Keys that point back up the page tree or at other pages; following them would pull in the whole document
+_PAGE_BACKREF_KEYS = {"/Parent", "/P", "/Dest", "/B", "/Prev", "/Next", "/First", "/Last"}
+
+def _serialized_size(pdf_object) -> int:
+    """Size of a PDF object as the writer will emit it, including per-object overhead."""
+    stream = io.BytesIO()
+    pdf_object.write_to_stream(stream, None)
+    return len(stream.getvalue()) + PDF_OBJECT_OVERHEAD_BYTES
+
+def measure_page_objects(page, object_sizes: dict) -> dict:
     """
-    Split a PDF file into smaller chunks, each under the specified max size.
-    Returns a list of paths to the temporary PDF files.
+    Return {object_key: serialized_size} for a page and every indirect object it needs
+    (content streams, fonts, images...). object_sizes caches sizes across pages, so each
+    shared resource is only serialized once.
+    """
+    from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject
+    
+    page_key = ("page", page.indirect_reference.idnum, page.indirect_reference.generation)
+    if page_key not in object_sizes:
+        object_sizes[page_key] = _serialized_size(page)
+    page_objects = {page_key: object_sizes[page_key]}
+    
+    stack = [value for key, value in page.items() if key not in _PAGE_BACKREF_KEYS]
+    while stack:
+        pdf_object = stack.pop()
+        if isinstance(pdf_object, IndirectObject):
+            object_key = (pdf_object.idnum, pdf_object.generation)
+            if object_key in page_objects:
+                continue
+            resolved = pdf_object.get_object()
+            if object_key not in object_sizes:
+                object_sizes[object_key] = _serialized_size(resolved) if resolved is not None else 0
+            page_objects[object_key] = object_sizes[object_key]
+            stack.append(resolved)
+        elif isinstance(pdf_object, DictionaryObject):
+            stack.extend(value for key, value in pdf_object.items() if key not in _PAGE_BACKREF_KEYS)
+        elif isinstance(pdf_object, ArrayObject):
+            stack.extend(pdf_object)
+    
+    return page_objects
+
+def plan_pdf_chunks(pdf_reader, max_size_mb: float = MAX_CHUNK_SIZE_MB, start_page: int = 0,
+                    max_pages: int = None) -> list:
+    """
+    Pack pages [start_page, total_pages) into the fewest consecutive chunks whose estimated size
+    stays under max_size_mb (and, if given, that have at most max_pages pages), in a single pass
+    over the measured page costs. Resources shared by several pages of a chunk (fonts, repeated
+    logos) are only counted once. A single page larger than the limit gets a chunk of its own.
+    Returns a list of ChunkPlan.
+    """
+    max_bytes = max_size_mb * 1024 * 1024
+    object_sizes = {}
+    plans = []
+    
+    chunk_start = start_page
+    chunk_objects = set()
+    chunk_bytes = PDF_FILE_OVERHEAD_BYTES
+    
+    for page_num in range(start_page, len(pdf_reader.pages)):
+        page_objects = measure_page_objects(pdf_reader.pages[page_num], object_sizes)
+        added_bytes = sum(size for key, size in page_objects.items() if key not in chunk_objects)
+        
+        # Close the current chunk if this page would push it over either limit
+        chunk_full = max_pages is not None and page_num - chunk_start >= max_pages
+        if page_num > chunk_start and (chunk_full or chunk_bytes + added_bytes > max_bytes):
+            plans.append(ChunkPlan(chunk_start, page_num, chunk_bytes))
+            chunk_start = page_num
+            chunk_objects = set()
+            chunk_bytes = PDF_FILE_OVERHEAD_BYTES
+            added_bytes = sum(page_objects.values())
+        
+        chunk_objects.update(page_objects)
+        chunk_bytes += added_bytes
+    
+    if chunk_start < len(pdf_reader.pages):
+        plans.append(ChunkPlan(chunk_start, len(pdf_reader.pages), chunk_bytes))
+    
+    return plans
+
+def write_pdf_pages(pdf_reader, start_page: int, end_page: int, chunk_path: str) -> int:
+    """Write pages [start_page, end_page) of an open PDF to chunk_path and return the file size in bytes."""
+    import PyPDF2
+    
+    pdf_writer = PyPDF2.PdfWriter()
+    for page_num in range(start_page, end_page):
+        pdf_writer.add_page(pdf_reader.pages[page_num])
+    with open(chunk_path, 'wb') as f:
+        pdf_writer.write(f)
+    return os.path.getsize(chunk_path)
+
+def iter_split_pdf(pdf_path: str, temp_dir: str, max_size_mb: float = MAX_CHUNK_SIZE_MB, start_page: int = 0,
+                   max_pages: int = None):
+    """
+    Split a PDF file into chunks under max_size_mb (and at most max_pages pages), starting at start_page.
+    The chunks are planned up front with plan_pdf_chunks, and each PdfChunk is yielded as soon as
+    it is written to temp_dir, so the caller can start uploading it while the next one is written.
     """
+    import PyPDF2
+    
     # Read the original PDF
     pdf_reader = PyPDF2.PdfReader(pdf_path)
-    total_pages = len(pdf_reader.pages)
-    
-    # Create a temporary directory for split files
-    temp_dir = tempfile.mkdtemp()
-    split_files = []
-    
-    # Start with an estimate of pages per chunk
-    file_size_mb = get_pdf_size_mb(pdf_path)
-    pages_per_mb = total_pages / file_size_mb
-    estimated_pages_per_chunk = int(max_size_mb * pages_per_mb * 0.9)  # 0.9 as safety factor
-    
-    # Ensure at least 1 page per chunk
-    pages_per_chunk = max(1, estimated_pages_per_chunk)
-    
-    # Split the PDF
-    current_page = 0
-    chunk_number = 0
+    planned = deque(plan_pdf_chunks(pdf_reader, max_size_mb, start_page, max_pages))
     
-    while current_page < total_pages:
-        # Create a new PDF writer
-        pdf_writer = PyPDF2.PdfWriter()
-        
-        # Calculate end page for this chunk
-        end_page = min(current_page + pages_per_chunk, total_pages)
-        
-        # Add pages to the writer
-        for page_num in range(current_page, end_page):
-            pdf_writer.add_page(pdf_reader.pages[page_num])
+    while planned:
+        plan = planned.popleft()
         
         # Save the chunk
-        chunk_path = os.path.join(temp_dir, f"chunk_{chunk_number}.pdf")
-        with open(chunk_path, 'wb') as f:
-            pdf_writer.write(f)
+        chunk_path = os.path.join(temp_dir, f"chunk_{plan.start_page}.pdf")
+        chunk_size = write_pdf_pages(pdf_reader, plan.start_page, plan.end_page, chunk_path)
         
-        # Check if the chunk is still too large
-        chunk_size_mb = get_pdf_size_mb(chunk_path)
-        if chunk_size_mb > max_size_mb and (end_page - current_page) > 1:
-            # If the chunk is too large and has more than 1 page, delete it and retry with fewer pages
+        # The estimate should keep chunks under the limit; if it didn't, halve just this chunk
+        if chunk_size > max_size_mb * 1024 * 1024 and (plan.end_page - plan.start_page) > 1:
             os.remove(chunk_path)
-            # Reduce the pages per chunk and try again
-            pages_per_chunk = max(1, int(pages_per_chunk * 0.7))
+            middle = (plan.start_page + plan.end_page) // 2
+            planned.appendleft(ChunkPlan(middle, plan.end_page, plan.estimated_bytes // 2))
+            planned.appendleft(ChunkPlan(plan.start_page, middle, plan.estimated_bytes // 2))
             continue
         
-        # Add to the list and move to the next chunk
-        split_files.append(chunk_path)
-        current_page = end_page
-        chunk_number += 1
+        yield PdfChunk(chunk_path, plan.start_page, plan.end_page, chunk_size, plan.estimated_bytes)
+
+def split_pdf(pdf_path: str, max_size_mb: float = MAX_CHUNK_SIZE_MB, max_pages: int = None) -> list:
+    """
+    Split a PDF file into smaller chunks, each under the specified max size (and page count).
+    Returns a list of paths to the temporary PDF files.
+    """
+    chunks, temp_dir = split_pdf_chunks(pdf_path, max_size_mb, max_pages)
+    return [chunk.path for chunk in chunks], temp_dir
+
+def split_pdf_chunks(pdf_path: str, max_size_mb: float = MAX_CHUNK_SIZE_MB, max_pages: int = None) -> tuple:
+    """
+    Same as split_pdf, but returns the chunk manifest: a PdfChunk (path, page range,
+    actual and estimated bytes) per chunk, so callers don't need to reopen the chunks.
+    """
+    # Create a temporary directory for split files
+    temp_dir = tempfile.mkdtemp()
+    return list(iter_split_pdf(pdf_path, temp_dir, max_size_mb, max_pages=max_pages)), temp_dir
+
+def create_client(api_key: str) -> Mistral:
+    """Create a Mistral client. The SDK is imported here, on first use, rather than when convert is imported."""
+    from mistralai import Mistral
+    
+    return Mistral(api_key=api_key)
+
+def ocr_request_options(output_options: dict = None) -> dict:
+    """OCR request parameters implied by the output options; text-only output asks for no image payloads."""
+    text_only = bool(output_options and output_options.get("text_only"))
+    return {"include_image_base64": not text_only}
+
+def job_options(output_options: dict = None) -> dict:
+    """
+    The request and output options that shape a document's results, with defaults filled in.
+    Stored in the job manifest so finished chunks are only reused when they were produced the same way.
+    """
+    output_options = output_options or {}
+    return {
+        **ocr_request_options(output_options),
+        "text_only": bool(output_options.get("text_only")),
+        "image_format": output_options.get("image_format"),
+        "image_quality": output_options.get("image_quality", DEFAULT_IMAGE_QUALITY),
+        "shared_image_store": bool(output_options.get("shared_image_store")),
+        "page_headers": bool(output_options.get("page_headers", True)),
+    }
+
+def make_data_url(content: bytes, mime_type: str = "application/pdf") -> str:
+    """Encode a document as a base64 data URL that can be sent inline with the OCR request."""
+    return f"data:{mime_type};base64,{base64.b64encode(content).decode('ascii')}"
+
+def make_document_chunk(url: str, mime_type: str = "application/pdf"):
+    """The OCR request's document field: an ImageURLChunk for images, a DocumentURLChunk otherwise."""
+    from mistralai import DocumentURLChunk, ImageURLChunk
     
-    return split_files, temp_dir
+    if mime_type.startswith("image/"):
+        return ImageURLChunk(image_url=url)
+    return DocumentURLChunk(document_url=url)
 
-def process_pdf_chunk(pdf_path: str, client: Mistral, output_dir: str, page_offset: int) -> str:
-    """Process a single PDF chunk and return the path to the partial results file."""
+def should_inline(size_bytes: int, inline_max_mb: float = INLINE_MAX_MB) -> bool:
+    """Whether a payload of size_bytes is small enough to skip the upload and signed URL round trips."""
+    return bool(inline_max_mb) and size_bytes <= inline_max_mb * 1024 * 1024
+
+def process_pdf_chunk(pdf_path: str, client: Mistral, output_dir: str, page_offset: int, cache=None,
+                      output_options: dict = None, inline_max_mb: float = INLINE_MAX_MB) -> str:
+    """
+    Process a single PDF chunk and return the path to the partial results file.
+    If an OCRCache is given, a cached response for identical chunk bytes is replayed instead of calling the API.
+    output_options are passed on to save_ocr_results (e.g. image_format, image_quality, text_only).
+    Chunks up to inline_max_mb are sent inline as a data URL in a single OCR request; larger ones are uploaded
+    first and referenced by a signed URL. Uploads are shared through the process-wide UploadRegistry, so identical
+    bytes reuse a still valid upload, and the remote file is deleted in the background once it is no longer needed.
+    Every API call goes through the process-wide rate limiter, which retries throttled and failed requests.
+    """
     # Confirm PDF file exists
     pdf_file = Path(pdf_path)
     if not pdf_file.is_file():
         raise FileNotFoundError(f"PDF file not found: {pdf_path}")
     
-    # Upload and process PDF
-    uploaded_file = client.files.upload(
-        file={
-            "file_name": pdf_file.stem,
-            "content": pdf_file.read_bytes(),
-        },
-        purpose="ocr",
-    )
-    
-    signed_url = client.files.get_signed_url(file_id=uploaded_file.id, expiry=1)
-    pdf_response = client.ocr.process(
-        document=DocumentURLChunk(document_url=signed_url.url), 
-        model="mistral-ocr-latest", 
-        include_image_base64=True
-    )
+    return ocr_content(pdf_file.read_bytes(), pdf_file.stem, client, output_dir, page_offset, cache,
+                       output_options, inline_max_mb)
+
+def process_image(image_path: str, client: Mistral, output_dir: str, cache=None, output_options: dict = None,
+                  inline_max_mb: float = INLINE_MAX_MB) -> str:
+    """
+    Send an image (see NATIVE_IMAGE_MIME_TYPES) to OCR as an image input, without converting it to PDF first.
+    Returns the path to the partial results file. Raises ValueError for formats the API cannot take directly;
+    callers fall back to convert_image_to_pdf for those and for errors where is_rejected_input() is true.
+    """
+    mime_type = native_image_mime_type(image_path)
+    if mime_type is None:
+        raise ValueError(f"Image format cannot be sent directly: {image_path}")
+    image_file = Path(image_path)
+    if not image_file.is_file():
+        raise FileNotFoundError(f"Image file not found: {image_path}")
+    
+    return ocr_content(image_file.read_bytes(), image_file.stem, client, output_dir, 0, cache,
+                       output_options, inline_max_mb, mime_type)
+
+def ocr_content(content: bytes, file_name: str, client: Mistral, output_dir: str, page_offset: int, cache=None,
+                output_options: dict = None, inline_max_mb: float = INLINE_MAX_MB,
+                mime_type: str = "application/pdf") -> str:
+    """
+    OCR a PDF or image held in memory and save the results; shared by process_pdf_chunk and process_image.
+    Images are sent as image_url inputs, everything else as document_url inputs.
+    """
+    output_options = output_options or {}
+    ocr_response = request_ocr(content, file_name, client, cache, ocr_request_options(output_options),
+                               inline_max_mb, mime_type)
     
     # Save partial results
-    return save_ocr_results(pdf_response, output_dir, page_offset)
+    return save_ocr_results(ocr_response, output_dir, page_offset, **output_options)
+
+def request_ocr(content: bytes, file_name: str, client: Mistral, cache=None, ocr_options: dict = None,
+                inline_max_mb: float = INLINE_MAX_MB, mime_type: str = "application/pdf") -> OCRResponse:
+    """
+    Return the OCRResponse for a PDF or image held in memory, replaying it from the cache when possible.
+    Small payloads are sent inline; larger ones go through the upload registry.
+    """
+    ocr_options = ocr_options if ocr_options is not None else ocr_request_options()
+    
+    # Replay a cached response if we have seen these exact bytes before
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(content, OCR_MODEL, ocr_options)
+        cached_response = cache.get(cache_key)
+        if cached_response is not None:
+            return cached_response
+    
+    remote_file = None
+    uploads = get_upload_registry()
+    if should_inline(len(content), inline_max_mb):
+        # Small chunks go inline: one round trip instead of three
+        document_url = make_data_url(content, mime_type)
+    else:
+        # Upload the file (or reuse an identical upload) and let the OCR request reference it by a signed URL
+        remote_file = uploads.acquire(client, content, file_name)
+        document_url = remote_file.url
+    
+    try:
+        ocr_response = get_rate_limiter().call(
+            client.ocr.process,
+            document=make_document_chunk(document_url, mime_type), 
+            model=OCR_MODEL, 
+            **ocr_options
+        )
+    finally:
+        if remote_file is not None:
+            uploads.release(remote_file)
+    
+    if cache_key is not None:
+        cache.put(cache_key, ocr_response)
+    return ocr_response
+
+def process_native_image(image_path: str, client: Mistral, manifest: JobManifest, cache=None,
+                         output_options: dict = None, inline_max_mb: float = INLINE_MAX_MB) -> bool:
+    """
+    直接提交图片并记入任务清单。
+    接口拒绝该图片(格式、尺寸等)时返回 False，由调用方转换为PDF后再处理。
+    """
+    try:
+        partial_file = process_image(image_path, client, manifest.output_dir, cache, output_options, inline_max_mb)
+    except Exception as e:
+        if is_rejected_input(e):
+            return False
+        raise
+    manifest.set_chunks([(0, 1)], 1)
+    manifest.mark_done(0, partial_file)
+    return True
+
+def part_sort_key(partial_file: str):
+    """Order part_{page_offset}.md files by their numeric page offset (part_200 before part_1000)."""
+    match = re.fullmatch(r"part_(\d+)\.md", os.path.basename(partial_file))
+    return (0, int(match.group(1)), "") if match else (1, 0, os.path.basename(partial_file))
 
 def merge_partial_results(output_dir: str, partial_files: list) -> None:
-    """Merge partial markdown results into a single complete file."""
-    all_content = []
+    """
+    Merge partial markdown results into a single complete file.
+    Parts are copied in page-offset order in fixed-size blocks, so memory use does not grow with the document,
+    and their page indexes are shifted into complete.pages.json.
+    """
+    complete_path = os.path.join(output_dir, "complete.md")
+    page_ranges = {}
+    fd, temp_path = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for i, partial_file in enumerate(sorted(partial_files, key=part_sort_key)):
+                if i > 0:
+                    out.write(PAGE_SEPARATOR)
+                part_start = out.tell()
+                for page, (start, end) in read_page_index(partial_file).items():
+                    page_ranges[page] = (part_start + start, part_start + end)
+                with open(partial_file, 'rb') as f:
+                    shutil.copyfileobj(f, out, MERGE_BUFFER_SIZE)
+        write_page_index(complete_path, page_ranges)
+        os.replace(temp_path, complete_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def get_pdf_page_count(pdf_path: str) -> int:
+    """Get the number of pages in a PDF file."""
+    import PyPDF2
     
-    # Read all partial files in order
-    for partial_file in sorted(partial_files):
-        with open(partial_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            all_content.append(content)
+    with open(pdf_path, 'rb') as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+def get_document_page_count(file_path: str) -> int:
+    """Get the number of pages OCR will return for a PDF or image file."""
+    if is_image_file(file_path):
+        return 1
+    return get_pdf_page_count(file_path)
+
+def process_pdf_chunk_stream(chunks, client: Mistral, output_dir: str,
+                             max_workers: int = DEFAULT_CHUNK_CONCURRENCY, progress_callback=None, cache=None,
+                             chunk_done_callback=None, total_pages: int = None, output_options: dict = None,
+                             inline_max_mb: float = INLINE_MAX_MB) -> list:
+    """
+    Process (chunk_index, PdfChunk) pairs from an iterable (e.g. a streaming splitter) with at most
+    max_workers requests in flight. Each chunk is submitted as soon as the iterable yields it, and at most
+    2 * max_workers written chunks wait for a worker, so splitting stays just ahead of uploading.
+    Returns the partial result files ordered by chunk index.
+    chunk_done_callback(chunk_index, partial_file) is called from the worker thread as soon as a chunk is
+    saved, even if another chunk fails later. progress_callback gets (pages_done, total_pages, message).
+    """
+    def run_chunk(chunk_index, chunk):
+        partial_file = process_pdf_chunk(
+            chunk.path, client, output_dir, chunk.start_page, cache, output_options, inline_max_mb
+        )
+        if chunk_done_callback:
+            chunk_done_callback(chunk_index, partial_file)
+        return partial_file
+    
+    partial_results = {}
+    futures = {}
+    pages_done = 0
+    
+    def collect(done):
+        nonlocal pages_done
+        for future in done:
+            chunk_index, chunk = futures.pop(future)
+            partial_results[chunk_index] = future.result()
+            pages_done += chunk.end_page - chunk.start_page
+            if progress_callback:
+                progress_callback(pages_done, total_pages, f"Processed chunk {len(partial_results)}...")
     
-    # Write the complete file
-    with open(os.path.join(output_dir, "complete.md"), 'w', encoding='utf-8') as f:
-        f.write("\n\n".join(all_content))
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        for chunk_index, chunk in chunks:
+            # Surface failures early and don't run too far ahead of the workers
+            collect([future for future in futures if future.done()])
+            while len(futures) >= max_workers * 2:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                collect(done)
+            futures[executor.submit(run_chunk, chunk_index, chunk)] = (chunk_index, chunk)
+        
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            collect(done)
+    finally:
+        # Don't start chunks that are still queued if one of them failed
+        executor.shutdown(wait=True, cancel_futures=True)
+    
+    return [partial_results[chunk_index] for chunk_index in sorted(partial_results)]
+
+def process_pdf_chunks(chunk_paths: list, client: Mistral, output_dir: str,
+                       max_workers: int = DEFAULT_CHUNK_CONCURRENCY, progress_callback=None, cache=None,
+                       output_options: dict = None, inline_max_mb: float = INLINE_MAX_MB) -> list:
+    """
+    Process already split PDF chunks concurrently with at most max_workers requests in flight.
+    chunk_paths may hold PdfChunk entries from split_pdf_chunks, or plain paths (which are opened to count pages).
+    Returns the partial result files in chunk order, regardless of completion order.
+    """
+    # Page offsets depend only on the page counts, so compute them up front
+    chunks = []
+    page_offset = 0
+    for chunk_path in chunk_paths:
+        if isinstance(chunk_path, PdfChunk):
+            chunks.append(chunk_path)
+            page_offset = chunk_path.end_page
+            continue
+        page_count = get_pdf_page_count(chunk_path)
+        chunks.append(PdfChunk(chunk_path, page_offset, page_offset + page_count, os.path.getsize(chunk_path)))
+        page_offset += page_count
+    
+    return process_pdf_chunk_stream(
+        enumerate(chunks), client, output_dir, max_workers, progress_callback, cache,
+        total_pages=page_offset, output_options=output_options, inline_max_mb=inline_max_mb
+    )
+
+def iter_pending_chunks(pdf_path: str, manifest: JobManifest, temp_dir: str, max_size_mb: float = MAX_CHUNK_SIZE_MB,
+                        max_pages: int = None):
+    """
+    Yield (chunk_index, PdfChunk) for every chunk of pdf_path that still needs OCR.
+    Chunks planned by an earlier run are re-extracted; the rest of the document is split as it
+    streams and each new chunk is recorded in the manifest before it is yielded.
+    """
+    if not manifest.chunks and get_pdf_size_mb(pdf_path) <= max_size_mb:
+        total_pages = get_pdf_page_count(pdf_path)
+        if max_pages is None or total_pages <= max_pages:
+            # Small enough to send as is
+            manifest.set_chunks([(0, total_pages)], total_pages)
+            yield 0, PdfChunk(pdf_path, 0, total_pages, os.path.getsize(pdf_path))
+            return
+    
+    import PyPDF2
+    
+    pdf_reader = PyPDF2.PdfReader(pdf_path)
+    if manifest.total_pages is None:
+        manifest.set_total_pages(len(pdf_reader.pages))
+    
+    # Re-extract only the planned chunks that did not finish last time
+    for chunk_index in manifest.pending_chunks():
+        start_page = manifest.chunks[chunk_index]["start_page"]
+        end_page = manifest.chunks[chunk_index]["end_page"]
+        if (start_page, end_page) == (0, manifest.total_pages):
+            yield chunk_index, PdfChunk(pdf_path, start_page, end_page, os.path.getsize(pdf_path))
+            continue
+        chunk_path = os.path.join(temp_dir, f"chunk_{start_page}.pdf")
+        chunk_size = write_pdf_pages(pdf_reader, start_page, end_page, chunk_path)
+        yield chunk_index, PdfChunk(chunk_path, start_page, end_page, chunk_size)
+    
+    # Split whatever the plan does not cover yet
+    if not manifest.plan_complete():
+        for chunk in iter_split_pdf(pdf_path, temp_dir, max_size_mb, manifest.planned_pages(), max_pages):
+            yield manifest.add_chunk(chunk.start_page, chunk.end_page), chunk
+
+def finish_job(manifest: JobManifest, search_index=None) -> None:
+    """
+    所有分块完成后合并结果(仅在分块多于一个时生成 complete.md)。
+    传入 SearchIndex 时，把结果的每一页写入全文索引(替换该文档原有的行)。
+    """
+    if len(manifest.chunks) > 1:
+        merge_partial_results(manifest.output_dir, manifest.part_files())
+    if search_index is not None:
+        search_index.index_output(manifest.output_dir)
 
-def process_pdf(pdf_path, api_key, progress_callback=None, output_base_dir=None):
-    """处理PDF文件或转换后的图像文件"""
-    # Initialize client
-    client = Mistral(api_key=api_key)
+def get_output_dir(file_path: str, output_base_dir: str = None) -> str:
+    """根据文件名生成输出目录路径，使用国际化的目录名称前缀"""
+    dir_name = f"{_('ocr_result_dir')}{Path(file_path).stem}"
+    if output_base_dir:
+        return os.path.join(output_base_dir, dir_name)
+    return dir_name
+
+def process_pdf(pdf_path, api_key, progress_callback=None, output_base_dir=None,
+                max_workers=None, cache=None, max_pages_per_chunk=DEFAULT_MAX_CHUNK_PAGES,
+                output_options=None, search_index=None, engine=None, output_dir=None):
+    """
+    处理PDF文件或转换后的图像文件，max_workers 为同时处理的分块数量(默认取引擎的 chunk_workers)。
+    engine 为 OCREngine，不传时使用该API密钥的共享引擎，使批量处理的所有文件复用同一个连接池。
+    max_pages_per_chunk 限制每个请求的页数，使未超过大小限制的长文档也能拆分为多个并发请求。
+    output_options 传递给 save_ocr_results，例如 {"image_format": "webp", "image_quality": 80}。
+    传入 OCRCache 时，内容相同的分块会直接使用缓存结果；传入 SearchIndex 时，完成后建立全文索引。
+    输出目录中的 manifest.json 记录已完成的分块，重新处理同一文件时只处理未完成的分块。
+    output_dir 指定输出目录，不传时由 get_output_dir 根据文件名生成。
+    """
+    # 所有文档共用引擎中长期复用的客户端
+    if engine is None:
+        from engine import get_engine
+        engine = get_engine(api_key)
+    client = engine.client
+    if max_workers is None:
+        max_workers = engine.chunk_workers
+    
+    # Create output directory (转换后的PDF与原始图像文件同名)
+    if output_dir is None:
+        output_dir = get_output_dir(pdf_path, output_base_dir)
+    os.makedirs(output_dir, exist_ok=True)
     
-    # 检查文件类型，如果是图像则先转换为PDF
+    # 读取任务清单，源文件与输出选项都未变化时跳过已完成的分块
+    manifest = JobManifest.load(output_dir, pdf_path, job_options(output_options))
+    if manifest.is_complete():
+        finish_job(manifest, search_index)
+        if progress_callback:
+            progress_callback(1, 1)
+        return output_dir
+    
+    # 检查文件类型：接口能直接识别的图像直接提交，其他图像(或被接口拒绝的图像)先转换为PDF
     original_is_image = is_image_file(pdf_path)
     converted_pdf_path = None
     
+    if original_is_image and engine.native_images and native_image_mime_type(pdf_path):
+        if progress_callback:
+            progress_callback(0, 1, "Sending image to OCR...")
+        if process_native_image(pdf_path, client, manifest, cache, output_options, engine.inline_max_mb):
+            finish_job(manifest, search_index)
+            if progress_callback:
+                progress_callback(1, 1)
+            return output_dir
+    
     if original_is_image:
         if progress_callback:
             progress_callback(0, 1, f"检测到图像文件，正在转换为PDF...")
@@ -232,78 +891,51 @@ def process_pdf(pdf_path, api_key, progress_callback=None, output_base_dir=None)
                 shutil.rmtree(temp_dir)
             raise Exception(f"图像转换失败: {str(e)}")
     
-    # Create output directory name
-    pdf_file = Path(pdf_path)
-    
-    # 使用指定的保存路径或默认路径，并使用国际化的目录名称前缀
-    ocr_dir_prefix = _("ocr_result_dir")
-    
-    # 对于图像文件，使用原始图像文件名
-    if original_is_image:
-        original_file = Path(pdf_path if not converted_pdf_path else os.path.splitext(pdf_path)[0] + os.path.splitext(pdf_path)[1])
-        file_stem = original_file.stem
-    else:
-        file_stem = pdf_file.stem
-    
-    if output_base_dir:
-        output_dir = os.path.join(output_base_dir, f"{ocr_dir_prefix}{file_stem}")
-    else:
-        output_dir = f"{ocr_dir_prefix}{file_stem}"
-    
-    os.makedirs(output_dir, exist_ok=True)
-    
     try:
+        progress_base = 0.3 if original_is_image else 0
+        progress_scale = 0.7 if original_is_image else 1.0
+        
         # Check if the PDF needs splitting
-        pdf_size_mb = get_pdf_size_mb(pdf_path)
+        if not manifest.chunks and progress_callback:
+            pdf_size_mb = get_pdf_size_mb(pdf_path)
+            if pdf_size_mb > MAX_CHUNK_SIZE_MB:
+                progress_callback(progress_base, 1, f"PDF size ({pdf_size_mb:.2f} MB) exceeds 50MB limit. Splitting into smaller chunks...")
         
-        if pdf_size_mb <= 45:  # Using 45MB as a safe threshold
-            # Process the PDF directly
-            if progress_callback:
-                progress_callback(0.3 if original_is_image else 0, 1)
-            process_pdf_chunk(pdf_path, client, output_dir, 0)
-            if progress_callback:
-                progress_callback(1, 1)
-        else:
-            # Split the PDF and process chunks
-            if progress_callback:
-                progress_callback(0.3 if original_is_image else 0, 1, f"PDF size ({pdf_size_mb:.2f} MB) exceeds 50MB limit. Splitting into smaller chunks...")
-            split_files, temp_split_dir = split_pdf(pdf_path)
+        # Create a temporary directory for split files
+        temp_split_dir = tempfile.mkdtemp()
+        try:
+            # Pages finished in an earlier run count as done
+            pages_already_done = manifest.finished_pages()
             
-            try:
-                partial_results = []
-                page_offset = 0
-                
-                # Process each chunk
-                for i, chunk_path in enumerate(split_files):
-                    progress_base = 0.3 if original_is_image else 0
-                    progress_scale = 0.7 if original_is_image else 1.0
-                    if progress_callback:
-                        progress_callback(
-                            progress_base + (i / len(split_files)) * progress_scale, 
-                            1, 
-                            f"Processing chunk {i+1}/{len(split_files)}..."
-                        )
-                    
-                    # Get number of pages in this chunk
-                    with open(chunk_path, 'rb') as f:
-                        chunk_reader = PyPDF2.PdfReader(f)
-                        chunk_pages = len(chunk_reader.pages)
-                    
-                    # Process the chunk
-                    partial_file = process_pdf_chunk(chunk_path, client, output_dir, page_offset)
-                    partial_results.append(partial_file)
-                    
-                    # Update page offset for the next chunk
-                    page_offset += chunk_pages
-                
-                # Merge results
-                if progress_callback:
-                    progress_callback(0.95, 1, "Merging results...")
-                merge_partial_results(output_dir, partial_results)
-                
-            finally:
-                # Clean up temporary files
-                shutil.rmtree(temp_split_dir)
+            def chunk_progress(pages_done, _total_pages, message):
+                if progress_callback and manifest.total_pages:
+                    fraction = (pages_already_done + pages_done) / manifest.total_pages
+                    progress_callback(progress_base + fraction * progress_scale * 0.95, 1, message)
+            
+            def chunk_done(chunk_index, partial_file):
+                # Checkpoint right away and free the chunk's disk space
+                manifest.mark_done(chunk_index, partial_file)
+                chunk_path = os.path.join(temp_split_dir, f"chunk_{manifest.chunks[chunk_index]['start_page']}.pdf")
+                if os.path.exists(chunk_path):
+                    os.remove(chunk_path)
+            
+            # Chunks are uploaded while the splitter is still writing the following ones
+            process_pdf_chunk_stream(
+                iter_pending_chunks(pdf_path, manifest, temp_split_dir, max_pages=max_pages_per_chunk),
+                client, output_dir, max_workers,
+                chunk_progress, cache, chunk_done, output_options=output_options,
+                inline_max_mb=engine.inline_max_mb
+            )
+        finally:
+            # Clean up temporary files
+            shutil.rmtree(temp_split_dir)
+        
+        # Merge results
+        if progress_callback:
+            progress_callback(0.95, 1, "Merging results...")
+        finish_job(manifest, search_index)
+        if progress_callback:
+            progress_callback(1, 1)
         
         return output_dir
     
@@ -335,667 +967,7 @@ class Config:
         except:
             return None
 
-class OCRApp(tk.Tk if not TKDND_AVAILABLE else TkinterDnD.Tk):
-    """Main application window with drag and drop support"""
-    def __init__(self):
-        # 初始化国际化系统
-        i18n.initialize()
-        
-        super().__init__()
-        self.title(_("app_title"))
-        self.geometry("800x800")
-        self.minsize(800, 800)
-        
-        # 设置图标和风格
-        self.style = ttk.Style()
-        self.style.configure("TButton", font=("微软雅黑", 10))
-        self.style.configure("TProgressbar", thickness=10)
-        
-        # 应用主题颜色
-        self.configure(bg="#f5f5f5")
-        
-        self.create_widgets()
-        self.api_key = Config.load_api_key()
-        if not self.api_key:
-            self.prompt_for_api_key()
-        
-        # 初始化文件队列
-        self.file_queue = []
-        self.current_file_index = 0
-        self.processing = False
-        self.output_dirs = []
-    
-    def create_widgets(self):
-        """创建所有GUI元素"""
-        # 顶部标题
-        header_frame = tk.Frame(self, bg="#3a7ca5", padx=10, pady=10)
-        header_frame.pack(fill=tk.X)
-        
-        tk.Label(
-            header_frame, 
-            text=_("header_title"),
-            font=("微软雅黑", 16, "bold"),
-            fg="white",
-            bg="#3a7ca5"
-        ).pack(side=tk.LEFT)
-        
-        # 语言选择下拉菜单
-        language_frame = tk.Frame(header_frame, bg="#3a7ca5")
-        language_frame.pack(side=tk.RIGHT, padx=10)
-        
-        tk.Label(
-            language_frame,
-            text=_("language") + ":",
-            font=("微软雅黑", 9),
-            bg="#3a7ca5",
-            fg="white"
-        ).pack(side=tk.LEFT, padx=(0, 5))
-        
-        self.language_var = tk.StringVar()
-        self.language_var.set(i18n.current_lang)
-        
-        self.language_dropdown = ttk.Combobox(
-            language_frame,
-            textvariable=self.language_var,
-            values=[f"{code} - {name}" for code, name in i18n.LANGUAGES.items()],
-            state="readonly",
-            width=12,
-            font=("微软雅黑", 9)
-        )
-        self.language_dropdown.pack(side=tk.LEFT)
-        self.language_dropdown.bind("<<ComboboxSelected>>", self.change_language)
-        
-        # 创建主体框架
-        main_frame = tk.Frame(self, bg="#f5f5f5")
-        main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=15)
-        
-        # 创建拖放区域框架
-        drop_frame = tk.Frame(
-            main_frame, 
-            bd=2, 
-            relief=tk.GROOVE,
-            bg="#f0f0f0", 
-            height=150
-        )
-        drop_frame.pack(fill=tk.BOTH, expand=True, pady=10)
-        
-        # 创建用于放置图标和文字的内部框架
-        drop_content = tk.Frame(drop_frame, bg="#f0f0f0")
-        drop_content.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
-        
-        # 拖放区域指示文字
-        self.drop_label = tk.Label(
-            drop_content, 
-            text=_("drop_area_hint"),
-            font=("微软雅黑", 14),
-            bg="#f0f0f0",
-            fg="#333333"
-        )
-        self.drop_label.pack(pady=(0, 15))
-        
-        # 添加图标指示 - 使用pack替代place以提高稳定性
-        icon_label = tk.Label(
-            drop_content,
-            text="📄➡️📋",
-            font=("Arial", 24),
-            bg="#f0f0f0",
-            fg="#666666"
-        )
-        icon_label.pack()
-        
-        # 文件拖放功能设置 - 将整个框架注册为拖放目标
-        if TKDND_AVAILABLE:
-            drop_frame.drop_target_register(DND_FILES)
-            drop_frame.dnd_bind('<<Drop>>', self.on_drop)
-            self.drop_label.bind("<ButtonPress-1>", self.on_click)
-            icon_label.bind("<ButtonPress-1>", self.on_click)
-            drop_content.bind("<ButtonPress-1>", self.on_click)
-        
-        # 任务队列区域
-        queue_frame = tk.LabelFrame(main_frame, text=_("queue_label"), font=("微软雅黑", 10, "bold"), bg="#f5f5f5")
-        queue_frame.pack(fill=tk.BOTH, expand=True, pady=10)
-        
-        # 创建滚动条和列表框
-        scrollbar = tk.Scrollbar(queue_frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        self.file_listbox = tk.Listbox(
-            queue_frame, 
-            height=5, 
-            font=("微软雅黑", 9),
-            selectbackground="#d0e0ff",
-            activestyle="none",
-            yscrollcommand=scrollbar.set
-        )
-        self.file_listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        scrollbar.config(command=self.file_listbox.yview)
-        
-        # 任务列表操作按钮
-        list_buttons_frame = tk.Frame(queue_frame, bg="#f5f5f5")
-        list_buttons_frame.pack(fill=tk.X, pady=5)
-        
-        ttk.Button(
-            list_buttons_frame,
-            text=_("add_files"),
-            command=self.add_files,
-            width=10
-        ).pack(side=tk.LEFT, padx=5)
-        
-        ttk.Button(
-            list_buttons_frame,
-            text=_("remove_selected"),
-            command=self.remove_selected,
-            width=10
-        ).pack(side=tk.LEFT, padx=5)
-        
-        ttk.Button(
-            list_buttons_frame,
-            text=_("clear_queue"),
-            command=self.clear_queue,
-            width=10
-        ).pack(side=tk.LEFT, padx=5)
-        
-        # 输出设置区域
-        output_frame = tk.LabelFrame(main_frame, text=_("output_settings"), font=("微软雅黑", 10, "bold"), bg="#f5f5f5")
-        output_frame.pack(fill=tk.X, pady=10)
-        
-        # 输出路径选择
-        output_path_frame = tk.Frame(output_frame, bg="#f5f5f5")
-        output_path_frame.pack(fill=tk.X, padx=5, pady=5)
-        
-        tk.Label(
-            output_path_frame,
-            text=_("save_location"),
-            font=("微软雅黑", 9),
-            bg="#f5f5f5"
-        ).pack(side=tk.LEFT, padx=(0, 5))
-        
-        self.output_path_var = tk.StringVar()
-        self.output_path_var.set(os.path.abspath(os.curdir))  # 默认为当前目录
-        
-        output_entry = tk.Entry(
-            output_path_frame,
-            textvariable=self.output_path_var,
-            font=("微软雅黑", 9),
-            width=40,
-            state="readonly"
-        )
-        output_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
-        
-        ttk.Button(
-            output_path_frame,
-            text=_("browse_button"),
-            command=self.choose_output_dir,
-            width=8
-        ).pack(side=tk.LEFT)
-        
-        # 进度区域
-        progress_frame = tk.LabelFrame(main_frame, text=_("progress_label"), font=("微软雅黑", 10, "bold"), bg="#f5f5f5")
-        progress_frame.pack(fill=tk.X, pady=10)
-        
-        # 总体进度
-        tk.Label(
-            progress_frame, 
-            text=_("total_progress"), 
-            font=("微软雅黑", 9),
-            bg="#f5f5f5"
-        ).pack(anchor=tk.W, padx=5, pady=(5, 0))
-        
-        self.total_progress = ttk.Progressbar(
-            progress_frame, 
-            orient="horizontal", 
-            length=300, 
-            mode="determinate",
-            style="TProgressbar"
-        )
-        self.total_progress.pack(fill=tk.X, padx=5, pady=2)
-        
-        # 当前文件进度
-        tk.Label(
-            progress_frame, 
-            text=_("current_file"), 
-            font=("微软雅黑", 9),
-            bg="#f5f5f5"
-        ).pack(anchor=tk.W, padx=5, pady=(5, 0))
-        
-        self.file_progress = ttk.Progressbar(
-            progress_frame, 
-            orient="horizontal", 
-            length=300, 
-            mode="determinate",
-            style="TProgressbar"
-        )
-        self.file_progress.pack(fill=tk.X, padx=5, pady=2)
-        
-        # 状态信息
-        self.status_label = tk.Label(
-            progress_frame, 
-            text=_("ready"), 
-            font=("微软雅黑", 9),
-            fg="#555555",
-            bg="#f5f5f5"
-        )
-        self.status_label.pack(anchor=tk.W, padx=5, pady=5)
-        
-        # 按钮区域
-        button_frame = tk.Frame(main_frame, bg="#f5f5f5")
-        button_frame.pack(pady=10)
-        
-        self.process_button = ttk.Button(
-            button_frame, 
-            text=_("start_process"), 
-            command=self.process_queue, 
-            width=15
-        )
-        self.process_button.pack(side=tk.LEFT, padx=10)
-        
-        self.api_button = ttk.Button(
-            button_frame, 
-            text=_("set_api_key"), 
-            command=self.prompt_for_api_key, 
-            width=15
-        )
-        self.api_button.pack(side=tk.LEFT, padx=10)
-        
-        self.results_button = ttk.Button(
-            button_frame, 
-            text=_("browse_results"), 
-            command=self.browse_results, 
-            width=15, 
-            state=tk.DISABLED
-        )
-        self.results_button.pack(side=tk.LEFT, padx=10)
-        
-        # 底部版权信息
-        tk.Label(
-            self, 
-            text=_("copyright"),
-            font=("微软雅黑", 8),
-            fg="#999999",
-            bg="#f5f5f5"
-        ).pack(side=tk.BOTTOM, pady=5)
-    
-    def on_drop(self, event):
-        """处理文件拖放"""
-        files = event.data
-        
-        # 在Windows上可能会将多个文件路径作为一个字符串返回
-        # 处理这种情况并分割它们
-        if isinstance(files, str):
-            # 移除可能的花括号或引号
-            files = files.strip('{}')
-            # 检查是否有多个文件（以空格分隔）
-            if ' ' in files and ('"' in files or "'"):
-                # 按照引号分割多个文件
-                import re
-                file_paths = re.findall(r'\"(.+?)\"', files)
-                if not file_paths:
-                    file_paths = re.findall(r'\'(.+?)\'', files)
-                if not file_paths:
-                    file_paths = [files]  # 回退到单个文件
-            else:
-                # 单个文件
-                file_paths = [files.strip('"').strip("'")]
-        else:
-            file_paths = [files]
-        
-        # 处理拖放的所有文件
-        added_count = 0
-        for file_path in file_paths:
-            # 检查文件是否为PDF或支持的图像格式
-            if file_path.lower().endswith('.pdf') or is_image_file(file_path):
-                self.add_file_to_queue(file_path)
-                added_count += 1
-        
-        # 提供视觉反馈
-        if added_count > 0:
-            self.status_label.config(text=f"已添加 {added_count} 个文件到队列")
-        else:
-            messagebox.showerror("无效文件", "请拖放PDF文件或支持的图像文件(JPEG, PNG等)。")
-    
-    def on_click(self, event):
-        """处理点击打开文件对话框"""
-        file_paths = filedialog.askopenfilenames(
-            title="选择文件",
-            filetypes=[
-                ("所有支持的文件", "*.pdf;*.jpg;*.jpeg;*.png;*.bmp;*.tiff;*.tif"),
-                ("PDF文件", "*.pdf"),
-                ("图像文件", "*.jpg;*.jpeg;*.png;*.bmp;*.tiff;*.tif")
-            ],
-            initialdir=os.path.expanduser("~\\Documents")
-        )
-        added_count = 0
-        for file_path in file_paths:
-            self.add_file_to_queue(file_path)
-            added_count += 1
-        
-        if added_count > 0:
-            self.status_label.config(text=f"已添加 {added_count} 个文件到队列")
-    
-    def add_file_to_queue(self, file_path):
-        """添加文件到队列并更新显示"""
-        if file_path not in self.file_queue:  # 避免重复添加
-            self.file_queue.append(file_path)
-            
-            # 对于图像文件，显示图像标签
-            file_ext = os.path.splitext(file_path)[1].lower()
-            if is_image_file(file_path):
-                file_size = os.path.getsize(file_path) / (1024 * 1024)  # MB
-                self.file_listbox.insert(
-                    tk.END, 
-                    f"{os.path.basename(file_path)} ({file_size:.1f} MB) [图像]"
-                )
-            else:
-                file_size = get_pdf_size_mb(file_path)
-                self.file_listbox.insert(
-                    tk.END, 
-                    f"{os.path.basename(file_path)} ({file_size:.1f} MB)"
-                )
-    
-    def add_files(self):
-        """批量添加文件到队列"""
-        file_paths = filedialog.askopenfilenames(
-            title="选择文件",
-            filetypes=[
-                ("所有支持的文件", "*.pdf;*.jpg;*.jpeg;*.png;*.bmp;*.tiff;*.tif"),
-                ("PDF文件", "*.pdf"),
-                ("图像文件", "*.jpg;*.jpeg;*.png;*.bmp;*.tiff;*.tif")
-            ],
-            initialdir=os.path.expanduser("~\\Documents")
-        )
-        added_count = 0
-        for file_path in file_paths:
-            self.add_file_to_queue(file_path)
-            added_count += 1
-        
-        if added_count > 0:
-            self.status_label.config(text=f"已添加 {added_count} 个文件到队列")
-    
-    def remove_selected(self):
-        """移除选定的文件"""
-        selected_indices = self.file_listbox.curselection()
-        for index in reversed(selected_indices):
-            self.file_listbox.delete(index)
-            del self.file_queue[index]
-        self.status_label.config(text="选定文件已移除")
-    
-    def clear_queue(self):
-        """清空文件队列"""
-        self.file_listbox.delete(0, tk.END)
-        self.file_queue.clear()
-        self.status_label.config(text="文件队列已清空")
-    
-    def prompt_for_api_key(self):
-        """提示用户输入API密钥"""
-        api_dialog = tk.Toplevel(self)
-        api_dialog.title(_("api_key_title"))
-        api_dialog.geometry("480x240")
-        api_dialog.transient(self)
-        api_dialog.grab_set()
-        api_dialog.resizable(False, False)
-        
-        # 对话框内容
-        tk.Label(
-            api_dialog, 
-            text=_("api_key_prompt"), 
-            font=("微软雅黑", 12)
-        ).pack(pady=(15, 5))
-        
-        # 添加申请API链接
-        link_frame = tk.Frame(api_dialog)
-        link_frame.pack(fill=tk.X, padx=20)
-        
-        tk.Label(
-            link_frame,
-            text=_("no_api_key"),
-            font=("微软雅黑", 9),
-            fg="#555555"
-        ).pack(side=tk.LEFT)
-        
-        link_label = tk.Label(
-            link_frame,
-            text=_("apply_here"),
-            font=("微软雅黑", 9, "underline"),
-            fg="#0066cc",
-            cursor="hand2"
-        )
-        link_label.pack(side=tk.LEFT)
-        
-        def open_mistral_website(event):
-            import webbrowser
-            webbrowser.open("https://console.mistral.ai/")
-        
-        link_label.bind("<Button-1>", open_mistral_website)
-        
-        # 添加API激活提示
-        tk.Label(
-            api_dialog,
-            text=_("api_activation_note"),
-            font=("微软雅黑", 9),
-            fg="#FF5500"
-        ).pack(pady=(2, 5))
-        
-        tk.Label(
-            api_dialog,
-            text=_("api_security_note"),
-            font=("微软雅黑", 9),
-            fg="#555555"
-        ).pack()
-        
-        api_var = tk.StringVar()
-        if self.api_key:
-            api_var.set(self.api_key)
-        
-        entry_frame = tk.Frame(api_dialog)
-        entry_frame.pack(pady=15, fill=tk.X, padx=20)
-        
-        entry = tk.Entry(
-            entry_frame, 
-            textvariable=api_var, 
-            width=50, 
-            show="•",
-            font=("Consolas", 10)
-        )
-        entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
-        
-        # 显示/隐藏密钥切换
-        self.show_key = False
-        
-        def toggle_show():
-            self.show_key = not self.show_key
-            entry.config(show="" if self.show_key else "•")
-            show_btn.config(text=_("hide") if self.show_key else _("show"))
-        
-        show_btn = ttk.Button(entry_frame, text=_("show"), width=5, command=toggle_show)
-        show_btn.pack(side=tk.RIGHT, padx=(5, 0))
-        
-        button_frame = tk.Frame(api_dialog)
-        button_frame.pack(pady=15)
-        
-        def save_key():
-            key = api_var.get().strip()
-            if key:
-                self.api_key = key
-                Config.save_api_key(key)
-                api_dialog.destroy()
-                self.status_label.config(text=_("status_api_key_saved"))
-            else:
-                messagebox.showerror(_("error"), _("error_empty_api_key"), parent=api_dialog)
-        
-        ttk.Button(
-            button_frame, 
-            text=_("save"), 
-            command=save_key, 
-            width=10
-        ).pack(side=tk.LEFT, padx=5)
-        
-        ttk.Button(
-            button_frame, 
-            text=_("cancel"), 
-            command=api_dialog.destroy, 
-            width=10
-        ).pack(side=tk.LEFT, padx=5)
-        
-        # 将对话框居中显示
-        api_dialog.update_idletasks()
-        x = self.winfo_x() + (self.winfo_width() - api_dialog.winfo_width()) // 2
-        y = self.winfo_y() + (self.winfo_height() - api_dialog.winfo_height()) // 2
-        api_dialog.geometry(f"+{x}+{y}")
-        
-        # 设置焦点
-        entry.focus_set()
-    
-    def update_progress(self, current, total, message=None):
-        """更新进度条和状态消息"""
-        progress_value = int((current / total) * 100)
-        self.file_progress["value"] = progress_value
-        
-        if message:
-            self.status_label.config(text=message)
-        else:
-            self.status_label.config(text=f"处理中: {progress_value}%")
-        
-        self.update_idletasks()
-    
-    def process_queue(self):
-        """处理文件队列"""
-        if not self.file_queue:
-            messagebox.showerror("错误", "请先添加一个或多个PDF文件")
-            return
-        
-        if not self.api_key:
-            messagebox.showerror("错误", "请先设置您的API密钥")
-            self.prompt_for_api_key()
-            return
-        
-        # 重置UI状态
-        self.total_progress["value"] = 0
-        self.file_progress["value"] = 0
-        self.status_label.config(text="正在启动...")
-        self.process_button.config(state=tk.DISABLED)
-        self.results_button.config(state=tk.DISABLED)
-        self.output_dirs.clear()
-        
-        # 在单独的线程中处理以保持UI响应
-        def process_thread():
-            try:
-                total_files = len(self.file_queue)
-                for index, file_path in enumerate(self.file_queue):
-                    self.current_file_index = index
-                    self.status_label.config(text=f"正在处理文件 {index + 1}/{total_files}: {os.path.basename(file_path)}")
-                    output_dir = process_pdf(
-                        file_path, 
-                        self.api_key, 
-                        self.update_progress,
-                        self.output_path_var.get()  # 使用用户选择的输出路径
-                    )
-                    self.output_dirs.append(output_dir)
-                    
-                    # 更新总体进度
-                    self.total_progress["value"] = int(((index + 1) / total_files) * 100)
-                
-                # 处理后更新UI
-                self.status_label.config(text="所有文件处理完成!")
-                self.results_button.config(state=tk.NORMAL)
-                
-                # 提示用户处理完
-                messagebox.showinfo("处理完成", "所有PDF文件转换已完成!")
-                self.status_label.config(text=_("success_all_files_done"))
-                
-            except Exception as e:
-                messagebox.showerror("错误", f"发生错误: {str(e)}")
-                self.status_label.config(text="处理失败")
-            finally:
-                self.process_button.config(state=tk.NORMAL)
-        
-        threading.Thread(target=process_thread, daemon=True).start()
-    
-    def browse_results(self):
-        """在文件资源管理器中打开输出目录"""
-        if self.output_dirs:
-            for output_dir in self.output_dirs:
-                if os.path.exists(output_dir):
-                    # 跨平台打开目录
-                    if os.name == 'nt':  # Windows
-                        os.startfile(os.path.abspath(output_dir))
-                    elif os.name == 'posix':  # macOS, Linux
-                        if os.uname().sysname == 'Darwin':  # macOS
-                            subprocess.call(['open', output_dir])
-                        else:  # Linux
-                            subprocess.call(['xdg-open', output_dir])
-        else:
-            messagebox.showerror(_("error"), _("error_no_output_dir"))
-    
-    def choose_output_dir(self):
-        """选择输出目录"""
-        selected_dir = filedialog.askdirectory(
-            title=_("save_location"),
-            initialdir=self.output_path_var.get() or os.path.expanduser("~\\Documents")
-        )
-        if selected_dir:
-            self.output_path_var.set(selected_dir)
-            self.status_label.config(text=_("status_output_set").format(selected_dir))
-    
-    def change_language(self, event=None):
-        """切换用户界面语言"""
-        selected = self.language_var.get()
-        # 从下拉框的值中提取语言代码 (格式: "zh_CN - 简体中文")
-        lang_code = selected.split(' - ')[0]
-        
-        if lang_code in i18n.LANGUAGES:
-            # 更改语言
-            i18n.change_language(lang_code)
-            # 保存用户偏好
-            i18n.save_language_preference(lang_code)
-            
-            # 更新UI
-            self.update_ui_language()
-            
-            # 显示确认消息
-            if lang_code == "zh_CN":
-                self.status_label.config(text="语言已更改为简体中文")
-            elif lang_code == "en_US":
-                self.status_label.config(text="Language changed to English")
-            elif lang_code == "ja_JP":
-                self.status_label.config(text="言語が日本語に変更されました")
-            elif lang_code == "ko_KR":
-                self.status_label.config(text="언어가 한국어로 변경되었습니다")
-    
-    def update_ui_language(self):
-        """更新用户界面的语言"""
-        # 主窗口标题
-        self.title(_("app_title"))
-        
-        # 销毁所有现有控件
-        for widget in self.winfo_children():
-            widget.destroy()
-        
-        # 重新创建所有控件
-        self.create_widgets()
-        
-        # 恢复状态
-        if hasattr(self, 'results_button') and self.output_dirs:
-            self.results_button.config(state=tk.NORMAL)
-
 if __name__ == "__main__":
-    # 显示欢迎信息
-    print("启动 Mistral OCR 转换工具...")
-    
-    if not TKDND_AVAILABLE:
-        print("警告: tkinterdnd2 模块未安装。拖放功能将不可用。")
-        print("要启用拖放功能，请安装: pip install tkinterdnd2")
-    
-    if not PILLOW_AVAILABLE:
-        print("警告: Pillow 模块未安装。图像转换功能将不可用。")
-        print("要启用图像转换功能，请安装: pip install pillow")
-    
-    # 启动应用
-    app = OCRApp()
-    
-    # 设置窗口图标(如果有)
-    try:
-        app.iconbitmap("icon.ico")
-    except:
-        pass
-    
-    app.mainloop()
+    # 直接运行时启动图形界面；无界面环境请使用 cli.py
+    from gui import main
+    main()
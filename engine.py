@@ -0,0 +1,101 @@
+"""
+OCR引擎模块 (engine.py)
+持有长期复用的 Mistral 客户端(带连接池和keep-alive的 httpx 客户端)及并发设置，
+批量处理时所有文档共用同一组连接，不再为每个文件重新建立连接和TLS握手
+"""
+import threading
+
+from convert import DEFAULT_CHUNK_CONCURRENCY, DEFAULT_FILE_CONCURRENCY, INLINE_MAX_MB
+
+# 连接池设置
+DEFAULT_MAX_CONNECTIONS = 32
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 16
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+# 超时(秒)：上传大分块和OCR都可能较慢，连接超时则应较短
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_REQUEST_TIMEOUT = 300.0
+
+class OCREngine:
+    """可复用的OCR引擎，客户端在第一次使用时创建，之后所有文档共用"""
+
+    def __init__(self, api_key: str, server_url: str = None,
+                 chunk_workers: int = DEFAULT_CHUNK_CONCURRENCY, file_workers: int = DEFAULT_FILE_CONCURRENCY,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+                 timeout: float = DEFAULT_REQUEST_TIMEOUT, verify=True, inline_max_mb: float = INLINE_MAX_MB,
+                 native_images: bool = True):
+        self.api_key = api_key
+        self.server_url = server_url
+        # 每个文件同时处理的分块数，以及同时处理的文件数
+        self.chunk_workers = chunk_workers
+        self.file_workers = file_workers
+        # 不超过此大小(MB)的分块直接以 data URL 提交，0 或 None 表示总是上传
+        self.inline_max_mb = inline_max_mb
+        # 为 True 时JPEG/PNG图片直接提交OCR，False 时总是先转换为PDF
+        self.native_images = native_images
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        # 传给 httpx 的证书校验设置(True、False 或CA证书路径)
+        self.verify = verify
+        self._client = None
+        self._http_client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """长期复用的 Mistral 客户端(线程安全，第一次访问时创建)"""
+        with self._lock:
+            if self._client is None:
+                import httpx
+                from mistralai import Mistral
+
+                self._http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_keepalive_connections,
+                        keepalive_expiry=self.keepalive_expiry,
+                    ),
+                    timeout=httpx.Timeout(self.timeout, connect=DEFAULT_CONNECT_TIMEOUT),
+                    verify=self.verify,
+                )
+                self._client = Mistral(api_key=self.api_key, server_url=self.server_url, client=self._http_client)
+            return self._client
+
+    def process_pdf(self, pdf_path, progress_callback=None, output_base_dir=None, **kwargs):
+        """用本引擎的客户端处理一个文件，其余参数同 convert.process_pdf"""
+        from convert import process_pdf
+
+        return process_pdf(pdf_path, self.api_key, progress_callback, output_base_dir, engine=self, **kwargs)
+
+    def close(self) -> None:
+        """删除本引擎留下的远程文件并关闭连接池；之后再次使用时会重新创建客户端"""
+        with self._lock:
+            if self._client is not None:
+                from uploads import get_upload_registry
+
+                get_upload_registry().flush(self._client)
+            if self._http_client is not None:
+                self._http_client.close()
+            self._client = None
+            self._http_client = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# 进程内按API密钥和服务器地址共享的引擎
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine(api_key: str, server_url: str = None) -> OCREngine:
+    """返回该API密钥(和服务器地址)的共享引擎，不存在时按默认设置创建"""
+    with _engines_lock:
+        key = (api_key, server_url)
+        if key not in _engines:
+            _engines[key] = OCREngine(api_key, server_url)
+        return _engines[key]
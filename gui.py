@@ -0,0 +1,919 @@
+"""
+图形界面模块 (gui.py)
+基于 Tkinter 的拖放式批量处理界面；处理流程在 convert.py 中，命令行批处理见 cli.py
+"""
+import os
+import threading
+import subprocess
+import tkinter as tk
+from tkinter import filedialog, ttk, messagebox
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# 导入国际化支持模块
+import i18n
+from i18n import _
+
+from convert import (
+    DEFAULT_FILE_CONCURRENCY,
+    PILLOW_AVAILABLE,
+    TRANSCODE_FORMATS,
+    Config,
+    get_document_page_count,
+    get_pdf_size_mb,
+    is_image_file,
+    process_pdf,
+)
+from engine import get_engine
+from job_queue import FAILED, QUEUED, JobQueue
+from ocr_cache import OCRCache
+from search_index import SearchIndex
+
+# 尝试导入tkinterdnd2用于拖放功能
+try:
+    from tkinterdnd2 import DND_FILES, TkinterDnD
+    TKDND_AVAILABLE = True
+except ImportError:
+    TKDND_AVAILABLE = False
+
+class OCRApp(tk.Tk if not TKDND_AVAILABLE else TkinterDnD.Tk):
+    """Main application window with drag and drop support"""
+    def __init__(self):
+        # 初始化国际化系统
+        i18n.initialize()
+        
+        super().__init__()
+        self.title(_("app_title"))
+        self.geometry("800x800")
+        self.minsize(800, 800)
+        
+        # 设置图标和风格
+        self.style = ttk.Style()
+        self.style.configure("TButton", font=("微软雅黑", 10))
+        self.style.configure("TProgressbar", thickness=10)
+        
+        # 应用主题颜色
+        self.configure(bg="#f5f5f5")
+        
+        self.create_widgets()
+        self.api_key = Config.load_api_key()
+        if not self.api_key:
+            self.prompt_for_api_key()
+        
+        # 文件队列保存在 SQLite 中，关闭或崩溃后仍在；queue_ids 与列表框的行一一对应
+        self.job_queue = JobQueue()
+        self.queue_ids = []
+        self.processing = False
+        self.output_dirs = []
+        # 上次运行时未处理完的任务重新排队并显示
+        self.job_queue.recover()
+        self.refresh_queue_list()
+        
+        # OCR结果缓存，内容相同的文件或分块不会重复调用API
+        self.ocr_cache = OCRCache()
+    
+    def create_widgets(self):
+        """创建所有GUI元素"""
+        # 顶部标题
+        header_frame = tk.Frame(self, bg="#3a7ca5", padx=10, pady=10)
+        header_frame.pack(fill=tk.X)
+        
+        tk.Label(
+            header_frame, 
+            text=_("header_title"),
+            font=("微软雅黑", 16, "bold"),
+            fg="white",
+            bg="#3a7ca5"
+        ).pack(side=tk.LEFT)
+        
+        # 语言选择下拉菜单
+        language_frame = tk.Frame(header_frame, bg="#3a7ca5")
+        language_frame.pack(side=tk.RIGHT, padx=10)
+        
+        tk.Label(
+            language_frame,
+            text=_("language") + ":",
+            font=("微软雅黑", 9),
+            bg="#3a7ca5",
+            fg="white"
+        ).pack(side=tk.LEFT, padx=(0, 5))
+        
+        self.language_var = tk.StringVar()
+        self.language_var.set(i18n.current_lang)
+        
+        self.language_dropdown = ttk.Combobox(
+            language_frame,
+            textvariable=self.language_var,
+            values=[f"{code} - {name}" for code, name in i18n.LANGUAGES.items()],
+            state="readonly",
+            width=12,
+            font=("微软雅黑", 9)
+        )
+        self.language_dropdown.pack(side=tk.LEFT)
+        self.language_dropdown.bind("<<ComboboxSelected>>", self.change_language)
+        
+        # 创建主体框架
+        main_frame = tk.Frame(self, bg="#f5f5f5")
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=15)
+        
+        # 创建拖放区域框架
+        drop_frame = tk.Frame(
+            main_frame, 
+            bd=2, 
+            relief=tk.GROOVE,
+            bg="#f0f0f0", 
+            height=150
+        )
+        drop_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+        
+        # 创建用于放置图标和文字的内部框架
+        drop_content = tk.Frame(drop_frame, bg="#f0f0f0")
+        drop_content.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+        
+        # 拖放区域指示文字
+        self.drop_label = tk.Label(
+            drop_content, 
+            text=_("drop_area_hint"),
+            font=("微软雅黑", 14),
+            bg="#f0f0f0",
+            fg="#333333"
+        )
+        self.drop_label.pack(pady=(0, 15))
+        
+        # 添加图标指示 - 使用pack替代place以提高稳定性
+        icon_label = tk.Label(
+            drop_content,
+            text="📄➡️📋",
+            font=("Arial", 24),
+            bg="#f0f0f0",
+            fg="#666666"
+        )
+        icon_label.pack()
+        
+        # 文件拖放功能设置 - 将整个框架注册为拖放目标
+        if TKDND_AVAILABLE:
+            drop_frame.drop_target_register(DND_FILES)
+            drop_frame.dnd_bind('<<Drop>>', self.on_drop)
+            self.drop_label.bind("<ButtonPress-1>", self.on_click)
+            icon_label.bind("<ButtonPress-1>", self.on_click)
+            drop_content.bind("<ButtonPress-1>", self.on_click)
+        
+        # 任务队列区域
+        queue_frame = tk.LabelFrame(main_frame, text=_("queue_label"), font=("微软雅黑", 10, "bold"), bg="#f5f5f5")
+        queue_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+        
+        # 创建滚动条和列表框
+        scrollbar = tk.Scrollbar(queue_frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.file_listbox = tk.Listbox(
+            queue_frame, 
+            height=5, 
+            font=("微软雅黑", 9),
+            selectbackground="#d0e0ff",
+            activestyle="none",
+            yscrollcommand=scrollbar.set
+        )
+        self.file_listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        scrollbar.config(command=self.file_listbox.yview)
+        
+        # 任务列表操作按钮
+        list_buttons_frame = tk.Frame(queue_frame, bg="#f5f5f5")
+        list_buttons_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Button(
+            list_buttons_frame,
+            text=_("add_files"),
+            command=self.add_files,
+            width=10
+        ).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(
+            list_buttons_frame,
+            text=_("remove_selected"),
+            command=self.remove_selected,
+            width=10
+        ).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(
+            list_buttons_frame,
+            text=_("clear_queue"),
+            command=self.clear_queue,
+            width=10
+        ).pack(side=tk.LEFT, padx=5)
+        
+        # 输出设置区域
+        output_frame = tk.LabelFrame(main_frame, text=_("output_settings"), font=("微软雅黑", 10, "bold"), bg="#f5f5f5")
+        output_frame.pack(fill=tk.X, pady=10)
+        
+        # 输出路径选择
+        output_path_frame = tk.Frame(output_frame, bg="#f5f5f5")
+        output_path_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        tk.Label(
+            output_path_frame,
+            text=_("save_location"),
+            font=("微软雅黑", 9),
+            bg="#f5f5f5"
+        ).pack(side=tk.LEFT, padx=(0, 5))
+        
+        self.output_path_var = tk.StringVar()
+        self.output_path_var.set(os.path.abspath(os.curdir))  # 默认为当前目录
+        
+        output_entry = tk.Entry(
+            output_path_frame,
+            textvariable=self.output_path_var,
+            font=("微软雅黑", 9),
+            width=40,
+            state="readonly"
+        )
+        output_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        
+        ttk.Button(
+            output_path_frame,
+            text=_("browse_button"),
+            command=self.choose_output_dir,
+            width=8
+        ).pack(side=tk.LEFT)
+        
+        # 并行处理的文件数量
+        parallel_frame = tk.Frame(output_frame, bg="#f5f5f5")
+        parallel_frame.pack(fill=tk.X, padx=5, pady=(0, 5))
+        
+        tk.Label(
+            parallel_frame,
+            text=_("parallel_files"),
+            font=("微软雅黑", 9),
+            bg="#f5f5f5"
+        ).pack(side=tk.LEFT, padx=(0, 5))
+        
+        self.parallel_files_var = tk.IntVar()
+        self.parallel_files_var.set(DEFAULT_FILE_CONCURRENCY)
+        
+        tk.Spinbox(
+            parallel_frame,
+            from_=1,
+            to=16,
+            textvariable=self.parallel_files_var,
+            font=("微软雅黑", 9),
+            width=5,
+            state="readonly"
+        ).pack(side=tk.LEFT)
+        
+        # 是否复用缓存的OCR结果
+        self.use_cache_var = tk.BooleanVar()
+        self.use_cache_var.set(True)
+        
+        tk.Checkbutton(
+            parallel_frame,
+            text=_("use_cache"),
+            variable=self.use_cache_var,
+            font=("微软雅黑", 9),
+            bg="#f5f5f5"
+        ).pack(side=tk.LEFT, padx=(15, 0))
+        
+        # 图片输出格式（原始格式或转码）
+        tk.Label(
+            parallel_frame,
+            text=_("image_format"),
+            font=("微软雅黑", 9),
+            bg="#f5f5f5"
+        ).pack(side=tk.LEFT, padx=(15, 5))
+        
+        self.image_format_var = tk.StringVar()
+        self.image_format_var.set(_("image_format_original"))
+        
+        ttk.Combobox(
+            parallel_frame,
+            textvariable=self.image_format_var,
+            values=[_("image_format_original")] + list(TRANSCODE_FORMATS),
+            state="readonly" if PILLOW_AVAILABLE else tk.DISABLED,
+            width=10,
+            font=("微软雅黑", 9)
+        ).pack(side=tk.LEFT)
+        
+        # 同一保存位置的文档共用一个图片目录，相同图片只保存一份
+        self.shared_images_var = tk.BooleanVar()
+        self.shared_images_var.set(False)
+        
+        tk.Checkbutton(
+            parallel_frame,
+            text=_("shared_image_store"),
+            variable=self.shared_images_var,
+            font=("微软雅黑", 9),
+            bg="#f5f5f5"
+        ).pack(side=tk.LEFT, padx=(15, 0))
+        
+        # 仅文本模式：不请求也不保存图片
+        self.text_only_var = tk.BooleanVar()
+        self.text_only_var.set(False)
+        
+        tk.Checkbutton(
+            parallel_frame,
+            text=_("text_only"),
+            variable=self.text_only_var,
+            font=("微软雅黑", 9),
+            bg="#f5f5f5"
+        ).pack(side=tk.LEFT, padx=(15, 0))
+        
+        # 处理完成后把结果写入全文索引
+        self.search_index_var = tk.BooleanVar()
+        self.search_index_var.set(False)
+        
+        tk.Checkbutton(
+            parallel_frame,
+            text=_("build_search_index"),
+            variable=self.search_index_var,
+            font=("微软雅黑", 9),
+            bg="#f5f5f5"
+        ).pack(side=tk.LEFT, padx=(15, 0))
+        
+        # 进度区域
+        progress_frame = tk.LabelFrame(main_frame, text=_("progress_label"), font=("微软雅黑", 10, "bold"), bg="#f5f5f5")
+        progress_frame.pack(fill=tk.X, pady=10)
+        
+        # 总体进度
+        tk.Label(
+            progress_frame, 
+            text=_("total_progress"), 
+            font=("微软雅黑", 9),
+            bg="#f5f5f5"
+        ).pack(anchor=tk.W, padx=5, pady=(5, 0))
+        
+        self.total_progress = ttk.Progressbar(
+            progress_frame, 
+            orient="horizontal", 
+            length=300, 
+            mode="determinate",
+            style="TProgressbar"
+        )
+        self.total_progress.pack(fill=tk.X, padx=5, pady=2)
+        
+        # 每个文件一行的进度表
+        file_table_frame = tk.Frame(progress_frame, bg="#f5f5f5")
+        file_table_frame.pack(fill=tk.X, padx=5, pady=(5, 2))
+        
+        table_scrollbar = tk.Scrollbar(file_table_frame)
+        table_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.file_table = ttk.Treeview(
+            file_table_frame,
+            columns=("file", "pages", "progress", "status"),
+            show="headings",
+            height=5,
+            yscrollcommand=table_scrollbar.set
+        )
+        self.file_table.heading("file", text=_("column_file"))
+        self.file_table.heading("pages", text=_("column_pages"))
+        self.file_table.heading("progress", text=_("column_progress"))
+        self.file_table.heading("status", text=_("column_status"))
+        self.file_table.column("file", width=260)
+        self.file_table.column("pages", width=60, anchor=tk.CENTER)
+        self.file_table.column("progress", width=70, anchor=tk.CENTER)
+        self.file_table.column("status", width=200)
+        self.file_table.pack(fill=tk.X, expand=True)
+        table_scrollbar.config(command=self.file_table.yview)
+        
+        # 状态信息
+        self.status_label = tk.Label(
+            progress_frame, 
+            text=_("ready"), 
+            font=("微软雅黑", 9),
+            fg="#555555",
+            bg="#f5f5f5"
+        )
+        self.status_label.pack(anchor=tk.W, padx=5, pady=5)
+        
+        # 按钮区域
+        button_frame = tk.Frame(main_frame, bg="#f5f5f5")
+        button_frame.pack(pady=10)
+        
+        self.process_button = ttk.Button(
+            button_frame, 
+            text=_("start_process"), 
+            command=self.process_queue, 
+            width=15
+        )
+        self.process_button.pack(side=tk.LEFT, padx=10)
+        
+        self.api_button = ttk.Button(
+            button_frame, 
+            text=_("set_api_key"), 
+            command=self.prompt_for_api_key, 
+            width=15
+        )
+        self.api_button.pack(side=tk.LEFT, padx=10)
+        
+        self.results_button = ttk.Button(
+            button_frame, 
+            text=_("browse_results"), 
+            command=self.browse_results, 
+            width=15, 
+            state=tk.DISABLED
+        )
+        self.results_button.pack(side=tk.LEFT, padx=10)
+        
+        # 底部版权信息
+        tk.Label(
+            self, 
+            text=_("copyright"),
+            font=("微软雅黑", 8),
+            fg="#999999",
+            bg="#f5f5f5"
+        ).pack(side=tk.BOTTOM, pady=5)
+    
+    def on_drop(self, event):
+        """处理文件拖放"""
+        files = event.data
+        
+        # 在Windows上可能会将多个文件路径作为一个字符串返回
+        # 处理这种情况并分割它们
+        if isinstance(files, str):
+            # 移除可能的花括号或引号
+            files = files.strip('{}')
+            # 检查是否有多个文件（以空格分隔）
+            if ' ' in files and ('"' in files or "'"):
+                # 按照引号分割多个文件
+                import re
+                file_paths = re.findall(r'\"(.+?)\"', files)
+                if not file_paths:
+                    file_paths = re.findall(r'\'(.+?)\'', files)
+                if not file_paths:
+                    file_paths = [files]  # 回退到单个文件
+            else:
+                # 单个文件
+                file_paths = [files.strip('"').strip("'")]
+        else:
+            file_paths = [files]
+        
+        # 检查文件是否为PDF或支持的图像格式
+        file_paths = [
+            file_path for file_path in file_paths
+            if file_path.lower().endswith('.pdf') or is_image_file(file_path)
+        ]
+        
+        # 提供视觉反馈
+        if file_paths:
+            added_count = self.add_files_to_queue(file_paths)
+            self.status_label.config(text=f"已添加 {added_count} 个文件到队列")
+        else:
+            messagebox.showerror("无效文件", "请拖放PDF文件或支持的图像文件(JPEG, PNG等)。")
+    
+    def on_click(self, event):
+        """处理点击打开文件对话框"""
+        file_paths = filedialog.askopenfilenames(
+            title="选择文件",
+            filetypes=[
+                ("所有支持的文件", "*.pdf;*.jpg;*.jpeg;*.png;*.bmp;*.tiff;*.tif"),
+                ("PDF文件", "*.pdf"),
+                ("图像文件", "*.jpg;*.jpeg;*.png;*.bmp;*.tiff;*.tif")
+            ],
+            initialdir=os.path.expanduser("~\\Documents")
+        )
+        added_count = self.add_files_to_queue(file_paths)
+        
+        if added_count > 0:
+            self.status_label.config(text=f"已添加 {added_count} 个文件到队列")
+    
+    def add_file_to_queue(self, file_path):
+        """添加文件到队列并更新显示"""
+        return self.add_files_to_queue([file_path]) > 0
+    
+    def add_files_to_queue(self, file_paths):
+        """在一个事务中添加多个文件到队列并更新显示，返回新添加的文件数"""
+        # 由队列数据库按路径去重，已在队列中的文件不会重复添加
+        added = self.job_queue.add_many(file_paths)
+        # 列表中失败的任务被重新排队时更新原来的行，不再新增一行
+        rows = {job_id: index for index, job_id in enumerate(self.queue_ids)}
+        for job in added:
+            if job.id in rows:
+                self.file_listbox.delete(rows[job.id])
+                self.file_listbox.insert(rows[job.id], self.queue_row_text(job))
+            else:
+                self.insert_queue_row(job)
+        return len(added)
+    
+    def insert_queue_row(self, job):
+        """在列表框末尾显示一个任务"""
+        self.file_listbox.insert(tk.END, self.queue_row_text(job))
+        self.queue_ids.append(job.id)
+    
+    def queue_row_text(self, job):
+        """列表框中一个任务的显示文本"""
+        file_path = job.path
+        try:
+            file_size = get_pdf_size_mb(file_path)
+        except OSError:
+            file_size = 0.0  # 文件已被移走，处理时会报错
+        # 对于图像文件，显示图像标签
+        text = f"{os.path.basename(file_path)} ({file_size:.1f} MB)"
+        if is_image_file(file_path):
+            text += " [图像]"
+        if job.status == FAILED:
+            text += f" [{_('file_status_failed')}]"
+        return text
+    
+    def refresh_queue_list(self):
+        """按队列数据库重新显示等待处理和失败的任务"""
+        self.file_listbox.delete(0, tk.END)
+        self.queue_ids = []
+        for job in self.job_queue.jobs((QUEUED, FAILED)):
+            self.insert_queue_row(job)
+    
+    def add_files(self):
+        """批量添加文件到队列"""
+        file_paths = filedialog.askopenfilenames(
+            title="选择文件",
+            filetypes=[
+                ("所有支持的文件", "*.pdf;*.jpg;*.jpeg;*.png;*.bmp;*.tiff;*.tif"),
+                ("PDF文件", "*.pdf"),
+                ("图像文件", "*.jpg;*.jpeg;*.png;*.bmp;*.tiff;*.tif")
+            ],
+            initialdir=os.path.expanduser("~\\Documents")
+        )
+        added_count = self.add_files_to_queue(file_paths)
+        
+        if added_count > 0:
+            self.status_label.config(text=f"已添加 {added_count} 个文件到队列")
+    
+    def remove_selected(self):
+        """移除选定的文件"""
+        selected_indices = self.file_listbox.curselection()
+        self.job_queue.remove([self.queue_ids[index] for index in selected_indices])
+        for index in reversed(selected_indices):
+            self.file_listbox.delete(index)
+            del self.queue_ids[index]
+        self.status_label.config(text="选定文件已移除")
+    
+    def clear_queue(self):
+        """清空文件队列"""
+        self.file_listbox.delete(0, tk.END)
+        self.job_queue.remove(self.queue_ids)
+        self.queue_ids = []
+        self.status_label.config(text="文件队列已清空")
+    
+    def prompt_for_api_key(self):
+        """提示用户输入API密钥"""
+        api_dialog = tk.Toplevel(self)
+        api_dialog.title(_("api_key_title"))
+        api_dialog.geometry("480x240")
+        api_dialog.transient(self)
+        api_dialog.grab_set()
+        api_dialog.resizable(False, False)
+        
+        # 对话框内容
+        tk.Label(
+            api_dialog, 
+            text=_("api_key_prompt"), 
+            font=("微软雅黑", 12)
+        ).pack(pady=(15, 5))
+        
+        # 添加申请API链接
+        link_frame = tk.Frame(api_dialog)
+        link_frame.pack(fill=tk.X, padx=20)
+        
+        tk.Label(
+            link_frame,
+            text=_("no_api_key"),
+            font=("微软雅黑", 9),
+            fg="#555555"
+        ).pack(side=tk.LEFT)
+        
+        link_label = tk.Label(
+            link_frame,
+            text=_("apply_here"),
+            font=("微软雅黑", 9, "underline"),
+            fg="#0066cc",
+            cursor="hand2"
+        )
+        link_label.pack(side=tk.LEFT)
+        
+        def open_mistral_website(event):
+            import webbrowser
+            webbrowser.open("https://console.mistral.ai/")
+        
+        link_label.bind("<Button-1>", open_mistral_website)
+        
+        # 添加API激活提示
+        tk.Label(
+            api_dialog,
+            text=_("api_activation_note"),
+            font=("微软雅黑", 9),
+            fg="#FF5500"
+        ).pack(pady=(2, 5))
+        
+        tk.Label(
+            api_dialog,
+            text=_("api_security_note"),
+            font=("微软雅黑", 9),
+            fg="#555555"
+        ).pack()
+        
+        api_var = tk.StringVar()
+        if self.api_key:
+            api_var.set(self.api_key)
+        
+        entry_frame = tk.Frame(api_dialog)
+        entry_frame.pack(pady=15, fill=tk.X, padx=20)
+        
+        entry = tk.Entry(
+            entry_frame, 
+            textvariable=api_var, 
+            width=50, 
+            show="•",
+            font=("Consolas", 10)
+        )
+        entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        # 显示/隐藏密钥切换
+        self.show_key = False
+        
+        def toggle_show():
+            self.show_key = not self.show_key
+            entry.config(show="" if self.show_key else "•")
+            show_btn.config(text=_("hide") if self.show_key else _("show"))
+        
+        show_btn = ttk.Button(entry_frame, text=_("show"), width=5, command=toggle_show)
+        show_btn.pack(side=tk.RIGHT, padx=(5, 0))
+        
+        button_frame = tk.Frame(api_dialog)
+        button_frame.pack(pady=15)
+        
+        def save_key():
+            key = api_var.get().strip()
+            if key:
+                self.api_key = key
+                Config.save_api_key(key)
+                api_dialog.destroy()
+                self.status_label.config(text=_("status_api_key_saved"))
+            else:
+                messagebox.showerror(_("error"), _("error_empty_api_key"), parent=api_dialog)
+        
+        ttk.Button(
+            button_frame, 
+            text=_("save"), 
+            command=save_key, 
+            width=10
+        ).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(
+            button_frame, 
+            text=_("cancel"), 
+            command=api_dialog.destroy, 
+            width=10
+        ).pack(side=tk.LEFT, padx=5)
+        
+        # 将对话框居中显示
+        api_dialog.update_idletasks()
+        x = self.winfo_x() + (self.winfo_width() - api_dialog.winfo_width()) // 2
+        y = self.winfo_y() + (self.winfo_height() - api_dialog.winfo_height()) // 2
+        api_dialog.geometry(f"+{x}+{y}")
+        
+        # 设置焦点
+        entry.focus_set()
+    
+    def update_file_row(self, row_id, fraction=None, status=None, pages=None):
+        """更新进度表中某个文件的一行"""
+        if not self.file_table.exists(row_id):
+            return
+        if pages is not None:
+            self.file_table.set(row_id, "pages", pages)
+        if fraction is not None:
+            self.file_table.set(row_id, "progress", f"{int(fraction * 100)}%")
+        if status is not None:
+            self.file_table.set(row_id, "status", status)
+    
+    def update_total_progress(self, pages_done, total_pages, files_done, total_files):
+        """按已完成页数更新总体进度"""
+        self.total_progress["value"] = int((pages_done / total_pages) * 100) if total_pages else 0
+        self.status_label.config(
+            text=_("status_pages_progress").format(int(pages_done), total_pages, files_done, total_files)
+        )
+    
+    def process_queue(self):
+        """处理文件队列"""
+        # 列表中上次失败的任务重新排队，与等待中的任务一起处理
+        self.job_queue.retry((FAILED,), self.queue_ids)
+        jobs = self.job_queue.jobs((QUEUED,), job_ids=self.queue_ids)
+        if not jobs:
+            messagebox.showerror("错误", "请先添加一个或多个PDF文件")
+            return
+        
+        if not self.api_key:
+            messagebox.showerror("错误", "请先设置您的API密钥")
+            self.prompt_for_api_key()
+            return
+        
+        # 重置UI状态
+        self.total_progress["value"] = 0
+        self.status_label.config(text="正在启动...")
+        self.process_button.config(state=tk.DISABLED)
+        self.results_button.config(state=tk.DISABLED)
+        self.output_dirs.clear()
+        
+        files = [job.path for job in jobs]
+        output_base_dir = self.output_path_var.get()  # 使用用户选择的输出路径
+        try:
+            max_parallel = max(1, int(self.parallel_files_var.get()))
+        except (tk.TclError, ValueError):
+            max_parallel = DEFAULT_FILE_CONCURRENCY
+        cache = self.ocr_cache if self.use_cache_var.get() else None
+        image_format = self.image_format_var.get()
+        output_options = {
+            "image_format": image_format if image_format in TRANSCODE_FORMATS else None,
+            "shared_image_store": self.shared_images_var.get(),
+            "text_only": self.text_only_var.get(),
+        }
+        search_index = SearchIndex() if self.search_index_var.get() else None
+        # 同一API密钥的所有处理共用一个引擎(及其连接池)
+        engine = get_engine(self.api_key)
+        
+        # 为每个文件创建一行进度
+        self.file_table.delete(*self.file_table.get_children())
+        rows = [
+            self.file_table.insert("", tk.END, values=(os.path.basename(file_path), "", "0%", _("file_status_waiting")))
+            for file_path in files
+        ]
+        
+        # 在单独的线程中调度以保持UI响应，所有界面更新通过 after 回到主线程
+        def process_thread():
+            lock = threading.Lock()
+            page_counts = []
+            for index, file_path in enumerate(files):
+                try:
+                    page_count = get_document_page_count(file_path)
+                except Exception:
+                    page_count = 1  # 无法读取的文件在处理时会报错
+                page_counts.append(page_count)
+                self.after(0, self.update_file_row, rows[index], None, None, page_count)
+            total_pages = sum(page_counts)
+            pages_done = [0.0] * len(files)
+            files_done = 0
+            
+            def report_total():
+                with lock:
+                    done = sum(pages_done)
+                    finished = files_done
+                self.after(0, self.update_total_progress, done, total_pages, finished, len(files))
+            
+            def make_progress_callback(index):
+                def progress_callback(current, total, message=None):
+                    fraction = min(1.0, current / total) if total else 0
+                    with lock:
+                        pages_done[index] = fraction * page_counts[index]
+                    self.after(0, self.update_file_row, rows[index], fraction, message or _("file_status_processing"))
+                    report_total()
+                return progress_callback
+            
+            def process_file(index, file_path):
+                # 任务已被同时运行的命令行处理程序领取时跳过
+                if not self.job_queue.start(jobs[index].id):
+                    return None
+                self.after(0, self.update_file_row, rows[index], 0, _("file_status_processing"))
+                try:
+                    output_dir = process_pdf(
+                        file_path, self.api_key, make_progress_callback(index), output_base_dir,
+                        cache=cache, output_options=output_options, search_index=search_index, engine=engine
+                    )
+                except Exception as e:
+                    self.job_queue.fail(jobs[index].id, f"{type(e).__name__}: {e}", max_attempts=1)
+                    raise
+                self.job_queue.complete(jobs[index].id, output_dir)
+                return output_dir
+            
+            failures = []
+            with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+                futures = {executor.submit(process_file, i, p): i for i, p in enumerate(files)}
+                for future in as_completed(futures):
+                    index = futures[future]
+                    try:
+                        output_dir = future.result()
+                        with lock:
+                            pages_done[index] = page_counts[index]
+                        if output_dir is None:
+                            self.after(0, self.update_file_row, rows[index], None, _("file_status_skipped"))
+                        else:
+                            self.output_dirs.append(output_dir)
+                            self.after(0, self.update_file_row, rows[index], 1, _("file_status_done"))
+                    except Exception as e:
+                        # 单个文件失败不影响队列中其他文件
+                        failures.append((files[index], e))
+                        with lock:
+                            pages_done[index] = 0
+                        self.after(0, self.update_file_row, rows[index], None, f"{_('file_status_failed')}: {e}")
+                    with lock:
+                        files_done += 1
+                    report_total()
+            
+            self.after(0, self.on_queue_finished, failures)
+        
+        threading.Thread(target=process_thread, daemon=True).start()
+    
+    def on_queue_finished(self, failures):
+        """队列处理结束后更新UI"""
+        self.process_button.config(state=tk.NORMAL)
+        # 已完成的任务移出列表，失败的任务留在列表中以便重试
+        self.refresh_queue_list()
+        if self.output_dirs:
+            self.results_button.config(state=tk.NORMAL)
+        
+        if failures:
+            details = "\n".join(f"{os.path.basename(path)}: {error}" for path, error in failures)
+            messagebox.showerror(_("error"), _("error_files_failed").format(len(failures), details))
+            self.status_label.config(text=_("error_process_failed"))
+        else:
+            messagebox.showinfo("处理完成", "所有PDF文件转换已完成!")
+            self.status_label.config(text=_("success_all_files_done"))
+    
+    def browse_results(self):
+        """在文件资源管理器中打开输出目录"""
+        if self.output_dirs:
+            for output_dir in self.output_dirs:
+                if os.path.exists(output_dir):
+                    # 跨平台打开目录
+                    if os.name == 'nt':  # Windows
+                        os.startfile(os.path.abspath(output_dir))
+                    elif os.name == 'posix':  # macOS, Linux
+                        if os.uname().sysname == 'Darwin':  # macOS
+                            subprocess.call(['open', output_dir])
+                        else:  # Linux
+                            subprocess.call(['xdg-open', output_dir])
+        else:
+            messagebox.showerror(_("error"), _("error_no_output_dir"))
+    
+    def choose_output_dir(self):
+        """选择输出目录"""
+        selected_dir = filedialog.askdirectory(
+            title=_("save_location"),
+            initialdir=self.output_path_var.get() or os.path.expanduser("~\\Documents")
+        )
+        if selected_dir:
+            self.output_path_var.set(selected_dir)
+            self.status_label.config(text=_("status_output_set").format(selected_dir))
+    
+    def change_language(self, event=None):
+        """切换用户界面语言"""
+        selected = self.language_var.get()
+        # 从下拉框的值中提取语言代码 (格式: "zh_CN - 简体中文")
+        lang_code = selected.split(' - ')[0]
+        
+        if lang_code in i18n.LANGUAGES:
+            # 更改语言
+            i18n.change_language(lang_code)
+            # 保存用户偏好
+            i18n.save_language_preference(lang_code)
+            
+            # 更新UI
+            self.update_ui_language()
+            
+            # 显示确认消息
+            if lang_code == "zh_CN":
+                self.status_label.config(text="语言已更改为简体中文")
+            elif lang_code == "en_US":
+                self.status_label.config(text="Language changed to English")
+            elif lang_code == "ja_JP":
+                self.status_label.config(text="言語が日本語に変更されました")
+            elif lang_code == "ko_KR":
+                self.status_label.config(text="언어가 한국어로 변경되었습니다")
+    
+    def update_ui_language(self):
+        """更新用户界面的语言"""
+        # 主窗口标题
+        self.title(_("app_title"))
+        
+        # 销毁所有现有控件
+        for widget in self.winfo_children():
+            widget.destroy()
+        
+        # 重新创建所有控件
+        self.create_widgets()
+        
+        # 恢复状态
+        self.refresh_queue_list()
+        if hasattr(self, 'results_button') and self.output_dirs:
+            self.results_button.config(state=tk.NORMAL)
+
+def main():
+    # 显示欢迎信息
+    print("启动 Mistral OCR 转换工具...")
+    
+    if not TKDND_AVAILABLE:
+        print("警告: tkinterdnd2 模块未安装。拖放功能将不可用。")
+        print("要启用拖放功能，请安装: pip install tkinterdnd2")
+    
+    if not PILLOW_AVAILABLE:
+        print("警告: Pillow 模块未安装。图像转换功能将不可用。")
+        print("要启用图像转换功能，请安装: pip install pillow")
+    
+    # 启动应用
+    app = OCRApp()
+    
+    # 设置窗口图标(如果有)
+    try:
+        app.iconbitmap("icon.ico")
+    except:
+        pass
+    
+    app.mainloop()
+
+if __name__ == "__main__":
+    main()
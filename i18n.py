@@ -9,9 +9,6 @@ from pathlib import Path
 # 语言资源目录
 RESOURCE_DIR = Path(os.path.dirname(os.path.abspath(__file__))) / "locales"
 
-# 确保资源目录存在
-os.makedirs(RESOURCE_DIR, exist_ok=True)
-
 # 支持的语言
 LANGUAGES = {
     "zh_CN": "简体中文",
@@ -33,7 +30,11 @@ def load_language_resource(lang_code):
     
     resource_path = RESOURCE_DIR / f"{lang_code}.json"
     
-    # 如果语言资源文件不存在，返回空字典
+    # 资源文件不存在时只生成这一种语言的默认文件
+    if not resource_path.exists() and lang_code in LANGUAGES:
+        init_language_resources([lang_code])
+    
+    # 如果语言资源文件仍不存在，返回空字典
     if not resource_path.exists():
         _resources[lang_code] = {}
         return {}
@@ -107,8 +108,8 @@ def load_language_preference():
         return None
 
 # 初始化语言资源文件（如果它们不存在）
-def init_language_resources():
-    """初始化默认语言资源文件"""
+def init_language_resources(lang_codes=None):
+    """初始化默认语言资源文件，只写入 lang_codes(默认为全部语言)中缺失的文件"""
     # 中文资源
     zh_resource = {
         "app_title": "Mistral OCR PDF 转换工具",
@@ -170,7 +171,25 @@ def init_language_resources():
         "page_title": "第 {0} 页",
         "complete_file": "完整结果.md",
         "part_file": "部分_{0}.md",
-        "images_dir": "图片"
+        "images_dir": "图片",
+        "parallel_files": "并行文件数:",
+        "column_file": "文件",
+        "column_pages": "页数",
+        "column_progress": "进度",
+        "column_status": "状态",
+        "file_status_waiting": "等待中",
+        "file_status_processing": "处理中",
+        "file_status_done": "已完成",
+        "file_status_failed": "失败",
+        "file_status_skipped": "已由其他进程处理",
+        "status_pages_progress": "已完成 {0}/{1} 页，{2}/{3} 个文件",
+        "error_files_failed": "{0} 个文件处理失败:\n{1}",
+        "use_cache": "复用已缓存的OCR结果",
+        "image_format": "图片格式:",
+        "image_format_original": "原始格式",
+        "shared_image_store": "同一保存位置的文档共享图片",
+        "text_only": "仅文本(不保存图片)",
+        "build_search_index": "建立全文索引"
     }
     
     # 英文资源
@@ -234,7 +253,25 @@ def init_language_resources():
         "page_title": "Page {0}",
         "complete_file": "complete.md",
         "part_file": "part_{0}.md",
-        "images_dir": "images"
+        "images_dir": "images",
+        "parallel_files": "Parallel files:",
+        "column_file": "File",
+        "column_pages": "Pages",
+        "column_progress": "Progress",
+        "column_status": "Status",
+        "file_status_waiting": "Waiting",
+        "file_status_processing": "Processing",
+        "file_status_done": "Done",
+        "file_status_failed": "Failed",
+        "file_status_skipped": "Taken by another runner",
+        "status_pages_progress": "Completed {0}/{1} pages, {2}/{3} files",
+        "error_files_failed": "{0} file(s) failed:\n{1}",
+        "use_cache": "Reuse cached OCR results",
+        "image_format": "Image format:",
+        "image_format_original": "Original",
+        "shared_image_store": "Share images across documents",
+        "text_only": "Text only (no images)",
+        "build_search_index": "Build search index"
     }
     
     # 日文资源
@@ -298,7 +335,25 @@ def init_language_resources():
         "page_title": "ページ {0}",
         "complete_file": "完全結果.md",
         "part_file": "部分_{0}.md",
-        "images_dir": "画像"
+        "images_dir": "画像",
+        "parallel_files": "並列ファイル数:",
+        "column_file": "ファイル",
+        "column_pages": "ページ数",
+        "column_progress": "進捗",
+        "column_status": "状態",
+        "file_status_waiting": "待機中",
+        "file_status_processing": "処理中",
+        "file_status_done": "完了",
+        "file_status_failed": "失敗",
+        "file_status_skipped": "他のプロセスが処理中",
+        "status_pages_progress": "{0}/{1} ページ、{2}/{3} ファイル完了",
+        "error_files_failed": "{0} 個のファイルの処理に失敗しました:\n{1}",
+        "use_cache": "キャッシュ済みのOCR結果を再利用",
+        "image_format": "画像形式:",
+        "image_format_original": "元の形式",
+        "shared_image_store": "文書間で画像を共有",
+        "text_only": "テキストのみ(画像なし)",
+        "build_search_index": "全文索引を作成"
     }
     
     # 韩文资源
@@ -362,37 +417,45 @@ def init_language_resources():
         "page_title": "페이지 {0}",
         "complete_file": "전체결과.md",
         "part_file": "부분_{0}.md",
-        "images_dir": "이미지"
+        "images_dir": "이미지",
+        "parallel_files": "병렬 파일 수:",
+        "column_file": "파일",
+        "column_pages": "페이지 수",
+        "column_progress": "진행",
+        "column_status": "상태",
+        "file_status_waiting": "대기 중",
+        "file_status_processing": "처리 중",
+        "file_status_done": "완료",
+        "file_status_failed": "실패",
+        "file_status_skipped": "다른 프로세스에서 처리 중",
+        "status_pages_progress": "{0}/{1} 페이지, {2}/{3} 파일 완료",
+        "error_files_failed": "{0}개 파일 처리 실패:\n{1}",
+        "use_cache": "캐시된 OCR 결과 재사용",
+        "image_format": "이미지 형식:",
+        "image_format_original": "원본 형식",
+        "shared_image_store": "문서 간 이미지 공유",
+        "text_only": "텍스트만(이미지 없음)",
+        "build_search_index": "전문 검색 색인 생성"
     }
     
     # 保存语言资源文件
-    zh_path = RESOURCE_DIR / "zh_CN.json"
-    en_path = RESOURCE_DIR / "en_US.json"
-    ja_path = RESOURCE_DIR / "ja_JP.json"
-    ko_path = RESOURCE_DIR / "ko_KR.json"
-    
-    if not zh_path.exists():
-        with open(zh_path, 'w', encoding='utf-8') as f:
-            json.dump(zh_resource, f, ensure_ascii=False, indent=2)
-    
-    if not en_path.exists():
-        with open(en_path, 'w', encoding='utf-8') as f:
-            json.dump(en_resource, f, ensure_ascii=False, indent=2)
-    
-    if not ja_path.exists():
-        with open(ja_path, 'w', encoding='utf-8') as f:
-            json.dump(ja_resource, f, ensure_ascii=False, indent=2)
+    resources = {
+        "zh_CN": zh_resource,
+        "en_US": en_resource,
+        "ja_JP": ja_resource,
+        "ko_KR": ko_resource,
+    }
     
-    if not ko_path.exists():
-        with open(ko_path, 'w', encoding='utf-8') as f:
-            json.dump(ko_resource, f, ensure_ascii=False, indent=2)
+    os.makedirs(RESOURCE_DIR, exist_ok=True)
+    for lang_code in lang_codes or resources:
+        resource_path = RESOURCE_DIR / f"{lang_code}.json"
+        if lang_code in resources and not resource_path.exists():
+            with open(resource_path, 'w', encoding='utf-8') as f:
+                json.dump(resources[lang_code], f, ensure_ascii=False, indent=2)
 
 # 初始化
 def initialize():
-    """初始化国际化系统"""
-    # 创建语言资源文件
-    init_language_resources()
-    
+    """初始化国际化系统，只读取当前语言的资源文件(缺失时才生成)"""
     # 加载用户语言偏好
     preferred_lang = load_language_preference()
     if preferred_lang and preferred_lang in LANGUAGES:
@@ -0,0 +1,146 @@
+"""
+任务清单模块 (job_manifest.py)
+在每个输出目录中记录源文件指纹、分块页码范围和已完成的分块，用于中断后续传
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+# 清单文件名
+MANIFEST_FILE = "manifest.json"
+
+def fingerprint_file(file_path: str, known: dict = None) -> dict:
+    """
+    计算文件指纹(大小、修改时间、SHA-256)。
+    如果 known 的大小和修改时间与文件一致，则沿用其中的哈希值，避免重新读取大文件。
+    """
+    stat = os.stat(file_path)
+    fingerprint = {"size": stat.st_size, "mtime": stat.st_mtime}
+    if known and known.get("size") == stat.st_size and known.get("mtime") == stat.st_mtime and known.get("sha256"):
+        fingerprint["sha256"] = known["sha256"]
+        return fingerprint
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    fingerprint["sha256"] = digest.hexdigest()
+    return fingerprint
+
+class JobManifest:
+    """单个文档的处理清单，所有修改都会立即写回磁盘"""
+
+    def __init__(self, output_dir: str, source_path: str, fingerprint: dict, chunks: list = None,
+                 total_pages: int = None, options: dict = None):
+        self.output_dir = output_dir
+        self.source_path = source_path
+        self.fingerprint = fingerprint
+        # 生成这些结果时使用的请求与输出选项(是否包含图片、图片格式等)
+        self.options = options or {}
+        # 每个分块: {"start_page", "end_page", "part_file", "done"}，页码从0开始，end_page 不包含
+        self.chunks = chunks or []
+        # 文档总页数；分块是边分割边记录的，覆盖到总页数时分块计划才完整
+        self.total_pages = total_pages
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.output_dir, MANIFEST_FILE)
+
+    @classmethod
+    def load(cls, output_dir: str, source_path: str, options: dict = None) -> "JobManifest":
+        """
+        读取输出目录中的清单。
+        源文件指纹不一致(文件已变化)、options 与清单记录的选项不同(已有结果按其他选项生成)
+        或清单无法读取时，返回一个空的新清单，所有分块都会重新处理。
+        """
+        options = options or {}
+        manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+        data = {}
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+
+        fingerprint = fingerprint_file(source_path, data.get("source"))
+        if data.get("source", {}).get("sha256") != fingerprint["sha256"] or data.get("options", {}) != options:
+            return cls(output_dir, source_path, fingerprint, options=options)
+        return cls(output_dir, source_path, fingerprint, data.get("chunks"), data.get("total_pages"), options)
+
+    def save(self) -> None:
+        """原子地写回清单文件"""
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        data = {
+            "source_path": os.path.abspath(self.source_path),
+            "source": self.fingerprint,
+            "options": self.options,
+            "total_pages": self.total_pages,
+            "chunks": self.chunks,
+        }
+        fd, temp_path = tempfile.mkstemp(dir=self.output_dir, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def set_chunks(self, page_ranges: list, total_pages: int) -> None:
+        """记录完整的分块计划，page_ranges 为 (start_page, end_page) 列表"""
+        with self._lock:
+            self.chunks = [
+                {"start_page": start, "end_page": end, "part_file": None, "done": False}
+                for start, end in page_ranges
+            ]
+            self.total_pages = total_pages
+            self._save()
+
+    def set_total_pages(self, total_pages: int) -> None:
+        with self._lock:
+            self.total_pages = total_pages
+            self._save()
+
+    def add_chunk(self, start_page: int, end_page: int) -> int:
+        """在分块计划末尾追加一个刚分割出的分块，返回其索引"""
+        with self._lock:
+            self.chunks.append({"start_page": start_page, "end_page": end_page, "part_file": None, "done": False})
+            self._save()
+            return len(self.chunks) - 1
+
+    def planned_pages(self) -> int:
+        """已经纳入分块计划的页数"""
+        return self.chunks[-1]["end_page"] if self.chunks else 0
+
+    def plan_complete(self) -> bool:
+        return self.total_pages is not None and self.planned_pages() >= self.total_pages
+
+    def mark_done(self, index: int, part_file: str) -> None:
+        """标记分块已完成(可在工作线程中调用)"""
+        with self._lock:
+            self.chunks[index]["part_file"] = os.path.basename(part_file)
+            self.chunks[index]["done"] = True
+            self._save()
+
+    def _chunk_finished(self, chunk: dict) -> bool:
+        return bool(chunk["done"] and chunk["part_file"]
+                    and os.path.exists(os.path.join(self.output_dir, chunk["part_file"])))
+
+    def pending_chunks(self) -> list:
+        """返回尚未完成(或分块结果文件已丢失)的分块索引"""
+        return [i for i, chunk in enumerate(self.chunks) if not self._chunk_finished(chunk)]
+
+    def part_files(self) -> list:
+        """按页码顺序返回所有已完成分块的结果文件路径"""
+        return [os.path.join(self.output_dir, chunk["part_file"]) for chunk in self.chunks if self._chunk_finished(chunk)]
+
+    def finished_pages(self) -> int:
+        """已完成分块包含的页数"""
+        return sum(chunk["end_page"] - chunk["start_page"] for chunk in self.chunks if self._chunk_finished(chunk))
+
+    def is_complete(self) -> bool:
+        return bool(self.chunks) and self.plan_complete() and not self.pending_chunks()
@@ -0,0 +1,499 @@
+"""
+任务队列模块 (job_queue.py)
+保存在本地 SQLite 数据库中的文件处理队列：按路径去重，记录每个任务的状态、尝试次数和各阶段时间，支持优先级，
+进程崩溃时处于处理中的任务在下次启动时重新排队。图形界面和命令行 (python job_queue.py run) 共用同一个队列
+"""
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# 默认队列数据库位置
+DEFAULT_QUEUE_PATH = Path.home() / ".mistral_ocr_queue.sqlite"
+# 失败的任务最多尝试的次数(包括第一次)
+DEFAULT_MAX_ATTEMPTS = 3
+# run --follow 时检查新任务的间隔(秒)
+DEFAULT_FOLLOW_INTERVAL = 2.0
+# 失败后重新排队的任务至少等待的时间(秒)，每多失败一次加倍
+DEFAULT_RETRY_DELAY = 5.0
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+STATUSES = (QUEUED, RUNNING, DONE, FAILED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    output_dir TEXT,
+    error TEXT,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    not_before REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, priority DESC, id);
+"""
+
+_COLUMNS = ("id", "path", "priority", "status", "attempts", "worker", "output_dir", "error",
+            "enqueued_at", "started_at", "finished_at", "not_before")
+
+def worker_name() -> str:
+    """当前进程的标识(主机名:进程号)，用于判断处理中的任务是否已失去处理它的进程"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def process_alive(pid: int) -> bool:
+    """判断本机上的进程是否仍在运行"""
+    if os.name == 'nt':
+        # Windows 上 os.kill 会结束进程，改为查询进程退出码
+        import ctypes
+
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))) and \
+                exit_code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # 进程存在但属于其他用户
+    return True
+
+class Job:
+    """队列中的一个任务"""
+    __slots__ = _COLUMNS
+
+    def __init__(self, row):
+        for name, value in zip(_COLUMNS, row):
+            setattr(self, name, value)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in _COLUMNS}
+
+class JobQueue:
+    """持久化的文件处理队列。每次操作单独打开连接，可在多个线程或进程中同时使用"""
+
+    def __init__(self, db_path=DEFAULT_QUEUE_PATH):
+        self.db_path = str(db_path)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            # 旧版本创建的队列没有 not_before 列
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "not_before" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN not_before REAL")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _write(self):
+        """打开一个立即获取写锁的事务，保证多个进程领取任务时不会冲突"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def _run_write(self, action):
+        conn = self._write()
+        try:
+            result = action(conn)
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def add_many(self, file_paths, priority: int = 0) -> list:
+        """
+        把文件加入队列，返回新加入的 Job 列表(按加入顺序)。
+        已在队列中等待或处理中的文件不会重复加入；已完成或失败的文件重新排队。
+        """
+        now = time.time()
+        paths = list(dict.fromkeys(os.path.abspath(path) for path in file_paths))
+
+        def action(conn):
+            added = []
+            for path in paths:
+                cursor = conn.execute(
+                    "INSERT INTO jobs (path, priority, enqueued_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (path) DO UPDATE SET status = 'queued', priority = excluded.priority, "
+                    "attempts = 0, worker = NULL, output_dir = NULL, error = NULL, "
+                    "enqueued_at = excluded.enqueued_at, started_at = NULL, finished_at = NULL, not_before = NULL "
+                    "WHERE jobs.status IN ('done', 'failed')",
+                    (path, priority, now)
+                )
+                if cursor.rowcount:
+                    added.append(path)
+            if not added:
+                return []
+            # 大批量加入时一次查询取回所有新任务
+            rows = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE status = 'queued' AND enqueued_at = ?", (now,)
+            ).fetchall()
+            jobs = {row[1]: Job(row) for row in rows}
+            return [jobs[path] for path in added if path in jobs]
+
+        return self._run_write(action)
+
+    def add(self, file_path: str, priority: int = 0):
+        """把一个文件加入队列，返回新加入的 Job，已在队列中时返回 None"""
+        added = self.add_many([file_path], priority)
+        return added[0] if added else None
+
+    def start(self, job_id: int, worker: str = None) -> bool:
+        """把一个等待中的任务标记为处理中；任务已被其他进程领取或已移除时返回 False"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, started_at = ?, "
+                "finished_at = NULL, not_before = NULL WHERE id = ? AND status = 'queued'",
+                (worker or worker_name(), time.time(), job_id)
+            )
+            return cursor.rowcount == 1
+
+    def claim(self, worker: str = None):
+        """
+        领取优先级最高(相同时最早加入)的等待中任务并标记为处理中。
+        失败后等待重试的任务在 not_before 之前不会被领取。没有可领取的任务时返回 None
+        """
+        def action(conn):
+            row = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE status = 'queued' "
+                "AND (not_before IS NULL OR not_before <= ?) ORDER BY priority DESC, id LIMIT 1",
+                (time.time(),)
+            ).fetchone()
+            if row is None:
+                return None
+            job = Job(row)
+            job.status, job.attempts = RUNNING, job.attempts + 1
+            job.worker, job.started_at, job.finished_at = worker or worker_name(), time.time(), None
+            job.not_before = None
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, worker = ?, started_at = ?, finished_at = NULL, "
+                "not_before = NULL WHERE id = ?",
+                (job.status, job.attempts, job.worker, job.started_at, job.id)
+            )
+            return job
+
+        return self._run_write(action)
+
+    def complete(self, job_id: int, output_dir: str = None) -> None:
+        """把任务标记为完成"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', output_dir = ?, error = NULL, finished_at = ? WHERE id = ?",
+                (output_dir, time.time(), job_id)
+            )
+
+    def fail(self, job_id: int, error: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+             retry_delay: float = DEFAULT_RETRY_DELAY) -> str:
+        """
+        记录任务失败：尝试次数未达到 max_attempts 时重新排队，否则标记为失败。返回任务的新状态。
+        重新排队的任务要等 retry_delay * 2^(尝试次数-1) 秒后才会被领取
+        """
+        def action(conn):
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            attempts = row[0]
+            status = QUEUED if attempts < max_attempts else FAILED
+            not_before = now + retry_delay * 2 ** max(0, attempts - 1) if status == QUEUED else None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, error = ?, finished_at = ?, not_before = ? WHERE id = ?",
+                (status, error, now, not_before, job_id)
+            )
+            return status
+
+        return self._run_write(action)
+
+    def retry(self, statuses=(FAILED,), job_ids=None) -> int:
+        """把指定状态的任务(给出 job_ids 时只限这些任务)重新排队，尝试次数清零，返回数量"""
+        sql = ("UPDATE jobs SET status = 'queued', attempts = 0, worker = NULL, error = NULL, "
+               "started_at = NULL, finished_at = NULL, not_before = NULL "
+               f"WHERE status IN ({', '.join('?' * len(statuses))})")
+        with self._connect() as conn:
+            if job_ids is None:
+                return conn.execute(sql, tuple(statuses)).rowcount
+            cursor = conn.executemany(sql + " AND id = ?", [tuple(statuses) + (job_id,) for job_id in job_ids])
+            return cursor.rowcount
+
+    def next_retry_at(self):
+        """失败后等待重试的任务中最早可以领取的时间(可能已经过去)，没有这样的任务时返回 None"""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT MIN(not_before) FROM jobs WHERE status = 'queued' AND not_before IS NOT NULL"
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def recover(self, stale_after: float = None) -> int:
+        """
+        把失去处理进程的任务重新排队：本机上处理它的进程已不存在，
+        或(给出 stale_after 时)开始处理已超过 stale_after 秒。返回数量
+        """
+        host = socket.gethostname()
+        now = time.time()
+
+        def action(conn):
+            orphaned = []
+            for job_id, worker, started_at in conn.execute(
+                    "SELECT id, worker, started_at FROM jobs WHERE status = 'running'").fetchall():
+                worker_host, _, pid = (worker or "").rpartition(":")
+                dead = worker_host == host and pid.isdigit() and not process_alive(int(pid))
+                stale = stale_after is not None and now - (started_at or 0) > stale_after
+                if dead or stale:
+                    orphaned.append((job_id,))
+            conn.executemany(
+                "UPDATE jobs SET status = 'queued', worker = NULL, started_at = NULL WHERE id = ?", orphaned
+            )
+            return len(orphaned)
+
+        return self._run_write(action)
+
+    def remove(self, job_ids) -> None:
+        """从队列中删除任务"""
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+
+    def clear(self, statuses=STATUSES) -> int:
+        """删除指定状态的所有任务，返回数量"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(statuses))})", tuple(statuses)
+            )
+            return cursor.rowcount
+
+    def jobs(self, statuses=STATUSES, limit: int = None, job_ids=None) -> list:
+        """
+        按处理顺序(优先级从高到低，相同时先加入的在前)返回指定状态的任务。
+        给出 job_ids 时只返回其中的任务(在数据库外筛选，任务数不受SQL参数个数限制)
+        """
+        sql = (f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE status IN ({', '.join('?' * len(statuses))}) "
+               "ORDER BY priority DESC, id")
+        params = tuple(statuses)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        conn = self._connect()
+        try:
+            jobs = [Job(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+        if job_ids is not None:
+            job_ids = set(job_ids)
+            jobs = [job for job in jobs if job.id in job_ids]
+        return jobs
+
+    def counts(self) -> dict:
+        """返回每种状态的任务数"""
+        conn = self._connect()
+        try:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        finally:
+            conn.close()
+        return {status: counts.get(status, 0) for status in STATUSES}
+
+    def timings(self) -> dict:
+        """已完成任务的排队时间和处理时间(秒)的中位数与最大值"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT started_at - enqueued_at, finished_at - started_at FROM jobs "
+                "WHERE status = 'done' AND started_at IS NOT NULL AND finished_at IS NOT NULL"
+            ).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return {}
+        waits, runs = zip(*rows)
+        return {
+            "wait_p50_s": round(statistics.median(waits), 3), "wait_max_s": round(max(waits), 3),
+            "run_p50_s": round(statistics.median(runs), 3), "run_max_s": round(max(runs), 3),
+        }
+
+def run_queue(queue: JobQueue, engine, output_base_dir: str = None, cache=None, output_options: dict = None,
+              search_index=None, max_attempts: int = DEFAULT_MAX_ATTEMPTS, follow: bool = False,
+              follow_interval: float = DEFAULT_FOLLOW_INTERVAL, stop_event=None, log=None,
+              retry_delay: float = DEFAULT_RETRY_DELAY) -> dict:
+    """
+    用 engine.file_workers 个线程依次领取并处理队列中的任务，直到队列为空
+    (follow 为 True 时一直等待新任务，直到 stop_event 被设置)。返回 {"done": 数量, "failed": 数量}
+    失败的任务按 retry_delay 指数退避后重试，队列中只剩等待重试的任务时等到其可以领取为止
+    """
+    log = log or (lambda message: None)
+    stop_event = stop_event or threading.Event()
+    lock = threading.Lock()
+    results = {"done": 0, "failed": 0}
+    worker = worker_name()
+
+    def work():
+        while not stop_event.is_set():
+            job = queue.claim(worker)
+            if job is None:
+                retry_at = queue.next_retry_at()
+                if retry_at is None and not follow:
+                    return
+                # 等到最早的重试时间；follow 时同时按 follow_interval 检查新任务
+                wait = follow_interval if retry_at is None else max(0.0, retry_at - time.time())
+                if follow:
+                    wait = min(wait, follow_interval)
+                stop_event.wait(wait)
+                continue
+            try:
+                output_dir = engine.process_pdf(
+                    job.path, None, output_base_dir, cache=cache, output_options=output_options,
+                    search_index=search_index
+                )
+            except Exception as e:
+                status = queue.fail(job.id, f"{type(e).__name__}: {e}", max_attempts, retry_delay)
+                log(f"[{status}] {job.path} (attempt {job.attempts}): {e}")
+                if status == FAILED:
+                    with lock:
+                        results["failed"] += 1
+                continue
+            queue.complete(job.id, output_dir)
+            log(f"[done] {job.path} -> {output_dir} ({time.time() - job.started_at:.1f}s)")
+            with lock:
+                results["done"] += 1
+
+    with ThreadPoolExecutor(max_workers=max(1, engine.file_workers)) as executor:
+        futures = [executor.submit(work) for _ in range(max(1, engine.file_workers))]
+        try:
+            for future in futures:
+                future.result()
+        except KeyboardInterrupt:
+            # 不再领取新任务，等待正在处理的任务完成
+            stop_event.set()
+            raise
+    return results
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Mistral OCR 任务队列")
+    parser.add_argument("--db", default=str(DEFAULT_QUEUE_PATH), help="队列数据库路径")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = commands.add_parser("add", help="把文件加入队列")
+    add_parser.add_argument("paths", nargs="+", help="文件、文件夹或通配符")
+    add_parser.add_argument("-r", "--recursive", action="store_true", help="递归查找子文件夹")
+    add_parser.add_argument("-p", "--priority", type=int, default=0, help="优先级，数值大的先处理")
+
+    run_parser = commands.add_parser("run", help="处理队列中的任务")
+    run_parser.add_argument("-o", "--output-dir", default=None, help="结果保存位置(默认为当前目录)")
+    run_parser.add_argument("-j", "--jobs", type=int, default=None, help="同时处理的文件数")
+    run_parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS, help="每个任务最多尝试的次数")
+    run_parser.add_argument("--retry-delay", type=float, default=DEFAULT_RETRY_DELAY,
+                            help="失败的任务第一次重试前等待的秒数，之后每次加倍")
+    run_parser.add_argument("--follow", action="store_true", help="队列为空时继续等待新任务")
+    run_parser.add_argument("--stale-after", type=float, default=None,
+                            help="开始处理超过多少秒的任务视为已中断并重新排队(用于多台机器共享队列)")
+    run_parser.add_argument("--text-only", action="store_true", help="仅保存文本，不请求图片")
+    run_parser.add_argument("--no-cache", action="store_true", help="不使用OCR结果缓存")
+    run_parser.add_argument("--index", action="store_true", help="处理完成后写入全文索引")
+    run_parser.add_argument("--server-url", default=None, help="API服务器地址(默认为 Mistral 官方地址)")
+    run_parser.add_argument("--api-key", default=None, help="Mistral API密钥(默认读取 MISTRAL_API_KEY 或已保存的密钥)")
+    run_parser.add_argument("-q", "--quiet", action="store_true", help="不在标准错误输出中显示进度")
+
+    status_parser = commands.add_parser("status", help="显示队列状态")
+    status_parser.add_argument("-n", "--limit", type=int, default=20, help="列出的失败任务数")
+    status_parser.add_argument("--json", action="store_true", help="以JSON输出")
+
+    retry_parser = commands.add_parser("retry", help="把失败的任务重新排队")
+    retry_parser.add_argument("--done", action="store_true", help="同时重新处理已完成的任务")
+
+    clear_parser = commands.add_parser("clear", help="删除任务")
+    clear_parser.add_argument("statuses", nargs="*", choices=STATUSES, default=[DONE, FAILED],
+                              help="要删除的任务状态(默认为已完成和失败的任务)")
+
+    args = parser.parse_args(argv)
+    queue = JobQueue(args.db)
+
+    if args.command == "add":
+        from cli import discover_files
+
+        added = queue.add_many(discover_files(args.paths, args.recursive), args.priority)
+        print(f"{len(added)} files queued")
+        return 0
+
+    if args.command == "status":
+        counts = queue.counts()
+        failed = [job.to_dict() for job in queue.jobs((FAILED,), args.limit)]
+        if args.json:
+            print(json.dumps({"counts": counts, "timings": queue.timings(), "failed": failed},
+                             ensure_ascii=False, indent=2))
+            return 0
+        print("  ".join(f"{status}: {count}" for status, count in counts.items()))
+        timings = queue.timings()
+        if timings:
+            print(f"wait p50 {timings['wait_p50_s']:.1f}s (max {timings['wait_max_s']:.1f}s), "
+                  f"run p50 {timings['run_p50_s']:.1f}s (max {timings['run_max_s']:.1f}s)")
+        for job in failed:
+            print(f"failed after {job['attempts']} attempts: {job['path']}: {job['error']}")
+        return 0
+
+    if args.command == "retry":
+        print(f"{queue.retry((FAILED, DONE) if args.done else (FAILED,))} jobs requeued")
+        return 0
+
+    if args.command == "clear":
+        print(f"{queue.clear(tuple(args.statuses))} jobs removed")
+        return 0
+
+    from convert import DEFAULT_FILE_CONCURRENCY, Config
+    from engine import OCREngine
+    from ocr_cache import OCRCache
+    from search_index import SearchIndex
+
+    api_key = args.api_key or os.environ.get("MISTRAL_API_KEY") or Config.load_api_key()
+    if not api_key:
+        print("缺少API密钥: 请使用 --api-key 或设置 MISTRAL_API_KEY", file=sys.stderr)
+        return 2
+
+    def log(message):
+        if not args.quiet:
+            print(message, file=sys.stderr, flush=True)
+
+    recovered = queue.recover(args.stale_after)
+    if recovered:
+        log(f"{recovered} interrupted jobs requeued")
+    stop_event = threading.Event()
+    with OCREngine(api_key, server_url=args.server_url, file_workers=args.jobs or DEFAULT_FILE_CONCURRENCY) as engine:
+        try:
+            results = run_queue(
+                queue, engine, args.output_dir, cache=None if args.no_cache else OCRCache(),
+                output_options={"text_only": args.text_only}, search_index=SearchIndex() if args.index else None,
+                max_attempts=args.max_attempts, follow=args.follow, stop_event=stop_event, log=log,
+                retry_delay=args.retry_delay
+            )
+        except KeyboardInterrupt:
+            log("Interrupted")
+            return 130
+    log(f"{results['done']} done, {results['failed']} failed")
+    return 1 if results["failed"] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,150 @@
+"""
+OCR结果缓存模块 (ocr_cache.py)
+以分块内容的SHA-256、模型名和OCR参数为键，在磁盘上缓存 OCRResponse，按总大小做LRU淘汰
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from mistralai.models import OCRResponse
+
+# 默认缓存目录与大小上限
+DEFAULT_CACHE_DIR = Path.home() / ".mistral_ocr_cache"
+DEFAULT_CACHE_SIZE_MB = 2048
+
+class OCRCache:
+    """磁盘上的OCR结果缓存，命中时可直接重放 OCRResponse 而不再调用API"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size_mb: float = DEFAULT_CACHE_SIZE_MB, enabled: bool = True):
+        self.cache_dir = Path(cache_dir)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        # 设为 False 时绕过缓存：不读取也不写入
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_size = None
+
+    @staticmethod
+    def make_key(content: bytes, model: str, options: dict = None) -> str:
+        """根据分块内容、模型名和OCR参数生成缓存键"""
+        digest = hashlib.sha256(content)
+        digest.update(b"\0" + model.encode("utf-8"))
+        digest.update(b"\0" + json.dumps(options or {}, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _entries(self):
+        """Return (path, size, last access time) for every cache entry."""
+        entries = []
+        if not self.cache_dir.exists():
+            return entries
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def get(self, key: str):
+        """返回缓存的 OCRResponse，未命中时返回 None"""
+        if not self.enabled:
+            return None
+
+        # 在第一次读取时才导入SDK的模型定义
+        from mistralai.models import OCRResponse
+
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                response = OCRResponse.model_validate_json(f.read())
+            # 更新修改时间作为最近访问时间，供LRU淘汰使用
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return response
+
+    def put(self, key: str, response: OCRResponse) -> None:
+        """写入缓存，超出大小上限时淘汰最久未使用的条目"""
+        if not self.enabled:
+            return
+
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 先写入临时文件再替换，避免并发读取到不完整的条目
+        data = response.model_dump_json().encode("utf-8")
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        previous_size = path.stat().st_size if path.exists() else 0
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if self._total_size is None:
+                self._total_size = sum(size for _, size, _ in self._entries())
+            else:
+                self._total_size += len(data) - previous_size
+            if self._total_size > self.max_size_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits. Caller holds the lock."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total_size = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total_size -= size
+        self._total_size = total_size
+
+    def clear(self) -> None:
+        """删除所有缓存条目"""
+        with self._lock:
+            for path, _, _ in self._entries():
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            self._total_size = 0
+
+    def stats(self) -> dict:
+        """返回命中/未命中次数以及条目数量和总大小"""
+        entries = self._entries()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(entries),
+                "size_mb": sum(size for _, size, _ in entries) / (1024 * 1024),
+            }
+
+if __name__ == "__main__":
+    import sys
+
+    # 使用示例: python ocr_cache.py stats | clear
+    cache = OCRCache()
+    if len(sys.argv) > 1 and sys.argv[1] == "clear":
+        cache.clear()
+        print(f"缓存已清空: {cache.cache_dir}")
+    else:
+        print(json.dumps(cache.stats(), indent=2))
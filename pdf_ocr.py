@@ -1,75 +1,39 @@
-from mistralai import Mistral
-from pathlib import Path
 import os
-import base64
-from mistralai import DocumentURLChunk
-from mistralai.models import OCRResponse
-
-def replace_images_in_markdown(markdown_str: str, images_dict: dict) -> str:
-    for img_name, img_path in images_dict.items():
-        markdown_str = markdown_str.replace(f"![{img_name}]({img_name})", f"![{img_name}]({img_path})")
-    return markdown_str
+from pathlib import Path
 
-def save_ocr_results(ocr_response: OCRResponse, output_dir: str) -> None:
-    # 创建输出目录
-    os.makedirs(output_dir, exist_ok=True)
-    images_dir = os.path.join(output_dir, "images")
-    os.makedirs(images_dir, exist_ok=True)
-    
-    all_markdowns = []
-    for page in ocr_response.pages:
-        # 保存图片
-        page_images = {}
-        for img in page.images:
-            img_data = base64.b64decode(img.image_base64.split(',')[1])
-            img_path = os.path.join(images_dir, f"{img.id}.png")
-            with open(img_path, 'wb') as f:
-                f.write(img_data)
-            page_images[img.id] = f"images/{img.id}.png"
-        
-        # 处理markdown内容
-        page_markdown = replace_images_in_markdown(page.markdown, page_images)
-        all_markdowns.append(page_markdown)
-    
-    # 保存完整markdown
-    with open(os.path.join(output_dir, "complete.md"), 'w', encoding='utf-8') as f:
-        f.write("\n\n".join(all_markdowns))
+from convert import job_options, merge_partial_results
+from engine import get_engine
+from job_manifest import JobManifest
 
-def process_pdf(pdf_path: str, api_key: str) -> None:
-    # 初始化客户端
-    client = Mistral(api_key=api_key)
-    
+def process_pdf(pdf_path: str, api_key: str, text_only: bool = False, output_base_dir: str = None) -> str:
     # 确认PDF文件存在
     pdf_file = Path(pdf_path)
     if not pdf_file.is_file():
         raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
-    
-    # 创建输出目录名称
+
+    # 输出目录名称保持不变: ocr_results_<文件名>，不随界面语言变化
     output_dir = f"ocr_results_{pdf_file.stem}"
-    
-    # 上传并处理PDF
-    uploaded_file = client.files.upload(
-        file={
-            "file_name": pdf_file.stem,
-            "content": pdf_file.read_bytes(),
-        },
-        purpose="ocr",
-    )
-    
-    signed_url = client.files.get_signed_url(file_id=uploaded_file.id, expiry=1)
-    pdf_response = client.ocr.process(
-        document=DocumentURLChunk(document_url=signed_url.url), 
-        model="mistral-ocr-latest", 
-        include_image_base64=True
-    )
-    
-    # 保存结果
-    save_ocr_results(pdf_response, output_dir)
+    if output_base_dir:
+        output_dir = os.path.join(output_base_dir, output_dir)
+
+    # 交给共享引擎处理：复用连接池、上传与缓存，请求经过进程内的限流器
+    # 与原来一样只输出每页的markdown，不加页标题
+    output_options = {"text_only": text_only, "page_headers": False}
+    get_engine(api_key).process_pdf(str(pdf_file), output_dir=output_dir, output_options=output_options)
+
+    # 只有一个分块时引擎不合并结果，这里同样生成 complete.md
+    part_files = JobManifest.load(output_dir, str(pdf_file), job_options(output_options)).part_files()
+    if len(part_files) == 1:
+        merge_partial_results(output_dir, part_files)
+
     print(f"OCR处理完成。结果保存在: {output_dir}")
+    return output_dir
 
 if __name__ == "__main__":
     # 使用示例
     API_KEY = "your key"
     PDF_PATH = "zh.pdf"
-    
-    process_pdf(PDF_PATH, API_KEY)
\ No newline at end of file
+    # 只需要文字时设为 True，不下载图片
+    TEXT_ONLY = False
+
+    process_pdf(PDF_PATH, API_KEY, TEXT_ONLY)
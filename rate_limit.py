@@ -0,0 +1,231 @@
+"""
+请求限流模块 (rate_limit.py)
+进程内共享的API限流器：每秒请求数(令牌桶)、自适应并发数(AIMD)，遇到429/5xx时按指数退避加随机抖动重试并遵守 Retry-After
+"""
+import random
+import threading
+import time
+
+# 默认每秒请求数与最大并发请求数
+DEFAULT_REQUESTS_PER_SECOND = 5.0
+DEFAULT_MAX_CONCURRENCY = 8
+# 重试次数与退避时间(秒)
+DEFAULT_MAX_RETRIES = 6
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+
+# 需要重试的HTTP状态码；429 和 503 表示被限流，会同时降低并发数
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+THROTTLE_STATUS_CODES = {429, 503}
+
+def parse_retry_after(value) -> float:
+    """解析 Retry-After 头(秒数或HTTP日期)，无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def classify_error(error: Exception) -> tuple:
+    """
+    判断一次API调用的异常是否可以重试，返回 (可重试, 被限流, Retry-After秒数)。
+    支持 mistralai 的 SDKError(status_code/raw_response)、httpx 的响应错误和网络错误。
+    """
+    response = getattr(error, "raw_response", None) or getattr(error, "response", None)
+    status_code = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status_code is not None:
+        headers = getattr(response, "headers", None) or {}
+        retry_after = parse_retry_after(headers.get("retry-after"))
+        return status_code in RETRYABLE_STATUS_CODES, status_code in THROTTLE_STATUS_CODES, retry_after
+
+    # 连接失败、超时等网络错误(只有用到SDK时 httpx 才会被导入)
+    try:
+        import httpx
+    except ImportError:
+        return False, False, None
+    return isinstance(error, httpx.TransportError), False, None
+
+class RateLimiter:
+    """
+    同步与异步代码共用的限流器。
+    并发上限按AIMD调整：每次成功调用使上限增加约 1/上限，被限流时减半(每个冷却期最多一次)。
+    """
+
+    def __init__(self, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, min_concurrency: int = 1,
+                 max_retries: int = DEFAULT_MAX_RETRIES, base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY):
+        self.requests_per_second = requests_per_second
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._condition = threading.Condition()
+        # 令牌桶，容量为一秒的请求数
+        self._bucket_size = max(1.0, requests_per_second or 1.0)
+        self._tokens = self._bucket_size
+        self._last_refill = time.monotonic()
+        # 当前的自适应并发上限与进行中的请求数
+        self._limit = float(self.max_concurrency)
+        self._in_flight = 0
+        # 收到 Retry-After 后所有调用暂停到此时刻
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+
+    @property
+    def concurrency_limit(self) -> int:
+        return int(self._limit)
+
+    def _try_acquire(self) -> float:
+        """尝试占用一个并发名额和一个令牌。成功返回 0，否则返回建议的等待秒数。调用方持有锁"""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._in_flight >= int(self._limit):
+            return None  # 等待其他请求完成
+
+        if self.requests_per_second:
+            self._tokens = min(self._bucket_size,
+                               self._tokens + (now - self._last_refill) * self.requests_per_second)
+            self._last_refill = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.requests_per_second
+            self._tokens -= 1
+
+        self._in_flight += 1
+        self.calls += 1
+        return 0
+
+    def acquire(self) -> None:
+        """阻塞直到可以发出一个请求"""
+        with self._condition:
+            while True:
+                wait_time = self._try_acquire()
+                if wait_time == 0:
+                    return
+                self._condition.wait(wait_time)
+
+    async def acquire_async(self) -> None:
+        """acquire 的异步版本，等待时不阻塞事件循环"""
+        # 只有异步流程会用到 asyncio，不在导入本模块时加载
+        import asyncio
+
+        while True:
+            with self._condition:
+                wait_time = self._try_acquire()
+            if wait_time == 0:
+                return
+            await asyncio.sleep(wait_time if wait_time is not None else 0.02)
+
+    def release(self, success: bool = True) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            if success and self._limit < self.max_concurrency:
+                # 加性增加：大约每完成 limit 个请求上限加一
+                self._limit = min(float(self.max_concurrency), self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """记录一次失败并返回重试前的等待秒数；不可重试或重试次数用尽时返回 None"""
+        retryable, throttled, retry_after = classify_error(error)
+        if not retryable or attempt >= self.max_retries:
+            return None
+
+        with self._condition:
+            self.retries += 1
+            now = time.monotonic()
+            if throttled:
+                self.throttled += 1
+                # 乘性减少，同一波限流只减一次
+                if now - self._last_decrease >= max(self.base_delay, retry_after or 0):
+                    self._limit = max(float(self.min_concurrency), self._limit / 2)
+                    self._last_decrease = now
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+            self._condition.notify_all()
+
+        # 指数退避加全抖动；有 Retry-After 时至少等待这么久
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after:
+            delay = min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        return delay
+
+    def call(self, func, *args, **kwargs):
+        """通过限流器调用 func，可重试的错误会在退避后重试"""
+        attempt = 0
+        while True:
+            self.acquire()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self.release(success=False)
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.release()
+            return result
+
+    async def call_async(self, func, *args, **kwargs):
+        """call 的异步版本，func 返回协程"""
+        import asyncio
+
+        attempt = 0
+        while True:
+            await self.acquire_async()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                self.release(success=False)
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.release()
+            return result
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "concurrency_limit": int(self._limit),
+                "in_flight": self._in_flight,
+            }
+
+# 进程内共享的限流器
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """返回进程内共享的限流器(第一次调用时按默认参数创建)"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
+
+def configure_rate_limiter(**kwargs) -> RateLimiter:
+    """用新的参数替换进程内共享的限流器，参数同 RateLimiter"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = RateLimiter(**kwargs)
+        return _rate_limiter
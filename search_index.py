@@ -0,0 +1,295 @@
+"""
+全文索引模块 (search_index.py)
+把每个输出目录中每一页的markdown写入本地 SQLite FTS5 数据库，并提供按相关度排序的查询
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+from convert import read_page_index
+from job_manifest import MANIFEST_FILE
+
+# 默认索引数据库位置
+DEFAULT_INDEX_PATH = Path.home() / ".mistral_ocr_index.sqlite"
+# 每个文档占用一段连续的 rowid，重新索引时按范围删除该文档的所有页
+PAGE_ROWID_STRIDE = 1 << 20
+
+# trigram 分词只能匹配至少3个字符的词，更短的词(如"发票"、"ok")改为逐页子串扫描
+MIN_TRIGRAM_TERM_CHARS = 3
+# FTS5 查询语法中的运算符，不作为检索词
+_QUERY_OPERATORS = {"AND", "OR", "NOT"}
+
+# 没有页码索引的旧结果按页标题切分，例如 "## 第 3 页" 或 "## Page 3"
+_LEGACY_PAGE_HEADER = re.compile(r"^## \D*(\d+)\D*$", re.MULTILINE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    output_dir TEXT UNIQUE NOT NULL,
+    document TEXT NOT NULL,
+    source_sha256 TEXT,
+    markdown_mtime REAL,
+    page_count INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+    markdown,
+    document UNINDEXED,
+    page UNINDEXED,
+    output_path UNINDEXED,
+    source_sha256 UNINDEXED,
+    tokenize = 'trigram'
+);
+"""
+
+def make_snippet(markdown: str, term: str, context: int = 32) -> str:
+    """截取 term 第一次出现处前后 context 个字符，格式与 FTS5 snippet() 相同"""
+    start = markdown.lower().find(term.lower())
+    if start < 0:
+        return markdown[:2 * context]
+    end = start + len(term)
+    prefix = "..." if start > context else ""
+    suffix = "..." if end + context < len(markdown) else ""
+    return (f"{prefix}{markdown[max(0, start - context):start]}[{markdown[start:end]}]"
+            f"{markdown[end:end + context]}{suffix}")
+
+def read_manifest(output_dir: str) -> dict:
+    """读取输出目录中的任务清单，不存在或无法解析时返回空字典"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def find_result_markdown(output_dir: str, manifest: dict = None):
+    """返回输出目录的完整结果文件：complete.md，或只有一个分块时的 part 文件"""
+    complete_path = os.path.join(output_dir, "complete.md")
+    if os.path.exists(complete_path):
+        return complete_path
+
+    if manifest and manifest.get("chunks"):
+        part_files = [chunk["part_file"] for chunk in manifest["chunks"] if chunk.get("part_file")]
+    else:
+        part_files = [name for name in os.listdir(output_dir) if re.fullmatch(r"part_\d+\.md", name)]
+    if len(part_files) == 1 and os.path.exists(os.path.join(output_dir, part_files[0])):
+        return os.path.join(output_dir, part_files[0])
+    return None
+
+def iter_markdown_pages(markdown_path: str):
+    """逐页返回 (页码, markdown)。有页码索引时按字节范围读取，否则按页标题切分"""
+    page_ranges = read_page_index(markdown_path)
+    if page_ranges:
+        with open(markdown_path, 'rb') as f:
+            for page, (start, end) in sorted(page_ranges.items()):
+                f.seek(start)
+                yield page, f.read(end - start).decode('utf-8')
+        return
+
+    with open(markdown_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    # 只接受连续递增的页码，避免把正文中的二级标题误认为页标题
+    boundaries = []
+    for match in _LEGACY_PAGE_HEADER.finditer(text):
+        if int(match.group(1)) == len(boundaries) + 1:
+            boundaries.append(match.start())
+    if not boundaries:
+        yield 1, text
+        return
+    for i, start in enumerate(boundaries):
+        end = boundaries[i + 1] if i + 1 < len(boundaries) else len(text)
+        yield i + 1, text[start:end].rstrip()
+
+def find_output_dirs(path: str, recursive: bool = False) -> list:
+    """path 本身是输出目录时返回它，否则返回其中(或递归查找到)的输出目录"""
+    def is_output_dir(directory):
+        return os.path.exists(os.path.join(directory, MANIFEST_FILE)) or find_result_markdown(directory) is not None
+
+    if is_output_dir(path):
+        return [path]
+    output_dirs = []
+    for root, dirs, _files in os.walk(path):
+        for name in sorted(dirs):
+            directory = os.path.join(root, name)
+            if is_output_dir(directory):
+                output_dirs.append(directory)
+        if not recursive:
+            break
+    return output_dirs
+
+class SearchIndex:
+    """OCR结果的全文索引。每次操作单独打开连接，可在多个线程或进程中同时使用"""
+
+    def __init__(self, db_path=DEFAULT_INDEX_PATH):
+        self.db_path = str(db_path)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def index_output(self, output_dir: str, force: bool = False) -> int:
+        """
+        索引一个输出目录，替换该文档原有的所有行，返回写入的页数。
+        源文件哈希和结果文件修改时间都没有变化时跳过(force 为 True 时总是重新索引)。
+        """
+        output_dir = os.path.abspath(output_dir)
+        manifest = read_manifest(output_dir)
+        markdown_path = find_result_markdown(output_dir, manifest)
+        if markdown_path is None:
+            return 0
+
+        source_sha256 = manifest.get("source", {}).get("sha256")
+        source_path = manifest.get("source_path")
+        document = os.path.basename(source_path) if source_path else os.path.basename(output_dir)
+        markdown_mtime = os.path.getmtime(markdown_path)
+
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute(
+                    "SELECT id, source_sha256, markdown_mtime FROM documents WHERE output_dir = ?", (output_dir,)
+                ).fetchone()
+                if row and not force and row[1] == source_sha256 and row[2] == markdown_mtime:
+                    return 0
+                if row:
+                    document_id = row[0]
+                else:
+                    document_id = conn.execute(
+                        "INSERT INTO documents (output_dir, document, page_count, indexed_at) VALUES (?, ?, 0, 0)",
+                        (output_dir, document)
+                    ).lastrowid
+
+                first_rowid = document_id * PAGE_ROWID_STRIDE
+                conn.execute("DELETE FROM pages WHERE rowid >= ? AND rowid < ?",
+                             (first_rowid, first_rowid + PAGE_ROWID_STRIDE))
+                page_count = 0
+                for page, markdown in iter_markdown_pages(markdown_path):
+                    conn.execute(
+                        "INSERT INTO pages (rowid, markdown, document, page, output_path, source_sha256) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (first_rowid + page, markdown, document, page, markdown_path, source_sha256)
+                    )
+                    page_count += 1
+                conn.execute(
+                    "UPDATE documents SET document = ?, source_sha256 = ?, markdown_mtime = ?, page_count = ?, "
+                    "indexed_at = ? WHERE id = ?",
+                    (document, source_sha256, markdown_mtime, page_count, time.time(), document_id)
+                )
+            return page_count
+        finally:
+            conn.close()
+
+    def remove_output(self, output_dir: str) -> None:
+        """从索引中删除一个输出目录的所有行"""
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT id FROM documents WHERE output_dir = ?",
+                                   (os.path.abspath(output_dir),)).fetchone()
+                if row:
+                    first_rowid = row[0] * PAGE_ROWID_STRIDE
+                    conn.execute("DELETE FROM pages WHERE rowid >= ? AND rowid < ?",
+                                 (first_rowid, first_rowid + PAGE_ROWID_STRIDE))
+                    conn.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+        finally:
+            conn.close()
+
+    def query(self, text: str, limit: int = 20) -> list:
+        """
+        按相关度(bm25)返回匹配的页，每项包含 document、page、output_path、source_sha256、snippet 和 score。
+        text 使用 FTS5 查询语法；语法无效时按普通词组重新查询。
+        含有少于3个字符的词时 trigram 索引无法匹配，改为 scan_query 逐页查找包含所有词的页。
+        """
+        terms = [term.strip('"') for term in text.split() if term not in _QUERY_OPERATORS]
+        terms = [term for term in terms if term]
+        if terms and min(len(term) for term in terms) < MIN_TRIGRAM_TERM_CHARS:
+            return self.scan_query(terms, limit)
+
+        conn = self._connect()
+        try:
+            sql = ("SELECT document, page, output_path, source_sha256, "
+                   "snippet(pages, 0, '[', ']', '...', 16), bm25(pages) "
+                   "FROM pages WHERE pages MATCH ? ORDER BY rank LIMIT ?")
+            try:
+                rows = conn.execute(sql, (text, limit)).fetchall()
+            except sqlite3.OperationalError:
+                phrase = " ".join('"{}"'.format(term.replace('"', '""')) for term in text.split())
+                rows = conn.execute(sql, (phrase, limit)).fetchall()
+        finally:
+            conn.close()
+
+        return [
+            {"document": document, "page": page, "output_path": output_path,
+             "source_sha256": source_sha256, "snippet": snippet, "score": score}
+            for document, page, output_path, source_sha256, snippet, score in rows
+        ]
+
+    def scan_query(self, terms: list, limit: int = 20) -> list:
+        """
+        逐页查找包含所有 terms 的页(不区分ASCII大小写)，返回格式与 query 相同。
+        score 为各词出现次数之和的相反数，与 bm25 一样越小越相关。
+        """
+        conditions = " AND ".join("instr(lower(markdown), lower(?)) > 0" for _ in terms)
+        occurrences = " + ".join(
+            "(length(markdown) - length(replace(lower(markdown), lower(?), ''))) / length(?)" for _ in terms
+        )
+        sql = (f"SELECT document, page, output_path, source_sha256, markdown, -({occurrences}) AS score "
+               f"FROM pages WHERE {conditions} ORDER BY score, rowid LIMIT ?")
+        params = [value for term in terms for value in (term, term)] + list(terms) + [limit]
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+        return [
+            {"document": document, "page": page, "output_path": output_path, "source_sha256": source_sha256,
+             "snippet": make_snippet(markdown, terms[0]), "score": score}
+            for document, page, output_path, source_sha256, markdown, score in rows
+        ]
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Mistral OCR 结果全文索引")
+    parser.add_argument("--db", default=str(DEFAULT_INDEX_PATH), help="索引数据库路径")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = commands.add_parser("index", help="索引输出目录(或包含输出目录的文件夹)")
+    index_parser.add_argument("paths", nargs="+")
+    index_parser.add_argument("-r", "--recursive", action="store_true", help="递归查找输出目录")
+    index_parser.add_argument("--force", action="store_true", help="即使没有变化也重新索引")
+
+    query_parser = commands.add_parser("query", help="查询索引")
+    query_parser.add_argument("text")
+    query_parser.add_argument("-n", "--limit", type=int, default=20)
+    query_parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+
+    args = parser.parse_args(argv)
+    index = SearchIndex(args.db)
+
+    if args.command == "index":
+        for path in args.paths:
+            for output_dir in find_output_dirs(path, args.recursive):
+                page_count = index.index_output(output_dir, force=args.force)
+                print(f"{output_dir}: {page_count} pages" if page_count else f"{output_dir}: unchanged")
+        return 0
+
+    start = time.perf_counter()
+    hits = index.query(args.text, args.limit)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if args.json:
+        print(json.dumps({"elapsed_ms": elapsed_ms, "hits": hits}, ensure_ascii=False, indent=2))
+        return 0
+    for hit in hits:
+        print(f"{hit['score']:8.2f}  {hit['document']} p.{hit['page']}  {hit['output_path']}")
+        print(f"          {' '.join(hit['snippet'].split())}")
+    print(f"{len(hits)} hits in {elapsed_ms:.1f} ms")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,272 @@
+"""
+上传文件管理模块 (uploads.py)
+按内容哈希记录已上传到 Mistral 的文件：签名URL仍有效时相同内容直接复用，不再重复上传；
+OCR完成且不再复用的远程文件由后台线程批量删除，删除请求不占用处理分块的线程
+"""
+import atexit
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from rate_limit import get_rate_limiter
+
+# 签名URL的有效期(小时)
+SIGNED_URL_EXPIRY_HOURS = 1
+# 签名URL剩余有效期少于此秒数时不再复用，避免OCR请求到达时已经过期
+SIGNED_URL_MARGIN = 300.0
+# OCR完成后保留远程文件以便复用的秒数，之后由后台线程删除
+DEFAULT_UPLOAD_RETENTION = 120.0
+# 后台批量删除时的并发请求数
+DEFAULT_DELETE_WORKERS = 4
+
+class RemoteFile:
+    """一个已上传的远程文件及其签名URL"""
+    __slots__ = ("key", "client", "file_id", "url", "expires_at", "refs", "released_at")
+
+    def __init__(self, key: tuple, client, file_id: str, url: str, expires_at: float):
+        self.key = key
+        self.client = client
+        self.file_id = file_id
+        self.url = url
+        self.expires_at = expires_at
+        # 正在使用该文件的OCR请求数
+        self.refs = 1
+        self.released_at = None
+
+class UploadRegistry:
+    """
+    进程内的远程文件登记表，键为 (客户端, 内容SHA-256)，不同API密钥的文件不会互相复用。
+    acquire 返回的 RemoteFile 在OCR完成后必须交给 release；闲置超过 retention 秒的文件会被后台删除。
+    """
+
+    def __init__(self, retention: float = DEFAULT_UPLOAD_RETENTION, delete_workers: int = DEFAULT_DELETE_WORKERS):
+        self.retention = retention
+        self.delete_workers = max(1, delete_workers)
+        self._entries = {}
+        # 等待删除的 (客户端, 文件ID)
+        self._doomed = []
+        self._condition = threading.Condition()
+        self._worker = None
+        self._closed = False
+        self._deleting = 0
+
+        self.uploads = 0
+        self.reuses = 0
+        self.deleted = 0
+        self.delete_failures = 0
+
+    @staticmethod
+    def make_key(client, content: bytes) -> tuple:
+        return id(client), hashlib.sha256(content).hexdigest()
+
+    def _usable(self, entry: RemoteFile, now: float) -> bool:
+        return entry.expires_at - SIGNED_URL_MARGIN > now
+
+    def lookup(self, key: tuple) -> RemoteFile:
+        """返回仍可复用的远程文件并登记一次使用，没有时返回 None"""
+        with self._condition:
+            entry = self._entries.get(key)
+            if entry is None or not self._usable(entry, time.time()):
+                return None
+            entry.refs += 1
+            entry.released_at = None
+            self.reuses += 1
+            return entry
+
+    def register(self, key: tuple, client, file_id: str, url: str, expires_at: float) -> RemoteFile:
+        """
+        登记刚上传的文件并返回应使用的远程文件。
+        若另一个线程已同时上传了相同内容，则沿用先登记的文件，刚上传的这份直接排入删除队列。
+        """
+        with self._condition:
+            self.uploads += 1
+            now = time.time()
+            entry = self._entries.get(key)
+            if entry is not None and self._usable(entry, now):
+                entry.refs += 1
+                entry.released_at = None
+                self._doomed.append((client, file_id))
+                self._start_worker()
+                self._condition.notify_all()
+                return entry
+            if entry is not None and entry.refs == 0:
+                self._doomed.append((entry.client, entry.file_id))
+            # 仍在使用中的过期文件由其 release 负责删除
+            entry = self._entries[key] = RemoteFile(key, client, file_id, url, expires_at)
+            self._start_worker()
+            self._condition.notify_all()
+            return entry
+
+    def discard(self, client, file_id: str) -> None:
+        """已上传但无法使用(例如获取签名URL失败)的文件直接排入删除队列"""
+        with self._condition:
+            self._doomed.append((client, file_id))
+            self._start_worker()
+            self._condition.notify_all()
+
+    def release(self, entry: RemoteFile) -> None:
+        """一次OCR请求不再需要该文件"""
+        with self._condition:
+            entry.refs -= 1
+            if entry.refs > 0:
+                return
+            entry.refs = 0
+            entry.released_at = time.monotonic()
+            if self._entries.get(entry.key) is not entry:
+                # 已被新的上传取代，不会再被复用
+                self._doomed.append((entry.client, entry.file_id))
+            self._condition.notify_all()
+
+    def acquire(self, client, content: bytes, file_name: str) -> RemoteFile:
+        """返回可供OCR请求使用的远程文件：内容相同且签名URL仍有效的上传直接复用，否则上传文件并获取签名URL"""
+        key = self.make_key(client, content)
+        entry = self.lookup(key)
+        if entry is not None:
+            return entry
+
+        rate_limiter = get_rate_limiter()
+        uploaded_file = rate_limiter.call(
+            client.files.upload,
+            file={
+                "file_name": file_name,
+                "content": content,
+            },
+            purpose="ocr",
+        )
+        expires_at = time.time() + SIGNED_URL_EXPIRY_HOURS * 3600
+        try:
+            signed_url = rate_limiter.call(client.files.get_signed_url, file_id=uploaded_file.id,
+                                           expiry=SIGNED_URL_EXPIRY_HOURS)
+        except BaseException:
+            self.discard(client, uploaded_file.id)
+            raise
+        return self.register(key, client, uploaded_file.id, signed_url.url, expires_at)
+
+    async def acquire_async(self, client, content: bytes, file_name: str) -> RemoteFile:
+        """acquire 的异步版本"""
+        import asyncio
+
+        key = await asyncio.to_thread(self.make_key, client, content)
+        entry = self.lookup(key)
+        if entry is not None:
+            return entry
+
+        rate_limiter = get_rate_limiter()
+        uploaded_file = await rate_limiter.call_async(
+            client.files.upload_async,
+            file={
+                "file_name": file_name,
+                "content": content,
+            },
+            purpose="ocr",
+        )
+        expires_at = time.time() + SIGNED_URL_EXPIRY_HOURS * 3600
+        try:
+            signed_url = await rate_limiter.call_async(
+                client.files.get_signed_url_async, file_id=uploaded_file.id, expiry=SIGNED_URL_EXPIRY_HOURS
+            )
+        except BaseException:
+            self.discard(client, uploaded_file.id)
+            raise
+        return self.register(key, client, uploaded_file.id, signed_url.url, expires_at)
+
+    def _start_worker(self) -> None:
+        """第一次有文件登记时启动后台删除线程。调用方持有锁"""
+        if self._worker is None and not self._closed:
+            self._worker = threading.Thread(target=self._run, name="upload-cleanup", daemon=True)
+            self._worker.start()
+
+    def _collect(self, client=None, force: bool = False) -> list:
+        """取出所有到期(force 时为所有闲置)的文件，返回 (客户端, 文件ID) 列表。调用方持有锁"""
+        now = time.monotonic()
+        batch = [item for item in self._doomed if client is None or item[0] is client]
+        self._doomed = [item for item in self._doomed if not (client is None or item[0] is client)]
+        for key, entry in list(self._entries.items()):
+            if entry.refs or (client is not None and entry.client is not client):
+                continue
+            if force or now - entry.released_at >= self.retention or not self._usable(entry, time.time()):
+                del self._entries[key]
+                batch.append((entry.client, entry.file_id))
+        return batch
+
+    def _next_due(self) -> float:
+        """距离下一个闲置文件到期的秒数，没有闲置文件时返回 None。调用方持有锁"""
+        released = [entry.released_at for entry in self._entries.values() if not entry.refs]
+        if not released:
+            return None
+        return max(0.0, min(released) + self.retention - time.monotonic())
+
+    def _delete_batch(self, batch: list) -> None:
+        """并发删除一批远程文件；删除失败只计数，不影响OCR结果"""
+        def delete(item):
+            client, file_id = item
+            try:
+                get_rate_limiter().call(client.files.delete, file_id=file_id)
+                return True
+            except Exception:
+                return False
+
+        with ThreadPoolExecutor(max_workers=min(self.delete_workers, len(batch))) as executor:
+            results = list(executor.map(delete, batch))
+        with self._condition:
+            self.deleted += sum(results)
+            self.delete_failures += len(results) - sum(results)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._closed:
+                    batch = self._collect()
+                    if batch:
+                        break
+                    self._condition.wait(self._next_due())
+                else:
+                    return
+                self._deleting += 1
+            try:
+                self._delete_batch(batch)
+            finally:
+                with self._condition:
+                    self._deleting -= 1
+                    self._condition.notify_all()
+
+    def flush(self, client=None) -> None:
+        """立即删除所有闲置的远程文件(只删除 client 的文件，None 表示全部)，并等待后台正在进行的删除完成"""
+        with self._condition:
+            batch = self._collect(client, force=True)
+        if batch:
+            self._delete_batch(batch)
+        with self._condition:
+            while self._deleting:
+                self._condition.wait()
+
+    def close(self) -> None:
+        """停止后台线程并删除剩余的闲置文件"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "uploads": self.uploads,
+                "reuses": self.reuses,
+                "deleted": self.deleted,
+                "delete_failures": self.delete_failures,
+                "retained": len(self._entries),
+            }
+
+# 进程内共享的登记表，退出时清理剩余的远程文件
+_upload_registry = None
+_upload_registry_lock = threading.Lock()
+
+def get_upload_registry() -> UploadRegistry:
+    """返回进程内共享的上传文件登记表(第一次调用时创建)"""
+    global _upload_registry
+    with _upload_registry_lock:
+        if _upload_registry is None:
+            _upload_registry = UploadRegistry()
+            atexit.register(_upload_registry.close)
+        return _upload_registry
@@ -0,0 +1,424 @@
+"""
+监视文件夹模块 (watch.py)
+持续监视一个或多个文件夹(Linux 上使用 inotify，其他系统或 inotify 不可用时轮询)，
+新的PDF和图像文件停止增长后交给与命令行相同的处理流程，限制同时处理的文件数，并报告从文件到达到结果写出的延迟
+用法: python watch.py [选项] 文件夹 ...
+"""
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import statistics
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import i18n
+from cli import is_supported_file
+from convert import DEFAULT_FILE_CONCURRENCY, SHARED_IMAGES_DIR, Config
+from i18n import _
+from engine import OCREngine
+from ocr_cache import OCRCache
+from rate_limit import DEFAULT_MAX_CONCURRENCY, DEFAULT_REQUESTS_PER_SECOND, configure_rate_limiter
+from search_index import SearchIndex
+
+# 文件大小和修改时间保持不变多少秒后认为已写完
+DEFAULT_SETTLE_SECONDS = 2.0
+# 检查文件是否稳定(以及轮询模式下扫描文件夹)的间隔(秒)
+DEFAULT_CHECK_INTERVAL = 0.5
+# 每处理完多少个文件输出一次延迟统计
+STATS_EVERY = 20
+
+# 扫描仪和下载工具写入时使用的临时文件，不处理
+IGNORED_PREFIXES = (".", "~$")
+
+# inotify 事件(见 <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+class Inotify:
+    """通过 ctypes 调用 libc 的 inotify 接口，只报告新建、写完和移入的文件"""
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._paths = {}
+
+    def add_watch(self, directory: str) -> None:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {directory}")
+        self._paths[wd] = directory
+
+    def read(self, timeout: float) -> list:
+        """等待最多 timeout 秒，返回 (路径, 是否为目录) 列表；事件队列溢出时返回 None，调用方应重新扫描"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if wd in self._paths and name:
+                events.append((os.path.join(self._paths[wd], os.fsdecode(name)), bool(mask & IN_ISDIR)))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+class PendingFile:
+    """等待写完的文件"""
+    __slots__ = ("arrived_at", "size", "mtime", "changed_at")
+
+    def __init__(self, arrived_at: float):
+        self.arrived_at = arrived_at
+        self.size = None
+        self.mtime = None
+        self.changed_at = arrived_at
+
+class HotFolderWatcher:
+    """
+    监视文件夹中新出现的PDF和图像文件，文件在 settle_seconds 内大小和修改时间都不再变化时调用 on_ready(路径, 到达时间)。
+    use_inotify 为 True 时优先使用 inotify，不可用时自动改为每 check_interval 秒扫描一次。
+    output_base_dir 为结果保存位置；它位于监视的文件夹内时，只跳过其中生成的输出目录和共享图片目录，其余文件照常监视。
+    """
+
+    def __init__(self, directories: list, on_ready, recursive: bool = False,
+                 settle_seconds: float = DEFAULT_SETTLE_SECONDS, check_interval: float = DEFAULT_CHECK_INTERVAL,
+                 use_inotify: bool = True, process_existing: bool = True, output_base_dir: str = None):
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.on_ready = on_ready
+        self.recursive = recursive
+        self.settle_seconds = settle_seconds
+        self.check_interval = check_interval
+        self.process_existing = process_existing
+        self.output_base_dir = os.path.abspath(output_base_dir or os.getcwd())
+        self.inotify = None
+        if use_inotify:
+            try:
+                self.inotify = Inotify()
+            except (OSError, AttributeError):
+                self.inotify = None
+        self._pending = {}
+        # 已交给 on_ready 的文件及当时的 (大小, 修改时间)，内容不变时不再重复处理
+        self._handled = {}
+        # 轮询模式下上一次扫描看到的 (大小, 修改时间)
+        self._snapshot = {}
+        self._stop = threading.Event()
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self.inotify else "polling"
+
+    def _excluded(self, path: str) -> bool:
+        """path 是否位于本程序生成的输出目录(保存位置下的 ocr_result_* 或共享图片目录)中"""
+        if not path.startswith(self.output_base_dir + os.sep):
+            return False
+        parts = os.path.relpath(path, self.output_base_dir).split(os.sep)
+        if len(parts) == 1 and not os.path.isdir(path):
+            return False  # 保存位置下的普通文件
+        return parts[0].startswith(_("ocr_result_dir")) or parts[0] == SHARED_IMAGES_DIR
+
+    def _wanted(self, path: str) -> bool:
+        return (not os.path.basename(path).startswith(IGNORED_PREFIXES) and is_supported_file(path)
+                and not self._excluded(path))
+
+    def _walk(self):
+        """列出所有受监视的目录和其中的文件，返回 (目录列表, {文件: (大小, 修改时间)})"""
+        directories, files = [], {}
+        for top in self.directories:
+            for root, dirs, names in os.walk(top):
+                dirs[:] = sorted(d for d in dirs if not d.startswith(".")
+                                 and not self._excluded(os.path.join(root, d)))
+                directories.append(root)
+                for name in names:
+                    path = os.path.join(root, name)
+                    if self._wanted(path):
+                        try:
+                            stat = os.stat(path)
+                        except OSError:
+                            continue
+                        files[path] = (stat.st_size, stat.st_mtime)
+                if not self.recursive:
+                    break
+        return directories, files
+
+    def _track(self, path: str, now: float) -> None:
+        if path in self._pending or not self._wanted(path):
+            return
+        try:
+            # 文件可能在被发现之前就已开始写入
+            arrived_at = min(now, os.stat(path).st_mtime)
+        except OSError:
+            return
+        self._pending[path] = PendingFile(arrived_at)
+
+    def _add_directory(self, directory: str, now: float) -> None:
+        """inotify 模式下开始监视新出现的子目录，并登记其中已有的文件"""
+        if self._excluded(directory):
+            return
+        for root, dirs, names in os.walk(directory):
+            dirs[:] = [d for d in dirs if not d.startswith(".") and not self._excluded(os.path.join(root, d))]
+            try:
+                self.inotify.add_watch(root)
+            except OSError:
+                continue
+            for name in names:
+                self._track(os.path.join(root, name), now)
+
+    def _rescan(self, now: float, initial: bool = False) -> None:
+        """扫描所有文件夹，登记新文件或有变化的文件"""
+        _, files = self._walk()
+        for path, signature in files.items():
+            if initial and not self.process_existing:
+                self._handled[path] = signature
+            elif self._snapshot.get(path) != signature and self._handled.get(path) != signature:
+                self._track(path, now)
+        self._snapshot = files
+
+    def _check_pending(self, now: float) -> None:
+        """把已经稳定的文件交给 on_ready"""
+        for path, pending in list(self._pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self._pending[path]  # 文件已被删除或移走
+                continue
+            if (stat.st_size, stat.st_mtime) != (pending.size, pending.mtime):
+                pending.size, pending.mtime = stat.st_size, stat.st_mtime
+                pending.changed_at = now
+                continue
+            if stat.st_size == 0 or now - pending.changed_at < self.settle_seconds:
+                continue
+            del self._pending[path]
+            signature = (stat.st_size, stat.st_mtime)
+            if self._handled.get(path) != signature:
+                self._handled[path] = signature
+                self.on_ready(path, pending.arrived_at)
+
+    def run(self) -> None:
+        """阻塞运行直到调用 stop()"""
+        start = time.time()
+        if self.inotify:
+            directories, _ = self._walk()
+            for directory in directories:
+                self.inotify.add_watch(directory)
+        self._rescan(start, initial=True)
+        for pending in self._pending.values():
+            pending.arrived_at = start  # 启动前已有的文件从启动时开始计时
+
+        try:
+            while not self._stop.is_set():
+                now = time.time()
+                if self.inotify:
+                    # 有待稳定的文件时按检查间隔醒来，否则一直等待事件
+                    events = self.inotify.read(self.check_interval if self._pending else 1.0)
+                    now = time.time()
+                    if events is None:
+                        self._rescan(now)
+                    else:
+                        for path, is_dir in events:
+                            if is_dir:
+                                if self.recursive:
+                                    self._add_directory(path, now)
+                            else:
+                                self._track(path, now)
+                else:
+                    self._rescan(now)
+                    self._stop.wait(self.check_interval)
+                    now = time.time()
+                self._check_pending(now)
+        finally:
+            if self.inotify:
+                self.inotify.close()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+class LatencyStats:
+    """从文件到达到结果写出的延迟统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.failed = 0
+
+    def add(self, latency: float, ok: bool = True) -> None:
+        with self._lock:
+            if ok:
+                self.latencies.append(latency)
+            else:
+                self.failed += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            latencies = sorted(self.latencies)
+            failed = self.failed
+        if not latencies:
+            return {"done": 0, "failed": failed}
+        return {
+            "done": len(latencies),
+            "failed": failed,
+            "p50_s": round(statistics.median(latencies), 3),
+            "p95_s": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+            "max_s": round(latencies[-1], 3),
+        }
+
+class HotFolderRunner:
+    """把稳定下来的文件交给 OCREngine 处理，最多同时处理 engine.file_workers 个文件，并记录每个文件的延迟"""
+
+    def __init__(self, engine: OCREngine, output_base_dir: str = None, cache=None, output_options: dict = None,
+                 search_index=None, log=None, events_path: str = None, **process_kwargs):
+        self.engine = engine
+        self.output_base_dir = output_base_dir
+        self.cache = cache
+        self.output_options = output_options
+        self.search_index = search_index
+        self.process_kwargs = process_kwargs
+        self.log = log or (lambda message: None)
+        self.stats = LatencyStats()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, engine.file_workers))
+        self._events_path = events_path
+        self._events_lock = threading.Lock()
+
+    def submit(self, file_path: str, arrived_at: float) -> None:
+        ready_at = time.time()
+        self.log(f"[queued] {file_path} (stable after {ready_at - arrived_at:.1f}s)")
+        self._executor.submit(self._process, file_path, arrived_at, ready_at)
+
+    def _process(self, file_path: str, arrived_at: float, ready_at: float) -> None:
+        started_at = time.time()
+        event = {"path": file_path, "status": "done", "output_dir": None, "error": None}
+        try:
+            event["output_dir"] = self.engine.process_pdf(
+                file_path, None, self.output_base_dir, cache=self.cache, output_options=self.output_options,
+                search_index=self.search_index, **self.process_kwargs
+            )
+        except Exception as e:
+            event["status"] = "failed"
+            event["error"] = f"{type(e).__name__}: {e}"
+        finished_at = time.time()
+        event.update({
+            "arrived_at": arrived_at,
+            "settle_s": round(ready_at - arrived_at, 3),
+            "queue_s": round(started_at - ready_at, 3),
+            "process_s": round(finished_at - started_at, 3),
+            "latency_s": round(finished_at - arrived_at, 3),
+        })
+        self.stats.add(event["latency_s"], event["status"] == "done")
+        self.log(f"[{event['status']}] {file_path}: {event['latency_s']:.1f}s from arrival "
+                 f"(settle {event['settle_s']:.1f}s, queue {event['queue_s']:.1f}s, OCR {event['process_s']:.1f}s)"
+                 + (f": {event['error']}" if event["error"] else ""))
+        if self._events_path:
+            with self._events_lock, open(self._events_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+        summary = self.stats.summary()
+        if summary["done"] and (summary["done"] + summary["failed"]) % STATS_EVERY == 0:
+            self.log(f"[stats] {json.dumps(summary)}")
+
+    def close(self) -> None:
+        """等待已排队的文件处理完毕"""
+        self._executor.shutdown(wait=True)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="监视文件夹并自动OCR新出现的PDF和图像文件")
+    parser.add_argument("directories", nargs="+", help="要监视的文件夹")
+    parser.add_argument("-r", "--recursive", action="store_true", help="同时监视子文件夹")
+    parser.add_argument("-o", "--output-dir", default=None, help="结果保存位置(默认为当前目录)")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_FILE_CONCURRENCY, help="同时处理的文件数")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE_SECONDS,
+                        help="文件大小保持不变多少秒后开始处理")
+    parser.add_argument("--check-interval", type=float, default=DEFAULT_CHECK_INTERVAL,
+                        help="检查文件是否写完(及轮询扫描)的间隔(秒)")
+    parser.add_argument("--polling", action="store_true", help="不使用 inotify，定期扫描文件夹")
+    parser.add_argument("--skip-existing", action="store_true", help="不处理启动时已经存在的文件")
+    parser.add_argument("--events", default=None, help="把每个文件的处理结果和延迟追加写入此JSONL文件")
+    parser.add_argument("--rps", type=float, default=DEFAULT_REQUESTS_PER_SECOND, help="每秒最多发出的API请求数")
+    parser.add_argument("--max-requests", type=int, default=DEFAULT_MAX_CONCURRENCY, help="同时进行的API请求数上限")
+    parser.add_argument("--text-only", action="store_true", help="仅保存文本，不请求图片")
+    parser.add_argument("--no-cache", action="store_true", help="不使用OCR结果缓存")
+    parser.add_argument("--index", action="store_true", help="处理完成后写入全文索引")
+    parser.add_argument("--server-url", default=None, help="API服务器地址(默认为 Mistral 官方地址)")
+    parser.add_argument("--api-key", default=None, help="Mistral API密钥(默认读取 MISTRAL_API_KEY 或已保存的密钥)")
+    parser.add_argument("--lang", choices=sorted(i18n.LANGUAGES), default=None, help="输出目录名称使用的语言")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不在标准错误输出中显示进度")
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    lang = args.lang or i18n.load_language_preference()
+    if lang:
+        i18n.change_language(lang)
+
+    api_key = args.api_key or os.environ.get("MISTRAL_API_KEY") or Config.load_api_key()
+    if not api_key:
+        print("缺少API密钥: 请使用 --api-key 或设置 MISTRAL_API_KEY", file=sys.stderr)
+        return 2
+    missing = [directory for directory in args.directories if not os.path.isdir(directory)]
+    if missing:
+        print(f"文件夹不存在: {', '.join(missing)}", file=sys.stderr)
+        return 2
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    print_lock = threading.Lock()
+
+    def log(message):
+        if not args.quiet:
+            with print_lock:
+                print(message, file=sys.stderr, flush=True)
+
+    engine = OCREngine(api_key, server_url=args.server_url, file_workers=args.jobs)
+    configure_rate_limiter(requests_per_second=args.rps, max_concurrency=args.max_requests)
+    runner = HotFolderRunner(
+        engine, args.output_dir, cache=None if args.no_cache else OCRCache(),
+        output_options={"text_only": args.text_only}, search_index=SearchIndex() if args.index else None,
+        log=log, events_path=args.events
+    )
+    watcher = HotFolderWatcher(
+        args.directories, runner.submit, recursive=args.recursive, settle_seconds=args.settle,
+        check_interval=args.check_interval, use_inotify=not args.polling,
+        process_existing=not args.skip_existing, output_base_dir=args.output_dir
+    )
+    log(f"Watching {', '.join(watcher.directories)} ({watcher.mode}), press Ctrl+C to stop")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        log("Stopping, waiting for files in progress...")
+    finally:
+        watcher.stop()
+        runner.close()
+        engine.close()
+        log(f"[stats] {json.dumps(runner.stats.summary())}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())